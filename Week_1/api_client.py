@@ -0,0 +1,297 @@
+"""
+HTTP client used by the shopping agent's tools.
+
+All requests go through one pooled `httpx.AsyncClient` (keep-alive, HTTP/2
+when the `h2` package is installed) that lives on a dedicated event loop
+thread. Async callers await it from any loop; sync callers such as the CLI
+loop block on it through `run_sync`, so both share the same connections.
+
+The client also keeps the last validated body of every GET that came back
+with an ETag and revalidates it with If-None-Match, so unchanged catalog
+responses cost a 304 instead of a full download and JSON parse.
+
+Requests are grouped by backend (registered with `add_backend`, otherwise
+the URL's origin). Each backend has its own timeout and circuit breaker,
+and GETs are retried with backoff; see resilience.py.
+
+With AGENT_API_TRANSPORT=asgi the client doesn't open sockets at all: it
+hands requests straight to an ASGI app in this process (AGENT_ASGI_APP,
+mock_apis by default), for single-box deployments. The URLs stay the same;
+only their paths matter. Timeouts don't apply in that mode, since nothing
+waits on the network.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+import httpx
+
+from resilience import BackendUnavailable, CircuitBreaker, RetryPolicy, is_failure, is_retryable
+from tracing import carry, tracer
+
+T = TypeVar("T")
+
+DEFAULT_VALIDATOR_CACHE_SIZE = 512
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", "100"))
+DEFAULT_TIMEOUT = httpx.Timeout(
+    float(os.getenv("AGENT_HTTP_TIMEOUT", "10")),
+    connect=float(os.getenv("AGENT_HTTP_CONNECT_TIMEOUT", "3")),
+)
+
+# "http" over the network, or "asgi" into an app served in this process
+DEFAULT_TRANSPORT = os.getenv("AGENT_API_TRANSPORT", "http")
+DEFAULT_ASGI_APP = os.getenv("AGENT_ASGI_APP", "mock_apis:app")
+TRANSPORTS = ("http", "asgi")
+
+TimeoutTypes = Union[None, float, httpx.Timeout]
+
+
+def load_app(spec: str) -> Any:
+    """Import an app given as module:attribute"""
+    module, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module), attribute or "app")
+
+
+class _LoopThread:
+    """An event loop running forever on a daemon thread"""
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class ApiClient:
+    """Shared, pooled HTTP client for the e-commerce APIs"""
+
+    def __init__(
+        self,
+        validator_cache_size: int = DEFAULT_VALIDATOR_CACHE_SIZE,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        http2: Optional[bool] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker_factory: Callable[[str], CircuitBreaker] = CircuitBreaker,
+        transport: str = DEFAULT_TRANSPORT,
+        app: Any = None,
+    ):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown API transport {transport!r}; expected one of {', '.join(TRANSPORTS)}")
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        self.transport = transport
+        if transport == "asgi" and app is None:
+            app = load_app(DEFAULT_ASGI_APP)
+        self.validator_cache_size = validator_cache_size
+        self.revalidated = 0
+        # (url, params) -> (etag, parsed body)
+        self._validated: "OrderedDict[Tuple, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker_factory = breaker_factory
+        # (URL prefix, backend name, timeout), longest prefix first
+        self._backends: List[Tuple[str, str, Optional[httpx.Timeout]]] = []
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        self._loop_thread = _LoopThread("api-client-loop")
+        self._client = self.run_sync(self._create_client(max_connections, timeout, http2, app))
+
+    @staticmethod
+    async def _create_client(max_connections: int, timeout: httpx.Timeout, http2: bool, app: Any) -> httpx.AsyncClient:
+        if app is not None:
+            # App errors come back as 500 responses, as they would over HTTP
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), timeout=timeout)
+        # Created on the client loop so its connection pool belongs to that loop
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30,
+            ),
+        )
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop_thread.loop
+
+    def run_sync(self, coroutine: Awaitable[T]) -> T:
+        """Run a coroutine on the client loop and block until it finishes"""
+        if threading.current_thread() is self._loop_thread.thread:
+            raise RuntimeError("run_sync() called from the API client loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(carry(coroutine), self.loop).result()
+
+    async def _on_client_loop(self, coroutine: Awaitable[T]) -> T:
+        """Await a coroutine on the client loop, whichever loop the caller is on"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(carry(coroutine), self.loop))
+
+    def close(self) -> None:
+        """Close pooled connections and stop the client loop"""
+        self.run_sync(self._client.aclose())
+        self._loop_thread.stop()
+
+    def add_backend(self, name: str, base_url: str, timeout: TimeoutTypes = None) -> None:
+        """Route URLs under `base_url` to backend `name`, with its own breaker and timeout"""
+        if isinstance(timeout, (int, float)):
+            timeout = httpx.Timeout(timeout, connect=self.timeout.connect)
+        with self._lock:
+            backends = [entry for entry in self._backends if entry[0] != base_url] + [(base_url, name, timeout)]
+            self._backends = sorted(backends, key=lambda entry: len(entry[0]), reverse=True)
+
+    def _backend(self, url: str) -> Tuple[CircuitBreaker, Optional[httpx.Timeout]]:
+        for prefix, name, timeout in self._backends:
+            if url.startswith(prefix):
+                break
+        else:
+            parsed = httpx.URL(url)
+            name, timeout = f"{parsed.scheme}://{parsed.netloc.decode()}", None
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = self.breaker_factory(name)
+        return breaker, timeout
+
+    def stats(self) -> dict:
+        """Revalidations, and breaker state, retries and timeouts per backend"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {
+            "transport": self.transport,
+            "revalidated": self.revalidated,
+            "backends": {breaker.name: breaker.stats() for breaker in breakers},
+        }
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[Dict[str, Any]]) -> Tuple:
+        return (url, tuple(sorted((params or {}).items())))
+
+    async def aget_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: TimeoutTypes = None) -> Any:
+        """GET a JSON resource, revalidating a cached copy when the server gave an ETag"""
+        return await self._on_client_loop(self._get_json(url, params, timeout))
+
+    async def apost_json(self, url: str, payload: Any, timeout: TimeoutTypes = None) -> Any:
+        """POST a JSON body and return the parsed JSON response"""
+        return await self._on_client_loop(self._send_json("POST", url, payload, timeout))
+
+    async def aput_json(self, url: str, payload: Any, timeout: TimeoutTypes = None) -> Any:
+        """PUT a JSON body and return the parsed JSON response"""
+        return await self._on_client_loop(self._send_json("PUT", url, payload, timeout))
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: TimeoutTypes = None) -> Any:
+        """Blocking version of aget_json"""
+        return self.run_sync(self._get_json(url, params, timeout))
+
+    def post_json(self, url: str, payload: Any, timeout: TimeoutTypes = None) -> Any:
+        """Blocking version of apost_json"""
+        return self.run_sync(self._send_json("POST", url, payload, timeout))
+
+    def put_json(self, url: str, payload: Any, timeout: TimeoutTypes = None) -> Any:
+        """Blocking version of aput_json"""
+        return self.run_sync(self._send_json("PUT", url, payload, timeout))
+
+    async def _resilient(self, method: str, url: str, send: Callable[[], Awaitable[httpx.Response]], idempotent: bool) -> httpx.Response:
+        """send() through the backend's circuit breaker, retrying idempotent requests"""
+        breaker, _ = self._backend(url)
+        attempt = 0
+        while True:
+            try:
+                with tracer.span(f"{method} {breaker.name}", "http", url=url, attempt=attempt) as span:
+                    response = await breaker.call(send)
+                    span.set(status=response.status_code, response_bytes=len(response.content))
+                return response
+            except BackendUnavailable:
+                raise
+            except httpx.HTTPError as e:
+                if not idempotent or attempt >= self.retry.retries or not is_retryable(e):
+                    # A checkout that timed out may still have gone through, so only
+                    # idempotent requests get the "try again later" observation
+                    if idempotent and is_failure(e):
+                        raise BackendUnavailable(breaker.name) from e
+                    raise
+            breaker.record_retry()
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    def _request_kwargs(self, url: str, timeout: TimeoutTypes) -> Dict[str, Any]:
+        if timeout is None:
+            timeout = self._backend(url)[1]
+        return {} if timeout is None else {"timeout": timeout}
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]], timeout: TimeoutTypes) -> Any:
+        key = self._cache_key(url, params)
+        with self._lock:
+            cached = self._validated.get(key)
+
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        kwargs = self._request_kwargs(url, timeout)
+
+        async def send() -> httpx.Response:
+            response = await self._client.get(url, params=params, headers=headers, **kwargs)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response
+
+        response = await self._resilient("GET", url, send, idempotent=True)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.revalidated += 1
+                if key in self._validated:
+                    self._validated.move_to_end(key)
+            return cached[1]
+        response.raise_for_status()
+
+        data = response.json()
+        etag = response.headers.get("ETag")
+        with self._lock:
+            if etag:
+                self._validated[key] = (etag, data)
+                self._validated.move_to_end(key)
+                while len(self._validated) > self.validator_cache_size:
+                    self._validated.popitem(last=False)
+            else:
+                self._validated.pop(key, None)
+        return data
+
+    async def _send_json(self, method: str, url: str, payload: Any, timeout: TimeoutTypes) -> Any:
+        kwargs = self._request_kwargs(url, timeout)
+
+        async def send() -> httpx.Response:
+            response = await self._client.request(method, url, json=payload, **kwargs)
+            response.raise_for_status()
+            return response
+
+        # Writes are never retried: a timed-out checkout may still have gone through
+        response = await self._resilient(method, url, send, idempotent=False)
+        return response.json()
+
+
+_shared_client: Optional[ApiClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> ApiClient:
+    """Process-wide ApiClient, created on first use"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = ApiClient()
+        return _shared_client
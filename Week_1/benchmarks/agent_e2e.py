@@ -0,0 +1,233 @@
+"""
+End-to-end benchmark for agent turns, offline.
+
+Runs scripted multi-turn shopping sessions through ShoppingAgent with a
+ScriptedChatModel in place of OpenAI, against mock_apis served from this
+process. Every turn's latency is split into:
+
+- model: time inside model calls (the simulated --model-latency and streamed tokens)
+- tool: time inside tool calls, HTTP round trips and rendering included
+- overhead: the rest (prompt building, memory, output parsing, the executor)
+
+Reports per-turn percentiles for each, per scripted turn and overall, so
+agent-side changes can be measured without a network or an API key. The
+first session runs against a cold tool cache; later ones share it, as
+sessions do in the web interface. Prints a JSON report.
+
+    python -m benchmarks.agent_e2e --sessions 20 --model-latency 0.5
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.load_test import percentile, start_uvicorn
+from benchmarks.scripted_model import ScriptedChatModel, Step, tool_call
+
+USER_ID = "user123"
+
+# (user message, what the model does with it); None marks a turn the intent router answers
+SESSION: List[Tuple[str, Any]] = [
+    ("Hi! I'm looking for wireless headphones under $100", [
+        [tool_call("search_products_tool", query="headphones", max_price=100)],
+        "I found the Wireless Bluetooth Headphones by TechSound for $89.99, rated 4.5/5. Want the details?",
+    ]),
+    ("Can you compare the first two?", [
+        [tool_call("get_product_details_tool", product_id="1"), tool_call("get_product_details_tool", product_id="2")],
+        "The headphones focus on noise cancellation and battery life, while the Smart Fitness Watch tracks "
+        "heart rate and workouts. The headphones are the better fit for listening to music.",
+    ]),
+    ("I really like TechSound, please remember that", [
+        [tool_call("update_user_preferences_tool", user_id=USER_ID, brands="TechSound")],
+        "Got it, I'll favour TechSound from now on.",
+    ]),
+    ("details for product 2", None),
+    ("Great, I'll take the first one", [
+        [tool_call("create_order_tool", user_id=USER_ID, product_id="1")],
+        "Your order for the Wireless Bluetooth Headphones is placed. Anything else?",
+    ]),
+    ("What have I ordered so far?", [
+        [tool_call("get_user_orders_tool", user_id=USER_ID)],
+        "Here are your recent orders, newest first. The headphones are being processed.",
+    ]),
+    ("Thanks, that's all!", [
+        "You're welcome! Enjoy your new headphones.",
+    ]),
+]
+
+
+class PhaseTimer(BaseCallbackHandler):
+    """Collects the time spans of model and tool calls"""
+
+    # Timestamps must be taken when the event happens, not on a worker thread
+    run_inline = True
+
+    def __init__(self):
+        self.spans: Dict[str, List[Tuple[float, float]]] = {"model": [], "tool": []}
+        self._started: Dict[UUID, float] = {}
+
+    def add(self, phase: str, start: float, end: float) -> None:
+        self.spans[phase].append((start, end))
+
+    def _start(self, run_id: UUID) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def _end(self, phase: str, run_id: UUID) -> None:
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            self.add(phase, start, time.perf_counter())
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end("model", run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end("model", run_id)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end("tool", run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end("tool", run_id)
+
+    def take(self, phase: str, start: float, end: float) -> float:
+        """Seconds of `phase` within [start, end], overlapping calls counted once; clears them"""
+        spans = sorted((max(s, start), min(e, end)) for s, e in self.spans[phase] if e > start and s < end)
+        self.spans[phase] = []
+        total, covered = 0.0, start
+        for s, e in spans:
+            s = max(s, covered)
+            if e > s:
+                total += e - s
+                covered = e
+        return total
+
+
+def instrument(resources, timer: PhaseTimer) -> None:
+    """Report the shared model's and tools' calls to `timer`"""
+    resources.llm.callbacks = [timer]
+    for tool in resources.tools:
+        tool.callbacks = [timer]
+
+    # The intent router calls the toolkit's methods directly, without callbacks
+    toolkit = resources.toolkit
+    for tool in toolkit.tools:
+        name = f"a{tool.name}"
+        method = getattr(toolkit, name)
+
+        @functools.wraps(method)
+        async def timed(*args, __method=method, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await __method(*args, **kwargs)
+            finally:
+                timer.add("tool", start, time.perf_counter())
+
+        # The agent's StructuredTools already hold the original methods
+        setattr(toolkit, name, timed)
+
+
+def build_model(latency: float, token_delay: float) -> ScriptedChatModel:
+    script: Dict[str, List[Step]] = {message: steps for message, steps in SESSION if steps}
+    return ScriptedChatModel(script=script, latency=latency, token_delay=token_delay)
+
+
+async def run_session(agent, timer: PhaseTimer, mode: str) -> List[Dict[str, float]]:
+    agent.start_conversation(USER_ID)
+    turns = []
+    for message, _ in SESSION:
+        timer.spans = {"model": [], "tool": []}
+        start = time.perf_counter()
+        if mode == "sync":
+            # As the web interface's /chat runs it: blocking, on a worker thread
+            reply = await asyncio.get_running_loop().run_in_executor(None, agent.chat, message)
+        else:
+            reply = await agent.achat(message)
+        end = time.perf_counter()
+        if reply.startswith("I apologize"):
+            raise SystemExit(f"turn failed: {message!r}: {reply}")
+        model = timer.take("model", start, end)
+        tool = timer.take("tool", start, end)
+        total = end - start
+        turns.append({"total": total, "model": model, "tool": tool, "overhead": max(0.0, total - model - tool)})
+    return turns
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+def phases(turns: List[Dict[str, float]]) -> dict:
+    return {phase: summarize([turn[phase] for turn in turns]) for phase in ("total", "model", "tool", "overhead")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--model-latency", type=float, default=0.5, help="seconds before each model reply starts")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per streamed answer token")
+    parser.add_argument("--mode", choices=("async", "sync"), default="async")
+    parser.add_argument("--api-port", type=int, default=8795)
+    args = parser.parse_args()
+
+    import mock_apis
+
+    api_server, _ = start_uvicorn(mock_apis.app, args.api_port)
+    for name, path in (("PRODUCT", "products"), ("USER", "users"), ("CHECKOUT", "checkout"), ("ORDER", "orders")):
+        os.environ[f"{name}_API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}/api/{path}"
+
+    from shopping_agent import AgentResources, ShoppingAgent
+
+    timer = PhaseTimer()
+    resources = AgentResources(llm=build_model(args.model_latency, args.token_delay))
+    instrument(resources, timer)
+
+    async def run() -> List[List[Dict[str, float]]]:
+        sessions = []
+        for _ in range(args.sessions):
+            agent = ShoppingAgent(resources)
+            agent.agent_executor.verbose = False
+            sessions.append(await run_session(agent, timer, args.mode))
+        return sessions
+
+    try:
+        sessions = asyncio.run(run())
+    finally:
+        api_server.should_exit = True
+
+    all_turns = [turn for session in sessions for turn in session]
+    report = {
+        "sessions": args.sessions,
+        "turns_per_session": len(SESSION),
+        "mode": args.mode,
+        "model_latency_s": args.model_latency,
+        "token_delay_s": args.token_delay,
+        "per_turn": phases(all_turns),
+        "by_turn": {
+            message: {"routed": steps is None, **phases([session[i] for session in sessions])}
+            for i, (message, steps) in enumerate(SESSION)
+        },
+        "tool_cache": resources.toolkit.tool_cache.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
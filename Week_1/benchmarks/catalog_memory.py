@@ -0,0 +1,95 @@
+"""
+Memory benchmark: list-of-dicts catalog vs the columnar CatalogStore.
+
+Both layouts are loaded from the same synthetic JSONL file and measured with
+tracemalloc. The store is measured alone and, as mock_apis holds it, with a
+ProductSearchIndex subscribed. Prints a JSON report; load times include
+tracemalloc overhead and are only meaningful relative to each other.
+
+    python -m benchmarks.catalog_memory --products 1000000
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.synthetic import write_catalog_jsonl
+from catalog_loader import iter_catalog_file, load_catalog
+from catalog_store import CatalogStore
+from search_index import ProductSearchIndex
+
+
+def measure(build):
+    """Return (object, retained bytes, seconds) for a zero-argument builder"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalog_jsonl(Path(tmp) / "catalog.jsonl", args.products, args.seed)
+
+        products, dict_bytes, dict_seconds = measure(lambda: list(iter_catalog_file(path)))
+        del products
+
+        def build_store():
+            store = CatalogStore()
+            load_catalog(path, store)
+            return store
+
+        store, columnar_bytes, columnar_seconds = measure(build_store)
+        column_bytes = store.memory_usage()
+        del store
+
+        def build_service():
+            store = CatalogStore()
+            index = ProductSearchIndex(store)
+            store.subscribe(index.on_catalog_change)
+            load_catalog(path, store)
+            return store, index
+
+        _, service_bytes, service_seconds = measure(build_service)
+
+    report = {
+        "products": args.products,
+        "dict_layout": {
+            "bytes": dict_bytes,
+            "bytes_per_product": round(dict_bytes / args.products, 1),
+            "load_seconds": round(dict_seconds, 3),
+        },
+        "columnar_store": {
+            "bytes": columnar_bytes,
+            "bytes_per_product": round(columnar_bytes / args.products, 1),
+            "load_seconds": round(columnar_seconds, 3),
+            "column_bytes": column_bytes,
+        },
+        "store_with_search_index": {
+            "bytes": service_bytes,
+            "bytes_per_product": round(service_bytes / args.products, 1),
+            "index_bytes_per_product": round((service_bytes - columnar_bytes) / args.products, 1),
+            "load_seconds": round(service_seconds, 3),
+        },
+        "reduction": round(1 - columnar_bytes / dict_bytes, 3),
+        "service_reduction": round(1 - service_bytes / dict_bytes, 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
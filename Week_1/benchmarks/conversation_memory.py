@@ -0,0 +1,124 @@
+"""
+Benchmark for conversation memory size.
+
+Replays a scripted shopping session (searches, product details, comparisons
+and orders, with replies shaped like the agent's markdown tool output) and
+records how many tokens the memory adds to the prompt on every turn, for
+ConversationBufferMemory and TokenBudgetMemory. Prints a JSON report.
+
+    python -m benchmarks.conversation_memory --turns 50 --budget 1500
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, List, Tuple
+
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import HumanMessage
+
+from benchmarks.synthetic import NOUNS, make_product
+from conversation_memory import TokenBudgetMemory, message_tokens
+from token_counting import _encoding
+
+
+def search_reply(products: List[Dict]) -> str:
+    """Agent reply in the shape of search_products_tool output"""
+    reply = f"Here are {len(products)} options I found:\n\n"
+    for i, product in enumerate(products, 1):
+        reply += f"{i}. **{product['name']}** - ${product['price']} (ID: {product['id']})\n"
+        reply += f"   Brand: {product['brand']} | Rating: {product['rating']}/5\n"
+        reply += f"   {product['description']}\n"
+        reply += f"   Features: {', '.join(product['features'])}\n\n"
+    return reply + "Would you like more details on any of these?"
+
+
+def details_reply(product: Dict) -> str:
+    """Agent reply in the shape of get_product_details_tool output"""
+    return (
+        f"**{product['name']}**\n\n**Price:** ${product['price']}\n**Brand:** {product['brand']}\n"
+        f"**Rating:** {product['rating']}/5\n**Category:** {product['category']}\n"
+        f"**Description:** {product['description']}\n**Features:** {', '.join(product['features'])}\n"
+        f"**In Stock:** Yes\n\nIt's a solid choice in your price range."
+    )
+
+
+def script(turns: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """(user message, agent reply) pairs for a deterministic session"""
+    rng = random.Random(seed)
+    catalog = [make_product(i, rng) for i in range(200)]
+    session = []
+    shown: List[Dict] = []
+    for turn in range(turns):
+        kind = turn % 4
+        if kind == 0 or not shown:
+            noun = rng.choice(NOUNS).lower()
+            budget = rng.choice((50, 100, 200, 300))
+            shown = rng.sample(catalog, 5)
+            session.append((f"I'm looking for {noun}, budget is ${budget}", search_reply(shown)))
+        elif kind == 1:
+            product = rng.choice(shown)
+            session.append((f"Tell me more about product {product['id']}", details_reply(product)))
+        elif kind == 2:
+            first, second = rng.sample(shown, 2)
+            session.append((
+                f"Compare product {first['id']} and product {second['id']}",
+                details_reply(first) + "\n\n" + details_reply(second),
+            ))
+        else:
+            product = rng.choice(shown)
+            session.append((
+                f"Order product {product['id']}",
+                f"🎉 **Order placed successfully!**\n\n**Order ID:** order-{turn}\n"
+                f"**Total Amount:** ${product['price']}\n**Status:** confirmed",
+            ))
+    return session
+
+
+def replay(memory, session: List[Tuple[str, str]]) -> List[int]:
+    """Prompt tokens contributed by memory plus the new input, per turn"""
+    per_turn = []
+    for message, reply in session:
+        history = memory.load_memory_variables({"input": message})[memory.memory_key]
+        per_turn.append(sum(message_tokens(m) for m in history) + message_tokens(HumanMessage(content=message)))
+        memory.save_context({"input": message}, {"output": reply})
+    return per_turn
+
+
+def summarize(per_turn: List[int]) -> dict:
+    return {
+        "first": per_turn[0],
+        "last": per_turn[-1],
+        "max": max(per_turn),
+        "mean": round(sum(per_turn) / len(per_turn), 1),
+        "total": sum(per_turn),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--per-turn", action="store_true", help="include every turn's token count")
+    args = parser.parse_args()
+
+    session = script(args.turns)
+    buffer = replay(ConversationBufferMemory(memory_key="chat_history", return_messages=True), session)
+    budget_memory = TokenBudgetMemory(max_token_limit=args.budget, return_messages=True)
+    budgeted = replay(budget_memory, session)
+
+    report = {
+        "turns": args.turns,
+        "budget": args.budget,
+        "tokenizer": "tiktoken" if _encoding() is not None else "estimate (4 chars/token)",
+        "buffer_memory": summarize(buffer),
+        "token_budget_memory": summarize(budgeted),
+        "final_facts": budget_memory.facts_message().content if budget_memory.facts_message() else None,
+    }
+    if args.per_turn:
+        report["per_turn"] = {"buffer_memory": buffer, "token_budget_memory": budgeted}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
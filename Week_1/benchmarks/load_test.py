@@ -0,0 +1,276 @@
+"""
+Load test for the mock e-commerce APIs.
+
+Seeds mock_apis with a synthetic catalog, users and orders, then drives every
+endpoint (mixed-filter search, product detail, facets, checkout, order
+history) from concurrent async workers and prints throughput and latency
+percentiles per endpoint as JSON, so runs can be diffed for regressions.
+
+The app is exercised in-process through httpx's ASGI transport by default,
+or through a real local uvicorn server with --transport uvicorn.
+
+    python -m benchmarks.load_test --products 100000 --concurrency 64 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.synthetic import CATEGORIES, NOUNS, iter_orders, iter_products, iter_users
+
+# Relative frequency of each request kind
+DEFAULT_MIX = {
+    "search": 50,
+    "product_detail": 25,
+    "facets": 5,
+    "checkout": 10,
+    "order_history": 10,
+}
+
+
+def seed(products: int, users: int, orders: int):
+    """Import mock_apis and fill it with synthetic data; returns the module"""
+    import mock_apis
+
+    batch = []
+    for product in iter_products(products):
+        batch.append(product)
+        if len(batch) == 10000:
+            mock_apis.catalog.upsert_many(batch)
+            batch = []
+    if batch:
+        mock_apis.catalog.upsert_many(batch)
+
+    for user in iter_users(users):
+        mock_apis.users_db[user["id"]] = user
+    for order in iter_orders(orders, user_count=users, product_count=products):
+        mock_apis.order_repository.add(order)
+    return mock_apis
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Workload:
+    """Builds randomized requests for each endpoint"""
+
+    def __init__(self, products: int, users: int, rng: random.Random):
+        self.products = products
+        self.users = users
+        self.rng = rng
+
+    def user_id(self) -> str:
+        return f"user{self.rng.randrange(self.users)}"
+
+    def product_id(self) -> str:
+        return str(self.rng.randint(1, self.products))
+
+    def search_params(self) -> Dict:
+        rng = self.rng
+        params = {"limit": rng.choice([5, 10, 20])}
+        if rng.random() < 0.6:
+            params["query"] = rng.choice(NOUNS).split()[0].lower()
+        if rng.random() < 0.4:
+            params["category"] = rng.choice(CATEGORIES)
+        if rng.random() < 0.3:
+            params["min_price"] = rng.choice([10, 25, 50])
+        if rng.random() < 0.4:
+            params["max_price"] = rng.choice([50, 100, 200])
+        if rng.random() < 0.1:
+            params["brand"] = f"Brand{rng.randrange(500)}"
+        if rng.random() < 0.5:
+            params["sort"] = rng.choice(["relevance", "price", "-rating"])
+        if rng.random() < 0.5:
+            params["fields"] = "id,name,price,brand,rating"
+        return params
+
+    async def search(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/api/products", params=self.search_params())
+
+    async def product_detail(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/api/products/{self.product_id()}")
+
+    async def facets(self, client: httpx.AsyncClient) -> httpx.Response:
+        params = self.search_params()
+        for key in ("limit", "sort", "fields"):
+            params.pop(key, None)
+        return await client.get("/api/products/facets", params=params)
+
+    async def checkout(self, client: httpx.AsyncClient) -> httpx.Response:
+        items = [
+            {"product_id": self.product_id(), "quantity": 1}
+            for _ in range(self.rng.randint(1, 3))
+        ]
+        return await client.post("/api/checkout", json={"user_id": self.user_id(), "items": items})
+
+    async def order_history(self, client: httpx.AsyncClient) -> httpx.Response:
+        response = await client.get(f"/api/orders/user/{self.user_id()}", params={"limit": 10})
+        cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if cursor and self.rng.random() < 0.3:
+            response = await client.get(f"/api/orders/user/{self.user_id()}", params={"limit": 10, "cursor": cursor})
+        return response
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    max_requests: int,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Run workers until the duration or request budget is spent"""
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors: Dict[str, int] = {kind: 0 for kind in kinds}
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal issued
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            kind = workload.rng.choices(kinds, weights)[0]
+            request: Callable = getattr(workload, kind)
+            start = time.perf_counter()
+            try:
+                response = await request(client)
+                # 409 (sold out) is an expected checkout outcome under load
+                failed = response.status_code >= 400 and response.status_code != 409
+            except httpx.HTTPError:
+                failed = True
+            latencies[kind].append(time.perf_counter() - start)
+            if failed:
+                errors[kind] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict:
+    endpoints = {}
+    everything: List[float] = []
+    for kind, values in latencies.items():
+        values = sorted(values)
+        everything.extend(values)
+        endpoints[kind] = {
+            "requests": len(values),
+            "errors": errors[kind],
+            "throughput_rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        }
+    everything.sort()
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total": {
+            "requests": len(everything),
+            "errors": sum(errors.values()),
+            "throughput_rps": round(len(everything) / elapsed, 1),
+            "p50_ms": round(percentile(everything, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(everything, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(everything, 0.99) * 1000, 3),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def start_uvicorn(app, port: int):
+    """Serve `app` from a background thread and return the server"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def main_async(args) -> Dict:
+    seed_start = time.perf_counter()
+    mock_apis = seed(args.products, args.users, args.orders)
+    seed_seconds = time.perf_counter() - seed_start
+
+    mix = dict(DEFAULT_MIX)
+    for entry in args.mix or []:
+        kind, _, weight = entry.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown request kind in --mix: {kind}")
+        mix[kind] = int(weight)
+    mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+
+    server = None
+    if args.transport == "uvicorn":
+        server, thread = start_uvicorn(mock_apis.app, args.port)
+        client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        )
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_apis.app), base_url="http://mock-apis")
+
+    workload = Workload(args.products, args.users, random.Random(args.seed))
+    try:
+        async with client:
+            latencies, errors, elapsed = await run_load(
+                client, workload, mix, args.concurrency, args.duration, args.requests
+            )
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+
+    report = summarize(latencies, errors, elapsed)
+    report["config"] = {
+        "transport": args.transport,
+        "products": args.products,
+        "users": args.users,
+        "orders": args.orders,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "seed_seconds": round(seed_seconds, 3),
+    }
+    report["response_cache"] = mock_apis.response_cache.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--mix", nargs="*", help="override request weights, e.g. search=80 checkout=0")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
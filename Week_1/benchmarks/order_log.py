@@ -0,0 +1,96 @@
+"""
+Benchmark for the durable order log.
+
+Measures how long LogOrderRepository takes to replay a log of N orders at
+startup, and checkout-style write throughput with concurrent writers sharing
+group commits. Prints a JSON report.
+
+    python -m benchmarks.order_log --orders 10000000 --writers 32
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from itertools import islice
+
+from benchmarks.synthetic import iter_orders
+from order_store import LogOrderRepository
+
+
+def write_log(path: str, count: int) -> int:
+    """Write `count` synthetic orders straight to a log file and return its size"""
+    with open(path, "w", encoding="utf-8") as f:
+        for order in iter_orders(count):
+            f.write(json.dumps(order))
+            f.write("\n")
+    return os.path.getsize(path)
+
+
+def bench_replay(path: str, count: int) -> dict:
+    size = write_log(path, count)
+    start = time.perf_counter()
+    repository = LogOrderRepository(path)
+    elapsed = time.perf_counter() - start
+    assert len(repository) == count
+    repository.close()
+    return {
+        "orders": count,
+        "log_bytes": size,
+        "startup_seconds": round(elapsed, 3),
+        "orders_per_second": round(count / elapsed),
+    }
+
+
+def bench_group_commit(path: str, writers: int, orders_per_writer: int, fsync: bool) -> dict:
+    repository = LogOrderRepository(path, fsync=fsync)
+    orders = list(iter_orders(writers * orders_per_writer, seed=7))
+
+    def write(chunk):
+        for order in chunk:
+            repository.add(order)
+
+    threads = [
+        threading.Thread(target=write, args=(list(islice(orders, i * orders_per_writer, (i + 1) * orders_per_writer)),))
+        for i in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    repository.close()
+    return {
+        "writers": writers,
+        "orders": len(orders),
+        "fsync": fsync,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(len(orders) / elapsed),
+        "commits": repository.commits,
+        "orders_per_commit": round(repository.committed_orders / repository.commits, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000_000, help="orders in the replayed log")
+    parser.add_argument("--writers", type=int, default=32, help="concurrent writer threads")
+    parser.add_argument("--orders-per-writer", type=int, default=200)
+    parser.add_argument("--no-fsync", action="store_true", help="skip fsync in the write benchmark")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {
+            "replay": bench_replay(os.path.join(tmp, "replay.log"), args.orders),
+            "group_commit": bench_group_commit(
+                os.path.join(tmp, "writes.log"), args.writers, args.orders_per_writer, not args.no_fsync
+            ),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for multi-tool agent steps.
+
+A scripted agent asks for N product lookups in one step (as the model does
+when comparing products), each tool call taking --latency seconds. Compares
+how long the step takes under AgentExecutor and ParallelAgentExecutor, sync
+and async. Prints a JSON report.
+
+    python -m benchmarks.parallel_tools --calls 3 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, List, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.agent import BaseMultiActionAgent
+from langchain.tools import StructuredTool
+from langchain_core.agents import AgentAction, AgentFinish
+
+from parallel_executor import ParallelAgentExecutor
+
+
+class ScriptedAgent(BaseMultiActionAgent):
+    """Requests `calls` product lookups in its first step, then finishes"""
+
+    calls: int = 3
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["input"]
+
+    def plan(self, intermediate_steps: List[Tuple[AgentAction, str]], callbacks: Any = None, **kwargs: Any) -> Union[List[AgentAction], AgentFinish]:
+        if intermediate_steps:
+            return AgentFinish({"output": [observation for _, observation in intermediate_steps]}, "")
+        return [AgentAction("get_product_details_tool", {"product_id": str(i)}, "") for i in range(self.calls)]
+
+    async def aplan(self, intermediate_steps: List[Tuple[AgentAction, str]], callbacks: Any = None, **kwargs: Any) -> Union[List[AgentAction], AgentFinish]:
+        return self.plan(intermediate_steps, callbacks, **kwargs)
+
+
+def make_tool(latency: float) -> StructuredTool:
+    def get_product_details_tool(product_id: str) -> str:
+        """Get detailed information about a specific product by its ID."""
+        time.sleep(latency)
+        return f"product {product_id}"
+
+    async def aget_product_details_tool(product_id: str) -> str:
+        await asyncio.sleep(latency)
+        return f"product {product_id}"
+
+    return StructuredTool.from_function(
+        func=get_product_details_tool,
+        coroutine=aget_product_details_tool,
+        name="get_product_details_tool"
+    )
+
+
+def timed(executor: AgentExecutor, mode: str) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    if mode == "sync":
+        output = executor.invoke({"input": "compare"})["output"]
+    else:
+        output = asyncio.run(executor.ainvoke({"input": "compare"}))["output"]
+    return time.perf_counter() - start, output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    agent = ScriptedAgent(calls=args.calls)
+    tools = [make_tool(args.latency)]
+    expected = [f"product {i}" for i in range(args.calls)]
+
+    report = {"calls": args.calls, "tool_latency_s": args.latency, "max_parallel": args.max_parallel}
+    for name, executor in (
+        ("sequential", AgentExecutor(agent=agent, tools=tools)),
+        ("parallel", ParallelAgentExecutor(agent=agent, tools=tools, max_parallel_tools=args.max_parallel)),
+    ):
+        for mode in ("sync", "async"):
+            elapsed, output = timed(executor, mode)
+            assert output == expected, output
+            report[f"{name}_{mode}_s"] = round(elapsed, 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark for the agent's HTTP failure handling.
+
+Serves a stub product API from a local uvicorn server and runs the
+get_product_details_tool against it in four scenarios:
+
+- slow: every request hangs for --hang seconds
+- flaky: the first attempt at every product returns 503
+- down: nothing listens on the product API's port
+- recovery: the slow backend becomes healthy again after the breaker opened
+
+For each, reports per-call latency, how many calls succeeded, the
+observation the model would see, and the ApiClient's breaker metrics.
+Prints a JSON report, then checks it against what the retry policy and
+breaker settings imply: when the breaker opens and closes, how many
+requests, retries, timeouts and short circuits each scenario produces, and
+that timed-out and short-circuited calls return in bounded time. Exits
+non-zero if any check fails.
+
+    python -m benchmarks.resilience --calls 20 --timeout 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, HTTPException
+
+from benchmarks.load_test import percentile, start_uvicorn
+
+# The tools are built without a model; the key only has to exist
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from api_client import ApiClient
+from resilience import MAX_BACKOFF, CircuitBreaker, RetryPolicy
+from shopping_agent import ShoppingTools
+from tool_cache import ToolResultCache
+from tool_output import ProductRecord, render
+
+stub = FastAPI()
+stub_state = {"mode": "ok", "hang": 30.0, "attempts": {}}
+
+UNAVAILABLE = "Sorry, I couldn't get product details. Error: products service unavailable, try again later"
+RETRY_BACKOFF = 0.05
+# A short-circuited call never reaches the network
+FAIL_FAST_MS = 50
+
+
+@stub.get("/api/products/{product_id}")
+async def stub_product(product_id: str):
+    attempts = stub_state["attempts"]
+    attempts[product_id] = attempts.get(product_id, 0) + 1
+    if stub_state["mode"] == "slow":
+        await asyncio.sleep(stub_state["hang"])
+    elif stub_state["mode"] == "flaky" and attempts[product_id] == 1:
+        raise HTTPException(status_code=503, detail="try again")
+    return {
+        "id": product_id, "name": f"Product {product_id}", "price": 10.0, "brand": "Stub", "rating": 4.0,
+        "category": "test", "description": "Stub product", "features": [], "in_stock": True,
+    }
+
+
+async def run_calls(tools: ShoppingTools, calls: int, prefix: str) -> dict:
+    latencies: List[float] = []
+    succeeded = 0
+    observations: Dict[str, int] = {}
+    for i in range(calls):
+        start = time.perf_counter()
+        record = await tools.aget_product_details_tool(f"{prefix}{i}")
+        latencies.append(time.perf_counter() - start)
+        if isinstance(record, ProductRecord):
+            succeeded += 1
+        else:
+            observation = render(record, 60)
+            observations[observation] = observations.get(observation, 0) + 1
+    ordered = sorted(latencies)
+    return {
+        "calls": calls,
+        "succeeded": succeeded,
+        "first_call_ms": round(latencies[0] * 1000, 1),
+        "last_call_ms": round(latencies[-1] * 1000, 1),
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+        "total_s": round(sum(latencies), 2),
+        "observations": observations,
+    }
+
+
+def make_tools(port: int, timeout: float, retries: int, reset_timeout: float, failures: int) -> ShoppingTools:
+    os.environ["PRODUCT_API_BASE_URL"] = f"http://127.0.0.1:{port}/api/products"
+    os.environ["PRODUCT_API_TIMEOUT"] = str(timeout)
+    api = ApiClient(
+        retry=RetryPolicy(retries=retries, backoff=RETRY_BACKOFF),
+        breaker_factory=lambda name: CircuitBreaker(name, failure_threshold=failures, reset_timeout=reset_timeout),
+    )
+    tools = ShoppingTools(api=api, tool_cache=ToolResultCache())
+    # BACKEND_TIMEOUTS is read at import; apply this run's timeout
+    api.add_backend("products", tools.product_api_url, timeout)
+    return tools
+
+
+async def scenario(name: str, tools: ShoppingTools, calls: int) -> dict:
+    result = await run_calls(tools, calls, f"{name}-")
+    result["breaker"] = tools.api.stats()["backends"].get("products")
+    return result
+
+
+def until_open(calls: int, failures: int, retries: int) -> dict:
+    """Breaker counters after `calls` calls against a backend that fails every attempt
+
+    Each call makes up to retries + 1 attempts. The attempt that reaches the
+    failure threshold opens the breaker; a retry scheduled after it, and
+    every later call, is short-circuited.
+    """
+    attempts = retries + 1
+    full_calls = (failures - 1) // attempts
+    last = failures - full_calls * attempts
+    return {
+        "state": "open",
+        "requests": failures,
+        "failures": failures,
+        "retries": full_calls * retries + min(last, retries),
+        "short_circuited": calls - full_calls - 1 + (1 if last <= retries else 0),
+        "opened": 1,
+    }
+
+
+def check(report: dict, args) -> List[str]:
+    """What in the report contradicts the configured timeouts, retries and breaker"""
+    problems: List[str] = []
+
+    def expect(scenario: str, field: str, actual, expected) -> None:
+        if actual != expected:
+            problems.append(f"{scenario}: {field} is {actual}, expected {expected}")
+
+    def expect_breaker(scenario: str, expected: dict) -> None:
+        breaker = report[scenario]["breaker"]
+        for field, value in expected.items():
+            expect(scenario, f"breaker {field}", breaker[field], value)
+
+    calls, failures, retries = args.calls, args.failures, args.retries
+    opened = until_open(calls, failures, retries)
+    # Longest a call may take while the backend hangs: every attempt times out, plus the backoffs
+    backoff = sum(min(MAX_BACKOFF, RETRY_BACKOFF * 2 ** attempt) for attempt in range(retries))
+    slowest_ms = ((retries + 1) * args.timeout + backoff) * 1000 + 500
+
+    for scenario, timeouts in (("slow", failures), ("down", 0)):
+        result = report[scenario]
+        expect(scenario, "succeeded", result["succeeded"], 0)
+        expect(scenario, "observations", result["observations"], {UNAVAILABLE: calls})
+        expect_breaker(scenario, {**opened, "timeouts": timeouts})
+        if result["last_call_ms"] > FAIL_FAST_MS:
+            problems.append(f"{scenario}: calls after the breaker opened took {result['last_call_ms']} ms, not failing fast")
+    if report["slow"]["max_ms"] > slowest_ms:
+        problems.append(f"slow: a call took {report['slow']['max_ms']} ms, longer than the timeouts allow ({slowest_ms:.0f} ms)")
+
+    # One 503 per product, absorbed by a retry
+    expect("flaky", "succeeded", report["flaky"]["succeeded"], calls if retries else 0)
+    if retries:
+        expect_breaker("flaky", {"state": "closed", "requests": 2 * calls, "failures": calls, "retries": calls, "opened": 0})
+    expect("flaky_without_retries", "succeeded", report["flaky_without_retries"]["succeeded"], 0)
+    expect_breaker("flaky_without_retries", until_open(calls, failures, 0))
+
+    # After the reset timeout one trial call closes the breaker and everything succeeds
+    expect("recovery", "succeeded", report["recovery"]["succeeded"], calls)
+    expect_breaker("recovery", {
+        "state": "closed",
+        "requests": failures + calls,
+        "failures": failures,
+        "short_circuited": opened["short_circuited"],
+        "opened": 1,
+    })
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=0.5, help="product API read timeout")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--hang", type=float, default=30.0, help="how long the slow backend takes to answer")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="seconds before an open breaker tries again")
+    parser.add_argument("--failures", type=int, default=5, help="consecutive failures that open the breaker")
+    parser.add_argument("--port", type=int, default=8793)
+    parser.add_argument("--dead-port", type=int, default=8794, help="a port nothing listens on")
+    args = parser.parse_args()
+    if args.calls * (args.retries + 1) <= args.failures or args.calls <= args.failures:
+        parser.error("--calls must be large enough for every failing scenario to open the breaker")
+    if args.hang <= args.timeout:
+        parser.error("--hang must exceed --timeout")
+
+    server, _ = start_uvicorn(stub, args.port)
+    stub_state["hang"] = args.hang
+    report = {"timeout_s": args.timeout, "retries": args.retries, "hang_s": args.hang, "breaker_failures": args.failures}
+    try:
+        stub_state["mode"] = "slow"
+        slow_tools = make_tools(args.port, args.timeout, args.retries, args.reset_timeout, args.failures)
+        report["slow"] = asyncio.run(scenario("slow", slow_tools, args.calls))
+
+        stub_state["mode"] = "flaky"
+        report["flaky"] = asyncio.run(scenario("flaky", make_tools(args.port, args.timeout, args.retries, args.reset_timeout, args.failures), args.calls))
+        report["flaky_without_retries"] = asyncio.run(scenario("flaky0", make_tools(args.port, args.timeout, 0, args.reset_timeout, args.failures), args.calls))
+
+        report["down"] = asyncio.run(scenario("down", make_tools(args.dead_port, args.timeout, args.retries, args.reset_timeout, args.failures), args.calls))
+
+        # The slow backend's breaker is open by now; heal it and wait out the reset timeout
+        stub_state["mode"] = "ok"
+        time.sleep(args.reset_timeout)
+        report["recovery"] = asyncio.run(scenario("recovery", slow_tools, args.calls))
+    finally:
+        server.should_exit = True
+    print(json.dumps(report, indent=2))
+
+    problems = check(report, args)
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+    print("all resilience checks passed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
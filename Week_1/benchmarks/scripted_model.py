@@ -0,0 +1,122 @@
+"""
+Scripted chat model for running the agent offline.
+
+Stands in for ChatOpenAI in benchmarks. It answers from a script keyed by
+the user's message: each entry is a list of steps, where a step is either a
+list of tool calls ({"name": ..., "args": {...}}) or the final answer text.
+The model works out which step it is on from the prompt itself (how many
+model replies follow the latest user message), so the same script gives the
+same run every time and several sessions can share one model.
+
+Latency is simulated: `latency` seconds before the reply starts, then
+`token_delay` seconds per streamed token of an answer.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+Step = Union[str, List[Dict[str, Any]]]
+
+
+def tool_call(name: str, **args: Any) -> Dict[str, Any]:
+    """One scripted tool call"""
+    return {"name": name, "args": args}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replies from a fixed script: tool calls for the user's message, then an answer"""
+
+    script: Dict[str, List[Step]] = {}
+    default_reply: str = "Happy to help with that."
+    latency: float = 0.5
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next_step(self, messages: List[BaseMessage]) -> Step:
+        turn = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=-1)
+        user_message = messages[turn].content if turn >= 0 else ""
+        steps = self.script.get(user_message) or [self.default_reply]
+        step = sum(isinstance(message, AIMessage) for message in messages[turn + 1:])
+        if step < len(steps):
+            return steps[step]
+        # Ran out of script (e.g. a tool failed and the agent went round again)
+        return steps[-1] if isinstance(steps[-1], str) else self.default_reply
+
+    @staticmethod
+    def _tool_calls(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "index": i,
+                "id": f"call_{i}_{call['name']}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["args"])},
+            }
+            for i, call in enumerate(calls)
+        ]
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return re.findall(r"\s*\S+", text) or [text]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        step = self._next_step(messages)
+        if isinstance(step, str):
+            time.sleep(self.latency + self.token_delay * len(self._tokens(step)))
+            message = AIMessage(content=step)
+        else:
+            time.sleep(self.latency)
+            message = AIMessage(content="", additional_kwargs={"tool_calls": self._tool_calls(step)})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        step = self._next_step(messages)
+        if isinstance(step, str):
+            await asyncio.sleep(self.latency + self.token_delay * len(self._tokens(step)))
+            message = AIMessage(content=step)
+        else:
+            await asyncio.sleep(self.latency)
+            message = AIMessage(content="", additional_kwargs={"tool_calls": self._tool_calls(step)})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        step = self._next_step(messages)
+        await asyncio.sleep(self.latency)
+        if not isinstance(step, str):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", additional_kwargs={"tool_calls": self._tool_calls(step)}))
+            return
+        for i, token in enumerate(self._tokens(step)):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            yield chunk
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
@@ -0,0 +1,66 @@
+"""
+Benchmark for per-session agents.
+
+Builds N sessions through SessionManager (shared LLM client, prompt, tools
+and HTTP pool) and N fully independent agents the way the web interface
+used to (one AgentResources each), and reports the traced heap growth and
+construction time per session. No model calls are made.
+
+    python -m benchmarks.sessions --sessions 2000
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+# The OpenAI client is constructed but never called
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from session_manager import SessionManager
+from shopping_agent import AgentResources, ShoppingAgent
+
+
+def measure(build, count: int) -> dict:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    keep = build(count)
+    elapsed = time.perf_counter() - start
+    grown = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del keep
+    return {
+        "bytes_per_session": grown // count,
+        "ms_per_session": round(elapsed / count * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--independent", type=int, default=200, help="independent agents to build for comparison")
+    args = parser.parse_args()
+
+    resources = AgentResources()
+
+    def shared(count: int) -> SessionManager:
+        manager = SessionManager(resources, max_sessions=count)
+        for i in range(count):
+            manager.get(f"session{i}")
+        return manager
+
+    def independent(count: int) -> list:
+        return [ShoppingAgent(AgentResources()) for _ in range(count)]
+
+    report = {
+        "sessions": args.sessions,
+        "shared_resources": measure(shared, args.sessions),
+        "independent_agents": measure(independent, args.independent),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
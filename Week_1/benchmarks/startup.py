@@ -0,0 +1,129 @@
+"""
+Benchmark for startup cost.
+
+Two measurements, each in fresh interpreters:
+
+- import: `python -X importtime -c "import <module>"` for shopping_agent and
+  web_interface, with the total and the heaviest direct imports
+- cold start: launches `uvicorn web_interface:app` against an in-process
+  mock_apis server and times, from process spawn, when /health first
+  answers and when the first chat response arrives (a routed request, so no
+  model call is involved). Runs with and without AGENT_PREWARM.
+
+Prints a JSON report.
+
+    python -m benchmarks.startup --runs 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import start_uvicorn
+
+WEEK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str, env: Dict[str, str], top: int) -> dict:
+    """Total import time of `module` and its heaviest direct imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WEEK_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # One space after the separator, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if name == module and depth == 0:
+            total_us = int(cumulative_us)
+        elif depth == 1:
+            children.append((int(cumulative_us), name))
+    children.sort(reverse=True)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "heaviest_ms": {name: round(us / 1000, 1) for us, name in children[:top]},
+    }
+
+
+def cold_start(port: int, env: Dict[str, str], timeout: float) -> dict:
+    """Seconds from spawning uvicorn to the first /health and first /chat responses"""
+    spawned = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "web_interface:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=WEEK_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            while True:
+                if time.monotonic() - spawned > timeout:
+                    raise SystemExit("web_interface did not start in time")
+                try:
+                    client.get("/health").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.02)
+            health = time.monotonic() - spawned
+            client.post("/chat", json={"user_id": "user123", "message": "details for product 1"}).raise_for_status()
+            first_response = time.monotonic() - spawned
+            server_metrics = client.get("/startup/stats").json()
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_s": health, "first_response_s": first_response, "server": server_metrics}
+
+
+def summarize(runs: List[dict]) -> dict:
+    return {
+        "health_s": round(statistics.median(run["health_s"] for run in runs), 3),
+        "first_response_s": round(statistics.median(run["first_response_s"] for run in runs), 3),
+        "server_import_s": round(statistics.median(run["server"]["import_seconds"] for run in runs), 3),
+        "server_agent_ready_s": round(statistics.median(run["server"]["agent_ready_seconds"] for run in runs), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list per module")
+    parser.add_argument("--api-port", type=int, default=8791)
+    parser.add_argument("--port", type=int, default=8792)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    import mock_apis
+
+    api_server, _ = start_uvicorn(mock_apis.app, args.api_port)
+    env = dict(os.environ)
+    # The routed request never reaches the model; the key only has to exist
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    for name, path in (("PRODUCT", "products"), ("USER", "users"), ("CHECKOUT", "checkout"), ("ORDER", "orders")):
+        env[f"{name}_API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}/api/{path}"
+
+    try:
+        report = {
+            "python": sys.version.split()[0],
+            "import": {module: import_profile(module, env, args.top) for module in ("shopping_agent", "web_interface")},
+            "cold_start": {},
+        }
+        for prewarm in ("true", "false"):
+            runs = [cold_start(args.port, {**env, "AGENT_PREWARM": prewarm}, args.timeout) for _ in range(args.runs)]
+            report["cold_start"][f"prewarm={prewarm}"] = summarize(runs)
+    finally:
+        api_server.should_exit = True
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for time to first token.
+
+Runs the shopping agent against a scripted model that takes --first-token
+seconds before it starts answering and --token-delay seconds per token
+after that, and compares when the shopper first sees output:
+
+- achat: nothing until the whole reply is ready
+- astream_chat: from the first streamed token
+
+Prints a JSON report.
+
+    python -m benchmarks.streaming --runs 20 --tokens 60
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from benchmarks.load_test import percentile
+from benchmarks.scripted_model import ScriptedChatModel
+from shopping_agent import AgentResources, ShoppingAgent
+
+
+async def measure(agent: ShoppingAgent, runs: int) -> dict:
+    blocking, first_token, streamed_total = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await agent.achat("what headphones do you have under $100?")
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        async for event in agent.astream_chat("what headphones do you have under $100?"):
+            if first is None and event["type"] in ("token", "done"):
+                first = time.perf_counter() - start
+        streamed_total.append(time.perf_counter() - start)
+        first_token.append(first)
+
+    def summary(samples: List[float]) -> dict:
+        samples = sorted(samples)
+        return {"p50_ms": round(percentile(samples, 0.5) * 1000, 1), "p95_ms": round(percentile(samples, 0.95) * 1000, 1)}
+
+    return {
+        "achat_first_output": summary(blocking),
+        "astream_chat_first_token": summary(first_token),
+        "astream_chat_complete": summary(streamed_total),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--first-token", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    model = ScriptedChatModel(
+        default_reply=" ".join(f"word{i}" for i in range(args.tokens)),
+        latency=args.first_token,
+        token_delay=args.token_delay,
+    )
+    agent = ShoppingAgent(AgentResources(llm=model))
+    agent.agent_executor.verbose = False
+
+    report = {
+        "runs": args.runs,
+        "tokens": args.tokens,
+        "first_token_delay_s": args.first_token,
+        "token_delay_s": args.token_delay,
+        **asyncio.run(measure(agent, args.runs)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
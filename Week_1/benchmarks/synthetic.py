@@ -0,0 +1,131 @@
+"""
+Deterministic synthetic catalog data for the benchmarks.
+"""
+
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+CATEGORIES = [
+    "electronics", "clothing", "footwear", "home", "kitchen", "sports", "toys",
+    "beauty", "books", "garden", "automotive", "office", "pets", "music",
+    "outdoors", "health", "jewelry", "baby", "tools", "grocery",
+]
+
+ADJECTIVES = [
+    "Wireless", "Smart", "Organic", "Lightweight", "Premium", "Compact", "Classic",
+    "Portable", "Ergonomic", "Waterproof", "Vintage", "Deluxe", "Eco", "Pro", "Ultra",
+]
+
+NOUNS = [
+    "Headphones", "Watch", "T-Shirt", "Running Shoes", "Blender", "Backpack", "Lamp",
+    "Speaker", "Jacket", "Kettle", "Yoga Mat", "Keyboard", "Sunglasses", "Drill", "Camera",
+]
+
+FEATURES = [
+    "Bluetooth 5.0", "Noise Cancellation", "30-hour battery", "Heart Rate Monitor", "GPS",
+    "Water Resistant", "100% Organic", "Breathable", "Multiple Colors", "Cushioned",
+    "Fast Charging", "Dishwasher Safe", "Recycled Materials", "2-year warranty", "Foldable",
+]
+
+DESCRIPTION_TEMPLATES = [
+    "High-quality {noun} with {feature} and {feature2}",
+    "Comfortable {adjective} {noun} designed for everyday use",
+    "Professional {noun} featuring {feature}",
+    "Affordable {adjective} {noun} with {feature} for the whole family",
+]
+
+
+def make_product(index: int, rng: random.Random, brand_count: int = 500) -> Dict[str, Any]:
+    """Build one synthetic product in the mock_apis product shape"""
+    adjective = rng.choice(ADJECTIVES)
+    noun = rng.choice(NOUNS)
+    features = rng.sample(FEATURES, 3)
+    description = rng.choice(DESCRIPTION_TEMPLATES).format(
+        noun=noun.lower(), adjective=adjective.lower(), feature=features[0].lower(), feature2=features[1].lower()
+    )
+    return {
+        "id": str(index),
+        "name": f"{adjective} {noun} {index % 1000}",
+        "category": rng.choice(CATEGORIES),
+        "price": round(rng.uniform(5, 500), 2),
+        "brand": f"Brand{rng.randrange(brand_count)}",
+        "rating": round(rng.uniform(1, 5), 1),
+        "description": description,
+        "features": features,
+        "stock": rng.randrange(1, 200) if rng.random() < 0.9 else 0,
+    }
+
+
+def iter_products(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield `count` synthetic products, the same ones for the same seed"""
+    rng = random.Random(seed)
+    for index in range(1, count + 1):
+        yield make_product(index, rng)
+
+
+def write_catalog_jsonl(path: Union[str, Path], count: int, seed: int = 42) -> Path:
+    """Write a synthetic catalog as JSON Lines and return its path"""
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as f:
+        for product in iter_products(count, seed):
+            f.write(json.dumps(product))
+            f.write("\n")
+    return path
+
+
+def make_user(index: int, rng: random.Random) -> Dict[str, Any]:
+    """Build one synthetic user in the mock_apis user shape"""
+    budget_min = rng.choice([0, 25, 50, 100])
+    return {
+        "id": f"user{index}",
+        "name": f"Shopper {index}",
+        "preferences": {
+            "categories": rng.sample(CATEGORIES, 2),
+            "budget_range": {"min": budget_min, "max": budget_min + rng.choice([100, 200, 500])},
+            "brands": [],
+        },
+        "purchase_history": [],
+    }
+
+
+def iter_users(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield `count` synthetic users with ids user0..user{count-1}"""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield make_user(index, rng)
+
+
+def make_order(index: int, rng: random.Random, user_count: int, product_count: int, start: datetime) -> Dict[str, Any]:
+    """Build one synthetic order in the mock_apis order shape"""
+    lines = []
+    for _ in range(rng.randint(1, 3)):
+        quantity = rng.randint(1, 3)
+        unit_price = round(rng.uniform(5, 500), 2)
+        lines.append({
+            "product_id": str(rng.randint(1, product_count)),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "line_total": round(unit_price * quantity, 2),
+        })
+    return {
+        "order_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "user_id": f"user{rng.randrange(user_count)}",
+        "product_id": lines[0]["product_id"] if len(lines) == 1 else None,
+        "quantity": sum(line["quantity"] for line in lines),
+        "items": lines,
+        "total_amount": round(sum(line["line_total"] for line in lines), 2),
+        "status": "confirmed",
+        "created_at": (start + timedelta(seconds=index)).isoformat(),
+    }
+
+
+def iter_orders(count: int, user_count: int = 10000, product_count: int = 1000, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield `count` synthetic orders in created_at order"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for index in range(count):
+        yield make_order(index, rng, user_count, product_count, start)
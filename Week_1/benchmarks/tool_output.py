@@ -0,0 +1,169 @@
+"""
+Benchmark for tool output size in the agent prompt.
+
+Replays a scripted session of tool calls (searches, product details, order
+history, order status, preferences) over synthetic catalog data and counts
+the tokens each tool result adds to the prompt, rendered the way the tools
+used to format it (markdown) and the compact way (tool_output.render).
+"Prompt tokens per turn" adds the user message and the tool schemas sent
+with every model call. Prints a JSON report.
+
+    python -m benchmarks.tool_output --turns 200
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_community.tools.convert_to_openai import format_tool_to_openai_tool
+
+from benchmarks.synthetic import NOUNS, make_order, make_product, make_user
+from shopping_agent import ShoppingTools
+from token_counting import _encoding, count_tokens
+from tool_output import OrderList, OrderRecord, ProductList, ProductRecord, ToolRecord, UserProfile, render, tool_budget
+
+
+# The markdown the tools produced before they returned records
+
+def markdown_search(data: Dict[str, Any]) -> str:
+    result = f"Found {data['count']} products:\n\n"
+    for i, product in enumerate(data["products"], 1):
+        result += f"{i}. **{product['name']}** - ${product['price']} (ID: {product['id']})\n"
+        result += f"   Brand: {product['brand']} | Rating: {product['rating']}/5\n"
+        result += f"   {product['description']}\n"
+        result += f"   Features: {', '.join(product['features'])}\n\n"
+    return result
+
+
+def markdown_details(product: Dict[str, Any]) -> str:
+    result = f"**{product['name']}**\n\n"
+    result += f"**Price:** ${product['price']}\n"
+    result += f"**Brand:** {product['brand']}\n"
+    result += f"**Rating:** {product['rating']}/5\n"
+    result += f"**Category:** {product['category']}\n"
+    result += f"**Description:** {product['description']}\n"
+    result += f"**Features:** {', '.join(product['features'])}\n"
+    result += f"**In Stock:** {'Yes' if product['in_stock'] else 'No'}\n"
+    return result
+
+
+def markdown_user(user: Dict[str, Any]) -> str:
+    preferences = user["preferences"]
+    budget = preferences["budget_range"]
+    result = f"**User Profile for {user['name']}**\n\n**Preferences:**\n"
+    result += f"- Preferred categories: {', '.join(preferences['categories'])}\n"
+    result += f"- Budget range: ${budget.get('min', 0)} - ${budget.get('max', 1000)}\n"
+    if preferences["brands"]:
+        result += f"- Preferred brands: {', '.join(preferences['brands'])}\n"
+    return result
+
+
+def markdown_order(order: Dict[str, Any]) -> str:
+    result = "**Order Status**\n\n"
+    result += f"**Order ID:** {order['order_id']}\n"
+    result += f"**Status:** {order['status']}\n"
+    result += f"**Total Amount:** ${order['total_amount']}\n"
+    result += f"**Order Date:** {order['created_at']}\n"
+    return result
+
+
+def markdown_orders(orders: List[Dict[str, Any]]) -> str:
+    result = "**Your Order History**\n\n"
+    for i, order in enumerate(orders, 1):
+        result += f"{i}. **Order ID:** {order['order_id']}\n"
+        result += f"   **Status:** {order['status']}\n"
+        result += f"   **Amount:** ${order['total_amount']}\n"
+        result += f"   **Date:** {order['created_at']}\n\n"
+    return result
+
+
+def script(turns: int, seed: int = 7) -> List[Tuple[str, str, str, ToolRecord]]:
+    """(user message, tool name, markdown output, record) per turn of a deterministic session"""
+    rng = random.Random(seed)
+    catalog = []
+    for index in range(500):
+        product = make_product(index, rng)
+        product["in_stock"] = product.pop("stock") > 0
+        catalog.append(product)
+    start = datetime(2024, 1, 1)
+    history = [make_order(index, rng, 1, len(catalog), start) for index in range(10)]
+    user = make_user(0, rng)
+
+    session = []
+    for turn in range(turns):
+        kind = turn % 5
+        if kind in (0, 1):
+            products = rng.sample(catalog, 5)
+            data = {"count": rng.randint(5, 200), "products": products}
+            record = ProductList(total=data["count"], products=[ProductRecord.from_api(p) for p in products])
+            session.append((f"show me {rng.choice(NOUNS).lower()}", "search_products_tool", markdown_search(data), record))
+        elif kind == 2:
+            product = rng.choice(catalog)
+            session.append((f"tell me about {product['name']}", "get_product_details_tool",
+                            markdown_details(product), ProductRecord.from_api(product)))
+        elif kind == 3:
+            session.append(("what did I order lately?", "get_user_orders_tool", markdown_orders(history),
+                            OrderList(orders=[OrderRecord.from_api(order) for order in history])))
+        else:
+            if turn % 2:
+                order = rng.choice(history)
+                session.append(("where is my last order?", "get_order_status_tool",
+                                markdown_order(order), OrderRecord.from_api(order)))
+            else:
+                session.append(("what do you know about me?", "get_user_preferences_tool",
+                                markdown_user(user), UserProfile.from_api(user)))
+    return session
+
+
+def summarize(values: List[int]) -> dict:
+    values = sorted(values)
+    return {"mean": round(sum(values) / len(values), 1), "max": values[-1], "total": sum(values)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    toolkit = ShoppingTools()
+    schema_tokens = count_tokens(json.dumps([format_tool_to_openai_tool(tool) for tool in toolkit.tools]))
+
+    markdown_tokens: List[int] = []
+    compact_tokens: List[int] = []
+    by_tool: Dict[str, Dict[str, List[int]]] = {}
+    prompt_markdown: List[int] = []
+    prompt_compact: List[int] = []
+    for message, tool_name, markdown, record in script(args.turns):
+        before = count_tokens(markdown)
+        after = count_tokens(render(record, tool_budget(tool_name)))
+        markdown_tokens.append(before)
+        compact_tokens.append(after)
+        tool = by_tool.setdefault(tool_name, {"markdown": [], "compact": []})
+        tool["markdown"].append(before)
+        tool["compact"].append(after)
+        fixed = schema_tokens + count_tokens(message)
+        prompt_markdown.append(fixed + before)
+        prompt_compact.append(fixed + after)
+
+    report = {
+        "turns": args.turns,
+        "tokenizer": "tiktoken" if _encoding() is not None else "estimate (4 chars/token)",
+        "tool_schema_tokens": schema_tokens,
+        "tool_output_tokens": {"markdown": summarize(markdown_tokens), "compact": summarize(compact_tokens)},
+        "prompt_tokens_per_turn": {"markdown": summarize(prompt_markdown), "compact": summarize(prompt_compact)},
+        "by_tool_mean": {
+            name: {style: round(sum(values) / len(values), 1) for style, values in styles.items()}
+            for name, styles in by_tool.items()
+        },
+        "output_reduction": round(1 - sum(compact_tokens) / sum(markdown_tokens), 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
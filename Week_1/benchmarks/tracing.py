@@ -0,0 +1,120 @@
+"""
+Benchmark for the cost of tracing.
+
+Two measurements, each with tracing off, on, and on with JSON-lines export:
+
+- span: nanoseconds per `with tracer.span(...)` block, with nothing inside
+- turn: mean latency of the scripted agent_e2e session turns, with the
+  model answering instantly (--model-latency 0) so the agent's own work is
+  all that is measured, against mock_apis served from this process
+
+Configurations are interleaved session by session so drift affects them
+alike. Prints a JSON report.
+
+    python -m benchmarks.tracing --sessions 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.agent_e2e import SESSION, USER_ID, build_model
+from benchmarks.load_test import start_uvicorn
+import tracing
+
+CONFIGS = ("off", "on", "on+export")
+
+
+def configure(config: str, path: str) -> None:
+    tracer = tracing.tracer
+    if tracer.exporter is not None:
+        tracer.exporter.close()
+    tracer.enabled = config != "off"
+    tracer.exporter = tracing.JsonLinesExporter(path) if config == "on+export" else None
+
+
+def span_cost(iterations: int) -> float:
+    """Nanoseconds per empty span block"""
+    tracer = tracing.tracer
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        with tracer.span("GET products", "http", url="http://127.0.0.1/api/products/1") as span:
+            span.set(status=200)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+async def session_turns(agent) -> List[float]:
+    agent.start_conversation(USER_ID)
+    latencies = []
+    for message, _ in SESSION:
+        start = time.perf_counter()
+        await agent.achat(message)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--spans", type=int, default=100000, help="iterations for the per-span measurement")
+    parser.add_argument("--model-latency", type=float, default=0.0)
+    parser.add_argument("--api-port", type=int, default=8790)
+    args = parser.parse_args()
+
+    export_path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+
+    report: Dict[str, dict] = {"span_ns": {}}
+    for config in CONFIGS:
+        configure(config, export_path)
+        span_cost(1000)
+        report["span_ns"][config] = round(span_cost(args.spans), 1)
+
+    import mock_apis
+
+    api_server, _ = start_uvicorn(mock_apis.app, args.api_port)
+    for name, path in (("PRODUCT", "products"), ("USER", "users"), ("CHECKOUT", "checkout"), ("ORDER", "orders")):
+        os.environ[f"{name}_API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}/api/{path}"
+
+    from shopping_agent import AgentResources, ShoppingAgent
+
+    # The model-call handler is attached when resources are built, so each configuration gets its own
+    resources = {}
+    for config in CONFIGS:
+        configure(config, export_path)
+        resources[config] = AgentResources(llm=build_model(args.model_latency, 0.0))
+
+    async def run() -> Dict[str, List[float]]:
+        turns: Dict[str, List[float]] = {config: [] for config in CONFIGS}
+        for session in range(args.sessions + 1):
+            for config in CONFIGS:
+                configure(config, export_path)
+                agent = ShoppingAgent(resources[config])
+                agent.agent_executor.verbose = False
+                latencies = await session_turns(agent)
+                # The first round warms the tool cache and connections
+                if session:
+                    turns[config].extend(latencies)
+        return turns
+
+    try:
+        turns = asyncio.run(run())
+    finally:
+        api_server.should_exit = True
+        configure("off", export_path)
+
+    means = {config: statistics.mean(samples) * 1000 for config, samples in turns.items()}
+    report["turn_mean_ms"] = {config: round(mean, 3) for config, mean in means.items()}
+    report["turn_p50_ms"] = {config: round(statistics.median(samples) * 1000, 3) for config, samples in turns.items()}
+    report["tracing_overhead_per_turn_ms"] = {
+        config: round(means[config] - means["off"], 3) for config in CONFIGS if config != "off"
+    }
+    print(json.dumps({"sessions": args.sessions, "turns_per_config": len(turns["off"]), **report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
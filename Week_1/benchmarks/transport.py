@@ -0,0 +1,138 @@
+"""
+Benchmark for tool-call latency per API transport.
+
+Calls the agent's tools against mock_apis two ways:
+
+- http: over loopback HTTP to a uvicorn server in this process
+- asgi: ApiClient(transport="asgi"), handing requests straight to the app
+
+The tool result cache is off (ttl=0), so every call reaches the API; ETag
+revalidation stays on, as in production. Each tool is timed sequentially,
+alternating transports tool by tool, then a mixed batch of reads is run with
+--concurrency calls in flight. The uvicorn server shares this process (and
+its GIL) with the client, so the http throughput is a lower bound for a
+separate API process. Prints a JSON report.
+
+    python -m benchmarks.transport --calls 300 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.load_test import percentile, start_uvicorn
+
+USER_ID = "user123"
+
+
+def tool_calls(tools, rng: random.Random) -> Dict[str, Callable[[], Awaitable]]:
+    """A no-argument call per tool, with arguments varied between calls"""
+    return {
+        "search_products_tool": lambda: tools.asearch_products_tool(
+            query=rng.choice(["", "wireless", "shoes", "shirt"]), max_price=rng.choice([None, 50, 100, 200])
+        ),
+        "get_product_details_tool": lambda: tools.aget_product_details_tool(str(rng.randint(1, 4))),
+        "get_search_facets_tool": lambda: tools.aget_search_facets_tool(query=rng.choice(["", "wireless"])),
+        "get_user_preferences_tool": lambda: tools.aget_user_preferences_tool(USER_ID),
+        "get_user_orders_tool": lambda: tools.aget_user_orders_tool(USER_ID),
+        "create_order_tool": lambda: tools.acreate_order_tool(USER_ID, str(rng.randint(1, 4))),
+    }
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+async def time_call(call, calls: int) -> dict:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+async def concurrent(by_tool: Dict[str, Callable[[], Awaitable]], calls: int, concurrency: int, rng: random.Random) -> dict:
+    """Mixed reads in flight together, as parallel tool calls and sessions produce"""
+    reads = [call for name, call in by_tool.items() if name != "create_order_tool"]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(call) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(rng.choice(reads)) for _ in range(calls * len(reads))))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "calls_per_s": round(len(latencies) / elapsed, 1), **summarize(latencies)}
+
+
+async def measure(toolkits: Dict[str, object], calls: int, concurrency: int) -> dict:
+    calls_by_transport = {transport: tool_calls(tools, random.Random(1)) for transport, tools in toolkits.items()}
+    for by_tool in calls_by_transport.values():
+        for call in by_tool.values():
+            await call()
+
+    # Tool by tool, alternating transports, so both see the same data (orders pile up)
+    report: Dict[str, dict] = {transport: {"sequential": {}} for transport in toolkits}
+    for name in calls_by_transport["http"]:
+        for transport, by_tool in calls_by_transport.items():
+            report[transport]["sequential"][name] = await time_call(by_tool[name], calls)
+    for transport, by_tool in calls_by_transport.items():
+        report[transport]["concurrent"] = await concurrent(by_tool, calls, concurrency, random.Random(2))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300, help="calls per tool")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--api-port", type=int, default=8789)
+    args = parser.parse_args()
+
+    import mock_apis
+
+    api_server, _ = start_uvicorn(mock_apis.app, args.api_port)
+    for name, path in (("PRODUCT", "products"), ("USER", "users"), ("CHECKOUT", "checkout"), ("ORDER", "orders")):
+        os.environ[f"{name}_API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}/api/{path}"
+
+    from api_client import ApiClient
+    from shopping_agent import ShoppingTools
+    from tool_cache import ToolResultCache
+
+    toolkits = {
+        transport: ShoppingTools(
+            api=ApiClient(transport=transport, app=mock_apis.app if transport == "asgi" else None),
+            tool_cache=ToolResultCache(ttl=0),
+        )
+        for transport in ("http", "asgi")
+    }
+    report = {"calls_per_tool": args.calls}
+    try:
+        report.update(asyncio.run(measure(toolkits, args.calls, args.concurrency)))
+    finally:
+        for tools in toolkits.values():
+            tools.api.close()
+        api_server.should_exit = True
+
+    report["asgi_speedup_p50"] = {
+        name: round(report["http"]["sequential"][name]["p50_ms"] / report["asgi"]["sequential"][name]["p50_ms"], 2)
+        for name in report["http"]["sequential"]
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Benchmark for concurrent chat turns through the web interface.
+
+Serves web_interface in this process (Starlette's TestClient, one event loop)
+with a ScriptedChatModel in place of OpenAI and mock_apis reached over the
+ASGI transport, then measures:
+
+- websocket: N clients, one thread each, send a message at the same time and
+  read until their reply is done; N lone turns' worth of time against the
+  wall time shows whether the turns overlapped (overlap ~N) or were
+  serialized (~1). Each N is run with the configured turn limit and with a
+  limit of 1
+- ordering: one client sends several messages back to back; the replies
+  must come back in the order they were asked
+- same_session: concurrent POST /chat calls for one session; the session's
+  lock must run them one at a time
+- health: /health latency while a batch of websocket turns is in flight
+- rest: N concurrent POST /chat calls, each its own session
+
+Prints a JSON report, then checks it: turns of different sessions overlap
+(and up to the limit run at once), a limit of 1 serializes them, a
+session's turns never overlap and answer in order, and /health stays fast.
+Exits non-zero if any check fails.
+
+    python -m benchmarks.websocket_concurrency --clients 1 4 16 --model-latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.load_test import percentile
+from benchmarks.scripted_model import ScriptedChatModel
+
+USER_ID = "user123"
+
+# Fraction of the ideal overlap (one lone turn's time for all N) concurrent turns must reach
+MIN_OVERLAP_EFFICIENCY = 0.5
+# Most a serialized run may overlap, allowing for timing noise
+MAX_SERIAL_OVERLAP = 1.3
+HEALTH_P50_MS = 50
+
+
+def set_turn_limit(web_interface, limit: int) -> None:
+    web_interface._turn_slots = asyncio.Semaphore(limit)
+    web_interface.turn_metrics["peak_running"] = 0
+
+
+def in_threads(count: int, target: Callable[[int], float]) -> List[float]:
+    """Run target(0..count-1) on their own threads, released together; their results"""
+    results: List[float] = [0.0] * count
+    barrier = threading.Barrier(count)
+
+    def run(i: int) -> None:
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def ask(websocket, message: str) -> dict:
+    websocket.send_text(json.dumps({"message": message, "user_id": USER_ID}))
+    return until_done(websocket)
+
+
+def until_done(websocket) -> dict:
+    while True:
+        event = json.loads(websocket.receive_text())
+        if event["type"] in ("done", "error"):
+            return event
+
+
+def websocket_turns(client, web_interface, clients: int, solo: float) -> dict:
+    def one(i: int) -> float:
+        with client.websocket_connect("/ws") as websocket:
+            start = time.perf_counter()
+            event = ask(websocket, f"client {i}: anything new?")
+            if event["type"] != "done":
+                raise SystemExit(f"turn failed: {event['response']}")
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    turns = in_threads(clients, one)
+    wall = time.perf_counter() - start
+    return {
+        "wall_s": round(wall, 3),
+        "turn_p50_s": round(percentile(sorted(turns), 0.5), 3),
+        "turn_max_s": round(max(turns), 3),
+        # ~clients when the turns overlapped, ~1 when they ran one after another
+        "overlap": round(clients * solo / wall, 2),
+        "peak_running": web_interface.turn_metrics["peak_running"],
+    }
+
+
+def ordering(client, messages: int) -> dict:
+    asked = [f"ordered question {i}" for i in range(messages)]
+    with client.websocket_connect("/ws") as websocket:
+        for message in asked:
+            websocket.send_text(json.dumps({"message": message, "user_id": USER_ID}))
+        replies = [until_done(websocket)["response"] for _ in asked]
+    expected = [f"Answer to {message}" for message in asked]
+    return {"messages": messages, "in_order": replies == expected, "replies": replies}
+
+
+def same_session(client, web_interface, messages: int, solo: float) -> dict:
+    web_interface.turn_metrics["peak_running"] = 0
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        response = client.post("/chat", json={"message": f"same session {i}: hello", "user_id": USER_ID, "session_id": "same-session"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    in_threads(messages, one)
+    wall = time.perf_counter() - start
+    return {
+        "messages": messages,
+        "wall_s": round(wall, 3),
+        "overlap": round(messages * solo / wall, 2),
+        "peak_running": web_interface.turn_metrics["peak_running"],
+    }
+
+
+def health_under_load(client, clients: int, model_latency: float) -> dict:
+    latencies: List[float] = []
+    done = threading.Event()
+
+    def chat(i: int) -> float:
+        with client.websocket_connect("/ws") as websocket:
+            ask(websocket, f"client {i}: still there?")
+        return 0.0
+
+    def probe() -> None:
+        # Give the turns a moment to start
+        time.sleep(model_latency / 4)
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/health").raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    try:
+        in_threads(clients, chat)
+    finally:
+        done.set()
+        prober.join()
+    ordered = sorted(latencies)
+    return {
+        "turns_in_flight": clients,
+        "probes": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def rest_turns(client, clients: int, solo: float) -> dict:
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        response = client.post("/chat", json={"message": f"rest client {i}: hello", "user_id": USER_ID, "session_id": f"rest-{i}"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    turns = in_threads(clients, one)
+    wall = time.perf_counter() - start
+    return {"wall_s": round(wall, 3), "turn_max_s": round(max(turns), 3), "overlap": round(clients * solo / wall, 2)}
+
+
+def check(report: dict) -> list:
+    """What in the report shows turns serialized, overlapping where they must not, or the loop blocked"""
+    problems = []
+    limit = report["max_concurrent_turns"]
+    for clients, results in report["websocket"].items():
+        clients = int(clients)
+        limited, serial = results["limited"], results["one_at_a_time"]
+        if limited["peak_running"] != min(clients, limit):
+            problems.append(f"{clients} websocket clients: {limited['peak_running']} turns ran at once, expected {min(clients, limit)}")
+        if limited["overlap"] < MIN_OVERLAP_EFFICIENCY * min(clients, limit):
+            problems.append(f"{clients} websocket clients: overlap {limited['overlap']}, turns were not concurrent")
+        if serial["peak_running"] != 1 or serial["overlap"] > MAX_SERIAL_OVERLAP:
+            problems.append(f"{clients} websocket clients with a limit of 1: overlap {serial['overlap']}, peak {serial['peak_running']}")
+    for clients, result in report["rest_chat"].items():
+        if result["overlap"] < MIN_OVERLAP_EFFICIENCY * min(int(clients), limit):
+            problems.append(f"{clients} REST sessions: overlap {result['overlap']}, turns were not concurrent")
+
+    if not report["ordering"]["in_order"]:
+        problems.append(f"replies on one websocket came back out of order: {report['ordering']['replies']}")
+    session = report["same_session"]
+    if session["peak_running"] != 1 or session["overlap"] > MAX_SERIAL_OVERLAP:
+        problems.append(f"one session's REST turns overlapped: overlap {session['overlap']}, peak {session['peak_running']}")
+
+    health = report["health_during_turns"]
+    if not health["probes"] or health["p50_ms"] > HEALTH_P50_MS or health["max_ms"] > report["model_latency_s"] * 1000 / 2:
+        problems.append(f"/health was slow while turns ran: {health}")
+    turns = report["turns"]
+    if turns["running"] or turns["waiting"]:
+        problems.append(f"turns left running or waiting after every client finished: {turns}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--model-latency", type=float, default=0.5, help="seconds before each model reply starts")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per streamed answer token")
+    parser.add_argument("--ordered-messages", type=int, default=3)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    import mock_apis
+    import web_interface
+    from api_client import ApiClient
+    from session_manager import SessionManager
+    from shopping_agent import AgentResources
+
+    script = {
+        f"ordered question {i}": [f"Answer to ordered question {i}"] for i in range(args.ordered_messages)
+    }
+    model = ScriptedChatModel(script=script, latency=args.model_latency, token_delay=args.token_delay)
+    resources = AgentResources(api=ApiClient(transport="asgi", app=mock_apis.app), llm=model)
+    for tool in resources.tools:
+        tool.verbose = False
+    web_interface.use_sessions(SessionManager(resources))
+
+    report: Dict[str, object] = {
+        "model_latency_s": args.model_latency,
+        "max_concurrent_turns": web_interface.MAX_CONCURRENT_TURNS,
+    }
+    try:
+        with TestClient(web_interface.app) as client:
+            # Warm up the session path and the mock APIs, then time a turn on its own
+            websocket_turns(client, web_interface, 1, 1.0)
+            solo = websocket_turns(client, web_interface, 1, 1.0)["wall_s"]
+            report["lone_turn_s"] = solo
+
+            report["websocket"] = {}
+            for clients in args.clients:
+                results = {}
+                for label, limit in (("limited", web_interface.MAX_CONCURRENT_TURNS), ("one_at_a_time", 1)):
+                    set_turn_limit(web_interface, limit)
+                    results[label] = websocket_turns(client, web_interface, clients, solo)
+                report["websocket"][str(clients)] = results
+            set_turn_limit(web_interface, web_interface.MAX_CONCURRENT_TURNS)
+
+            report["ordering"] = ordering(client, args.ordered_messages)
+            report["same_session"] = same_session(client, web_interface, args.ordered_messages, solo)
+            report["health_during_turns"] = health_under_load(client, max(args.clients), args.model_latency)
+            report["rest_chat"] = {str(clients): rest_turns(client, clients, solo) for clients in args.clients}
+            report["turns"] = client.get("/turns/stats").json()
+    finally:
+        resources.toolkit.api.close()
+    print(json.dumps(report, indent=2))
+
+    problems = check(report)
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+    print("all concurrency checks passed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
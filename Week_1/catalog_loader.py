@@ -0,0 +1,70 @@
+"""
+Bulk loader that streams a catalog file into a CatalogStore.
+
+Supports JSON Lines (one product object per line) and CSV with a header row;
+in CSV files `features` is a "|"-separated list and `stock` an integer.
+Products are written in batches so the whole file is never held in memory as
+dicts.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+from catalog_store import CatalogStore
+
+DEFAULT_BATCH_SIZE = 10000
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+
+def _parse_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    product: Dict[str, Any] = dict(row)
+    product["price"] = float(row["price"])
+    product["rating"] = float(row["rating"]) if row.get("rating") else 0.0
+    product["features"] = [feature for feature in (row.get("features") or "").split("|") if feature]
+    # Empty stock cells leave the quantity to the store (kept on update, a default when new)
+    stock = (row.get("stock") or "").strip()
+    if stock:
+        product["stock"] = int(stock)
+    else:
+        product.pop("stock", None)
+    in_stock = (row.get("in_stock") or "").strip()
+    if in_stock:
+        product["in_stock"] = in_stock.lower() in _TRUE_VALUES
+    else:
+        product.pop("in_stock", None)
+    return product
+
+
+def iter_catalog_file(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield products one at a time from a .jsonl/.ndjson or .csv catalog file"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield _parse_csv_row(row)
+        else:
+            raise ValueError(f"Unsupported catalog format: {path.suffix}")
+
+
+def load_catalog(path: Union[str, Path], store: CatalogStore, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Stream a catalog file into `store` in batches and return the number of products read"""
+    count = 0
+    batch = []
+    for product in iter_catalog_file(path):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            store.upsert_many(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        store.upsert_many(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,447 @@
+"""
+Product catalog store.
+
+Products are kept in an id-keyed map with a version counter per product and
+a catalog-wide version that moves on every change. A product's version is the
+catalog version of the change that last wrote it, so it never repeats, even
+if the product is deleted and re-added. `content_version` moves only when
+products are written or deleted or go in or out of stock, not on every stock
+decrement, so caches of anything but stock counts can key on it. Search
+indexes and caches subscribe to changes instead of rescanning the catalog.
+
+Storage is columnar rather than one dict per product: numeric fields live in
+NumPy arrays, category and brand are dictionary-encoded, and names,
+descriptions and features share one UTF-8 string pool addressed by offsets.
+Product dicts are only materialized on read.
+
+Stock is an integer column; `in_stock` is derived from it. Reservations take
+striped per-product locks, so concurrent checkouts for different products do
+not contend on a single global lock.
+"""
+
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+# listener(upserted_products, deleted_product_ids)
+CatalogListener = Callable[[List[Dict[str, Any]], List[str]], None]
+
+# Fields with a dedicated column, in the order products are materialized
+PRODUCT_COLUMNS = ("id", "name", "category", "price", "brand", "rating", "description", "features", "stock", "in_stock")
+
+# Stock given to new products written without a `stock` quantity (and in_stock
+# true), and to out-of-stock products an update marks in_stock
+DEFAULT_STOCK = 100
+
+# Pooled string fields and their slot in the offsets/lengths arrays
+_POOLED = {"name": 0, "description": 1, "features": 2}
+_FEATURE_SEPARATOR = "\x1f"
+
+# Columns readable through CatalogStore.column
+_COLUMNS = ("price", "rating", "category", "brand", "live")
+
+_INITIAL_CAPACITY = 1024
+# Compact the string pool once this fraction of it belongs to stale values
+_COMPACT_THRESHOLD = 0.5
+# Number of lock stripes guarding stock updates
+_STOCK_LOCK_STRIPES = 64
+
+
+class ProductNotFound(KeyError):
+    """Raised when a reservation names a product that is not in the catalog"""
+
+    def __init__(self, product_id: str):
+        super().__init__(product_id)
+        self.product_id = product_id
+
+
+class InsufficientStock(Exception):
+    """Raised when a reservation asks for more units than are available"""
+
+    def __init__(self, product_id: str, requested: int, available: int):
+        super().__init__(f"Only {available} of product {product_id} left, {requested} requested")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+class _Dictionary:
+    """Dictionary encoding for a low-cardinality string column"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CatalogStore:
+    """Columnar, id-keyed product store with per-product versions and change listeners"""
+
+    def __init__(self, products: Optional[Iterable[Dict[str, Any]]] = None):
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._listeners: List[CatalogListener] = []
+        self._lock = threading.RLock()
+        self.version = 0
+        self.content_version = 0
+
+        capacity = _INITIAL_CAPACITY
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._rating = np.zeros(capacity, dtype=np.float64)
+        self._stock = np.zeros(capacity, dtype=np.int64)
+        self._versions = np.zeros(capacity, dtype=np.int64)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._brand = np.zeros(capacity, dtype=np.int32)
+        self._live = np.zeros(capacity, dtype=np.bool_)
+        self._categories = _Dictionary()
+        self._brands = _Dictionary()
+
+        # String pool: row -> (offset, length) for each pooled field
+        self._pool = bytearray()
+        self._offsets = np.zeros((capacity, len(_POOLED)), dtype=np.int64)
+        self._lengths = np.zeros((capacity, len(_POOLED)), dtype=np.int32)
+        self._garbage = 0
+
+        # Rare fields without a column of their own, keyed by row
+        self._extra: Dict[int, Dict[str, Any]] = {}
+
+        self._stock_locks = [threading.Lock() for _ in range(_STOCK_LOCK_STRIPES)]
+
+        if products is not None:
+            self.upsert_many(products)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._rows
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over products in insertion order"""
+        for row in sorted(self._rows.values()):
+            yield self._materialize(row, None)
+
+    @property
+    def categories(self) -> List[str]:
+        """Every category value ever stored, indexed by its code"""
+        return self._categories.values
+
+    @property
+    def brands(self) -> List[str]:
+        """Every brand value ever stored, indexed by its code"""
+        return self._brands.values
+
+    def get(self, product_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Return a product by id (optionally only some fields), or None if it does not exist"""
+        row = self._rows.get(product_id)
+        if row is None:
+            return None
+        return self._materialize(row, fields)
+
+    @property
+    def row_count(self) -> int:
+        """Rows allocated so far, deleted ones included; rows are numbered in insertion order"""
+        return len(self._ids)
+
+    def row_of(self, product_id: str) -> Optional[int]:
+        return self._rows.get(product_id)
+
+    def id_of(self, row: int) -> Optional[str]:
+        """Product id stored in a row, or None if the row was deleted"""
+        return self._ids[row]
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a per-row column ("price", "rating", "category", "brand" or "live") over every row"""
+        if name not in _COLUMNS:
+            raise ValueError(f"Unknown column: {name}")
+        view = getattr(self, f"_{name}")[:len(self._ids)]
+        view.flags.writeable = False
+        return view
+
+    def code(self, field: str, value: str) -> Optional[int]:
+        """Dictionary code of a category or brand value, or None if it was never stored"""
+        return (self._categories if field == "category" else self._brands).codes.get(value)
+
+    def text(self, row: int, field: str) -> str:
+        """A row's name, description or features string, read from the string pool"""
+        return self._load_string(row, field)
+
+    def get_version(self, product_id: str) -> Optional[int]:
+        """Return the version of a product, or None if it does not exist"""
+        row = self._rows.get(product_id)
+        return None if row is None else int(self._versions[row])
+
+    def subscribe(self, listener: CatalogListener, replay: bool = True) -> None:
+        """Register a change listener, optionally replaying the current catalog to it"""
+        with self._lock:
+            self._listeners.append(listener)
+            if replay and self._rows:
+                listener(list(self), [])
+
+    def unsubscribe(self, listener: CatalogListener) -> None:
+        """Remove a previously registered change listener"""
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def upsert(self, product: Dict[str, Any]) -> int:
+        """Insert or replace a single product and return its new version"""
+        self.upsert_many([product])
+        return self.get_version(product["id"])
+
+    def upsert_many(self, products: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace products in bulk and notify listeners once
+
+        A product that fails validation raises after the ones before it are
+        written, and listeners still hear about those.
+        """
+        with self._lock:
+            version = self.version + 1
+            upserted = []
+            try:
+                for product in products:
+                    self._write(product, version)
+                    upserted.append(product)
+            finally:
+                if upserted:
+                    self._changed(upserted, [])
+
+    def delete(self, product_id: str) -> bool:
+        """Delete a single product; returns False if it did not exist"""
+        return bool(self.delete_many([product_id]))
+
+    def delete_many(self, product_ids: Iterable[str]) -> List[str]:
+        """Delete products in bulk, notify listeners once and return the ids removed"""
+        with self._lock:
+            deleted = []
+            for product_id in product_ids:
+                row = self._rows.pop(product_id, None)
+                if row is not None:
+                    # Rows are never reused, so a deleted row is a tombstone
+                    self._ids[row] = None
+                    self._live[row] = False
+                    self._extra.pop(row, None)
+                    self._garbage += int(self._lengths[row].sum())
+                    deleted.append(product_id)
+            if deleted:
+                self._changed([], deleted)
+            return deleted
+
+    def reserve_stock(self, quantities: Dict[str, int]) -> Dict[str, float]:
+        """Atomically take stock for every product in `quantities`, or for none of them
+
+        Raises ProductNotFound or InsufficientStock without changing anything.
+        Returns each product's unit price as of the reservation, so callers
+        need not look the products up again (they may be deleted meanwhile).
+        """
+        with self._stock_guard(quantities):
+            rows = []
+            for product_id, quantity in quantities.items():
+                row = self._rows.get(product_id)
+                if row is None:
+                    raise ProductNotFound(product_id)
+                available = int(self._stock[row])
+                if available < quantity:
+                    raise InsufficientStock(product_id, quantity, available)
+                rows.append(row)
+            sold_out = False
+            for row, quantity in zip(rows, quantities.values()):
+                self._stock[row] -= quantity
+                sold_out |= quantity > 0 and self._stock[row] <= 0
+            prices = {product_id: float(self._price[row]) for product_id, row in zip(quantities, rows)}
+        self._bump_versions(rows, sold_out)
+        return prices
+
+    def release_stock(self, quantities: Dict[str, int]) -> int:
+        """Return previously reserved stock, e.g. when an order cannot be completed"""
+        with self._stock_guard(quantities):
+            rows = []
+            restocked = False
+            for product_id, quantity in quantities.items():
+                row = self._rows.get(product_id)
+                if row is not None:
+                    restocked |= quantity > 0 and self._stock[row] <= 0
+                    self._stock[row] += quantity
+                    rows.append(row)
+        return self._bump_versions(rows, restocked)
+
+    def _stock_lock(self, product_id: str) -> threading.Lock:
+        return self._stock_locks[zlib.crc32(product_id.encode()) % _STOCK_LOCK_STRIPES]
+
+    def _stock_guard(self, product_ids: Iterable[str]) -> "_MultiLock":
+        # Acquiring stripes in index order keeps concurrent reservations deadlock-free
+        stripes = sorted({zlib.crc32(product_id.encode()) % _STOCK_LOCK_STRIPES for product_id in product_ids})
+        return _MultiLock([self._stock_locks[stripe] for stripe in stripes])
+
+    def _bump_versions(self, rows: Iterable[int], in_stock_changed: bool) -> int:
+        # Called after the stripes are released: stripes are never held while
+        # waiting for self._lock, which upserts hold while waiting for stripes
+        with self._lock:
+            self.version += 1
+            for row in rows:
+                self._versions[row] = self.version
+            if in_stock_changed:
+                self.content_version = self.version
+            return self.version
+
+    def compact(self) -> None:
+        """Rewrite the string pool without the bytes of replaced or deleted products"""
+        with self._lock:
+            pool = bytearray()
+            for row in self._rows.values():
+                for slot in range(len(_POOLED)):
+                    start = int(self._offsets[row, slot])
+                    length = int(self._lengths[row, slot])
+                    self._offsets[row, slot] = len(pool)
+                    pool += self._pool[start:start + length]
+            self._pool = pool
+            self._garbage = 0
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the columns and the string pool"""
+        arrays = (self._price, self._rating, self._stock, self._versions,
+                  self._category, self._brand, self._live, self._offsets, self._lengths)
+        return sum(array.nbytes for array in arrays) + len(self._pool)
+
+    def _write(self, product: Dict[str, Any], version: int) -> None:
+        product_id = product["id"]
+        # Coerce the typed fields before touching any column, so a bad product changes nothing
+        price = float(product["price"])
+        rating = float(product.get("rating", 0.0))
+        stock = product.get("stock")
+        if stock is not None:
+            stock = int(stock)
+        category = product["category"]
+        brand = product["brand"]
+        name = product["name"]
+
+        row = self._rows.get(product_id)
+        is_new = row is None
+        if is_new:
+            row = len(self._ids)
+            if row == len(self._price):
+                self._grow()
+            self._ids.append(product_id)
+            self._rows[product_id] = row
+        else:
+            self._garbage += int(self._lengths[row].sum())
+
+        self._price[row] = price
+        self._rating[row] = rating
+        with self._stock_lock(product_id):
+            if stock is None:
+                stock = self._implied_stock(product, None if is_new else int(self._stock[row]))
+            self._stock[row] = stock
+        self._versions[row] = version
+        self._category[row] = self._categories.encode(category)
+        self._brand[row] = self._brands.encode(brand)
+        self._store_string(row, "name", name)
+        self._store_string(row, "description", product.get("description", ""))
+        self._store_string(row, "features", _FEATURE_SEPARATOR.join(product.get("features", [])))
+
+        extra = {key: value for key, value in product.items() if key not in PRODUCT_COLUMNS}
+        if extra:
+            self._extra[row] = extra
+        else:
+            self._extra.pop(row, None)
+        # Last, so column scans never see a half-written row
+        self._live[row] = True
+
+    @staticmethod
+    def _implied_stock(product: Dict[str, Any], current: Optional[int]) -> int:
+        """Stock for a product written without a quantity; `current` is None for new products
+
+        An update keeps the current stock (and so any reservations) unless
+        its in_stock flag says otherwise.
+        """
+        in_stock = product.get("in_stock")
+        if current is None:
+            return DEFAULT_STOCK if in_stock is None or in_stock else 0
+        if in_stock is None or bool(in_stock) == (current > 0):
+            return current
+        return DEFAULT_STOCK if in_stock else 0
+
+    def _store_string(self, row: int, field: str, value: str) -> None:
+        data = value.encode("utf-8")
+        slot = _POOLED[field]
+        self._offsets[row, slot] = len(self._pool)
+        self._lengths[row, slot] = len(data)
+        self._pool += data
+
+    def _load_string(self, row: int, field: str) -> str:
+        slot = _POOLED[field]
+        start = int(self._offsets[row, slot])
+        return self._pool[start:start + int(self._lengths[row, slot])].decode("utf-8")
+
+    def _grow(self) -> None:
+        capacity = len(self._price) * 2
+        # Hold every stripe so no reservation updates the old stock array mid-copy
+        with _MultiLock(self._stock_locks):
+            self._resize(capacity)
+
+    def _resize(self, capacity: int) -> None:
+        for name in ("_price", "_rating", "_stock", "_versions", "_category", "_brand", "_live", "_offsets", "_lengths"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _materialize(self, row: int, fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        extra = self._extra.get(row)
+        product: Dict[str, Any] = {}
+        for field in fields or PRODUCT_COLUMNS:
+            if field == "id":
+                product["id"] = self._ids[row]
+            elif field == "price":
+                product["price"] = float(self._price[row])
+            elif field == "rating":
+                product["rating"] = float(self._rating[row])
+            elif field == "stock":
+                product["stock"] = int(self._stock[row])
+            elif field == "in_stock":
+                product["in_stock"] = bool(self._stock[row] > 0)
+            elif field == "category":
+                product["category"] = self._categories.values[self._category[row]]
+            elif field == "brand":
+                product["brand"] = self._brands.values[self._brand[row]]
+            elif field == "features":
+                features = self._load_string(row, "features")
+                product["features"] = features.split(_FEATURE_SEPARATOR) if features else []
+            elif field in _POOLED:
+                product[field] = self._load_string(row, field)
+            elif extra is not None and field in extra:
+                product[field] = extra[field]
+        if fields is None and extra:
+            product.update(extra)
+        return product
+
+    def _changed(self, upserted: List[Dict[str, Any]], deleted: List[str]) -> None:
+        if self._garbage > _COMPACT_THRESHOLD * len(self._pool):
+            self.compact()
+        self.version += 1
+        self.content_version = self.version
+        for listener in self._listeners:
+            listener(upserted, deleted)
+
+
+class _MultiLock:
+    """Context manager holding several locks, acquired in the given order"""
+
+    def __init__(self, locks: List[threading.Lock]):
+        self.locks = locks
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.locks):
+            lock.release()
@@ -0,0 +1,171 @@
+"""
+Token-budgeted conversation memory for the shopping agent.
+
+`TokenBudgetMemory` keeps a sliding window of the most recent messages and
+folds older ones into a compact list of shopping facts (budget, brands,
+categories, product and order ids). What it hands to the prompt, facts plus
+window, never exceeds `max_token_limit` tokens.
+
+Tokens are counted with token_counting.count_tokens.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+
+from token_counting import count_tokens, truncate_tokens
+
+DEFAULT_MEMORY_TOKENS = int(os.getenv("AGENT_MEMORY_TOKENS", "1500"))
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Fact extraction from user messages and agent replies
+# (markdown from the model, and the compact tool output of tool_output.py)
+PRODUCT_ID_PATTERN = re.compile(r"\(ID: ([\w-]+)\)|\bproduct(?: id)?[ #:]+([\w-]*\d[\w-]*)|^id ([\w-]+):", re.IGNORECASE | re.MULTILINE)
+ORDER_ID_PATTERN = re.compile(r"Order ID:\**\s*([\w-]+)|^(?:placed )?order ([\w-]+):", re.MULTILINE)
+BRAND_PATTERN = re.compile(r"Brand:\**\s*([^|\n*]+)", re.IGNORECASE)
+CATEGORY_PATTERN = re.compile(r"Category:\**\s*([^|\n*]+)", re.IGNORECASE)
+BUDGET_BETWEEN_PATTERN = re.compile(r"between \$?(\d+(?:\.\d+)?) and \$?(\d+(?:\.\d+)?)", re.IGNORECASE)
+BUDGET_MAX_PATTERN = re.compile(r"(?:under|below|less than|at most|max(?:imum)?|budget(?: is| of)?)\s+\$?(\d+(?:\.\d+)?)", re.IGNORECASE)
+BUDGET_MIN_PATTERN = re.compile(r"(?:over|above|more than|at least)\s+\$?(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _remember(values: List[str], value: str, limit: int) -> None:
+    """Add `value` as the most recent entry of a bounded, de-duplicated list"""
+    value = value.strip()
+    if not value:
+        return
+    if value in values:
+        values.remove(value)
+    values.append(value)
+    del values[:-limit]
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Sliding window of recent messages plus facts folded from older ones, within a token budget"""
+
+    memory_key: str = "chat_history"
+    max_token_limit: int = DEFAULT_MEMORY_TOKENS
+    max_facts: int = 10
+
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    brands: List[str] = []
+    categories: List[str] = []
+    product_ids: List[str] = []
+    order_ids: List[str] = []
+    folded_messages: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages = self.prompt_messages()
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self._enforce_budget()
+
+    def clear(self) -> None:
+        super().clear()
+        self.budget_min = self.budget_max = None
+        self.brands, self.categories, self.product_ids, self.order_ids = [], [], [], []
+        self.folded_messages = 0
+
+    def prompt_messages(self) -> List[BaseMessage]:
+        """Facts message (if any) followed by the recent window"""
+        facts = self.facts_message()
+        window = list(self.chat_memory.messages)
+        return ([facts] if facts is not None else []) + window
+
+    def prompt_tokens(self) -> int:
+        """Tokens the memory currently contributes to the prompt"""
+        return sum(message_tokens(message) for message in self.prompt_messages())
+
+    def facts_message(self) -> Optional[SystemMessage]:
+        """Compact summary of the folded-away part of the conversation"""
+        if not self.folded_messages:
+            return None
+        facts = []
+        if self.budget_min is not None or self.budget_max is not None:
+            low = f"${self.budget_min:g}" if self.budget_min is not None else "any"
+            high = f"${self.budget_max:g}" if self.budget_max is not None else "any"
+            facts.append(f"budget {low} to {high}")
+        if self.categories:
+            facts.append("categories: " + ", ".join(self.categories))
+        if self.brands:
+            facts.append("brands: " + ", ".join(self.brands))
+        if self.product_ids:
+            facts.append("product ids discussed: " + ", ".join(self.product_ids))
+        if self.order_ids:
+            facts.append("order ids: " + ", ".join(self.order_ids))
+        summary = f"Earlier in this conversation ({self.folded_messages} messages not shown)"
+        return SystemMessage(content=summary + (": " + "; ".join(facts) if facts else "."))
+
+    def _enforce_budget(self) -> None:
+        messages = self.chat_memory.messages
+        window_tokens = sum(message_tokens(message) for message in messages)
+
+        def facts_tokens() -> int:
+            facts = self.facts_message()
+            return message_tokens(facts) if facts is not None else 0
+
+        # Fold the oldest messages into facts until the window fits
+        while messages and window_tokens + facts_tokens() > self.max_token_limit:
+            if len(messages) == 1:
+                # A single message larger than the budget is cut down instead of dropped
+                room = self.max_token_limit - facts_tokens() - MESSAGE_OVERHEAD_TOKENS
+                if room > 0:
+                    message = messages[0]
+                    messages[0] = message.__class__(content=truncate_tokens(message.content, room))
+                    window_tokens = message_tokens(messages[0])
+                    if window_tokens + facts_tokens() <= self.max_token_limit:
+                        break
+            oldest = messages.pop(0)
+            window_tokens -= message_tokens(oldest)
+            self._fold(oldest)
+
+        # Facts are bounded too; drop their oldest entries if they alone overflow
+        while facts_tokens() + window_tokens > self.max_token_limit:
+            lists = [values for values in (self.product_ids, self.order_ids, self.brands, self.categories) if values]
+            if not lists:
+                self.budget_min = self.budget_max = None
+                break
+            max(lists, key=len).pop(0)
+
+    def _fold(self, message: BaseMessage) -> None:
+        """Record the facts worth keeping from a message leaving the window"""
+        self.folded_messages += 1
+        text = message.content
+        for match in PRODUCT_ID_PATTERN.finditer(text):
+            _remember(self.product_ids, next(group for group in match.groups() if group), self.max_facts)
+        for match in ORDER_ID_PATTERN.finditer(text):
+            _remember(self.order_ids, match.group(1) or match.group(2), self.max_facts)
+        for match in BRAND_PATTERN.finditer(text):
+            _remember(self.brands, match.group(1), self.max_facts)
+        for match in CATEGORY_PATTERN.finditer(text):
+            _remember(self.categories, match.group(1), self.max_facts)
+        if isinstance(message, HumanMessage):
+            # Only the customer states a budget
+            between = BUDGET_BETWEEN_PATTERN.search(text)
+            if between:
+                self.budget_min, self.budget_max = float(between.group(1)), float(between.group(2))
+            else:
+                high = BUDGET_MAX_PATTERN.search(text)
+                low = BUDGET_MIN_PATTERN.search(text)
+                if high:
+                    self.budget_max = float(high.group(1))
+                if low:
+                    self.budget_min = float(low.group(1))
@@ -0,0 +1,91 @@
+"""
+Deterministic fast path in front of the shopping agent.
+
+Some requests name exactly one tool and its arguments ("status of order
+<uuid>", "show my orders", "details for product 3"). `IntentRouter` matches
+them with compiled patterns so the agent can call the tool directly instead
+of asking the model first. Patterns must match the whole message; anything
+with extra wording falls through to the agent.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Pattern, Tuple
+
+UUID = r"[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}"
+POLITE = r"(?:please\s+|can you\s+|could you\s+)?"
+END = r"(?:\s*,?\s*please)?\s*[.!?]*"
+# Catalog ids ("3", "SKU-1042") contain a digit; plain words ("product warranties") are not ids
+PRODUCT_ID = r"(?P<product_id>(?=[\w-]*\d)[\w-]+)"
+
+# (tool name, pattern); named groups become tool arguments
+INTENT_PATTERNS: List[Tuple[str, Pattern]] = [
+    ("get_order_status_tool", re.compile(
+        POLITE + r"(?:(?:what(?:'s| is)|check|show(?: me)?|get)\s+)?(?:the\s+)?"
+        r"(?:status\s+(?:of|for)|track)\s+(?:my\s+)?order\s*(?:id\s*)?[#:]?\s*(?P<order_id>" + UUID + ")" + END,
+        re.IGNORECASE,
+    )),
+    ("get_order_status_tool", re.compile(
+        POLITE + r"(?:where(?:'s| is)\s+(?:my\s+)?order|order)\s*(?:id\s*)?[#:]?\s*(?P<order_id>" + UUID + r")(?:\s+status)?" + END,
+        re.IGNORECASE,
+    )),
+    ("get_user_orders_tool", re.compile(
+        POLITE + r"(?:(?:show|list|get|view|see)\s+(?:me\s+)?)?(?:all\s+)?my\s+(?:recent\s+|past\s+|previous\s+)?"
+        r"(?:orders|order history|purchases)" + END,
+        re.IGNORECASE,
+    )),
+    ("get_product_details_tool", re.compile(
+        POLITE + r"(?:(?:show|get|give)\s+(?:me\s+)?)?(?:the\s+)?(?:details|info|information)\s+(?:for|of|on|about)\s+"
+        r"product\s*(?:id\s*)?[#:]?\s*" + PRODUCT_ID + END,
+        re.IGNORECASE,
+    )),
+    ("get_product_details_tool", re.compile(
+        POLITE + r"(?:tell me (?:more )?about|describe)\s+product\s*(?:id\s*)?[#:]?\s*" + PRODUCT_ID + END,
+        re.IGNORECASE,
+    )),
+    ("get_product_details_tool", re.compile(
+        r"product\s*(?:id\s*)?[#:]?\s*" + PRODUCT_ID + r"\s+details" + END,
+        re.IGNORECASE,
+    )),
+]
+
+# Tools whose arguments include the current user rather than anything in the message
+USER_SCOPED_TOOLS = {"get_user_orders_tool"}
+
+
+class IntentRouter:
+    """Matches structured requests to a single tool call and counts how many it handles"""
+
+    def __init__(self, patterns: List[Tuple[str, Pattern]] = INTENT_PATTERNS):
+        self.patterns = patterns
+        self.routed: Dict[str, int] = {}
+        self.fallthrough = 0
+        self._lock = threading.Lock()
+
+    def route(self, message: str, user_id: Optional[str] = None) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Return (tool name, arguments) for a structured request, or None to use the agent"""
+        text = message.strip()
+        for tool_name, pattern in self.patterns:
+            match = pattern.fullmatch(text)
+            if match is None:
+                continue
+            args = match.groupdict()
+            if tool_name in USER_SCOPED_TOOLS:
+                if not user_id:
+                    break
+                args["user_id"] = user_id
+            with self._lock:
+                self.routed[tool_name] = self.routed.get(tool_name, 0) + 1
+            return tool_name, args
+        with self._lock:
+            self.fallthrough += 1
+        return None
+
+    def stats(self) -> dict:
+        routed = sum(self.routed.values())
+        total = routed + self.fallthrough
+        return {
+            "routed": dict(self.routed),
+            "fallthrough": self.fallthrough,
+            "hit_ratio": round(routed / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,246 @@
+"""
+On-disk cache of chat model responses.
+
+`CachingChatModel` wraps any LangChain chat model. Each call is keyed by a
+hash of the normalized messages, the bound tool schemas and the model's
+parameters, and answered from an SQLite-backed `LLMResponseCache` when the
+same prompt was already seen at the same catalog version. Sampling models
+(temperature > 0) bypass the cache unless `allow_sampling` is set, since
+their answers are not meant to repeat.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("AGENT_LLM_CACHE_SIZE", "10000"))
+
+
+class LLMResponseCache:
+    """Size-bounded SQLite store of model generations, invalidated by catalog version
+
+    Calls block on SQLite; async callers run them in an executor. Hits only
+    note when an entry was last used; the notes are written with the next
+    put (or on close), so a lookup never commits.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, version INTEGER, generations TEXT NOT NULL, "
+            "latency REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._db.commit()
+        self._version: Optional[int] = None
+        self._count = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        # key -> when a hit last used it, not yet written to last_used
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, key: str, version: Optional[int] = None) -> Optional[List[ChatGeneration]]:
+        """Cached generations for `key` at catalog `version`, or None"""
+        with self._lock:
+            if not self._advance_version(version):
+                self.misses += 1
+                return None
+            row = self._db.execute("SELECT generations, latency FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            self.hits += 1
+            self.saved_seconds += row[1]
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def put(self, key: str, generations: List[ChatGeneration], latency: float, version: Optional[int] = None) -> None:
+        """Store generations that took `latency` seconds to produce at catalog `version`"""
+        payload = json.dumps([dumps(generation) for generation in generations])
+        with self._lock:
+            if version != self._version:
+                # The catalog moved on while the model was answering
+                return
+            self._flush_touched()
+            exists = self._db.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, version, generations, latency, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, self._version, payload, latency, time.time()),
+            )
+            if exists is None:
+                self._count += 1
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+            self._count = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    def _advance_version(self, version: Optional[int]) -> bool:
+        """Switch to `version`, dropping other versions' entries; False for a version older than the current one"""
+        if version == self._version:
+            return True
+        if version is not None and self._version is not None and version < self._version:
+            return False
+        self._db.execute("DELETE FROM llm_cache WHERE version IS NOT ?", (version,))
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        self._touched.clear()
+        self._version = version
+        return True
+
+    def _flush_touched(self) -> None:
+        """Write the last-used times noted by hits; the caller commits"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE llm_cache SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+
+def normalize_messages(messages: List[BaseMessage]) -> list:
+    """Messages reduced to what the model sees, with whitespace runs collapsed"""
+    normalized = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, str):
+            content = " ".join(content.split())
+        normalized.append([
+            message.type,
+            content,
+            message.additional_kwargs,
+            getattr(message, "tool_call_id", None),
+        ])
+    return normalized
+
+
+class CachingChatModel(BaseChatModel):
+    """Chat model wrapper that answers repeated prompts from an LLMResponseCache"""
+
+    model: BaseChatModel
+    response_cache: LLMResponseCache
+    allow_sampling: bool = False
+    """Cache responses even when the wrapped model samples (temperature > 0)"""
+    catalog_version: Optional[Callable[[], Optional[int]]] = None
+    acatalog_version: Optional[Callable[[], Awaitable[Optional[int]]]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return f"caching-{self.model._llm_type}"
+
+    def cache_key(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        """Hash of the normalized messages, bound tools and model parameters"""
+        payload = json.dumps(
+            [normalize_messages(messages), self.model._get_llm_string(stop=stop, **kwargs)],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def cacheable(self) -> bool:
+        return self.allow_sampling or not getattr(self.model, "temperature", 0)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if not self.cacheable():
+            self.response_cache.bypassed += 1
+            return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        key = self.cache_key(messages, stop, **kwargs)
+        version = self.catalog_version() if self.catalog_version else None
+        generations = self.response_cache.lookup(key, version)
+        if generations is not None:
+            return ChatResult(generations=generations)
+
+        start = time.perf_counter()
+        result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.response_cache.put(key, result.generations, time.perf_counter() - start, version)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if not self.cacheable():
+            self.response_cache.bypassed += 1
+            return await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        key = self.cache_key(messages, stop, **kwargs)
+        if self.acatalog_version:
+            version = await self.acatalog_version()
+        elif self.catalog_version:
+            version = await asyncio.get_running_loop().run_in_executor(None, self.catalog_version)
+        else:
+            version = None
+        # SQLite blocks, so it runs off the event loop
+        loop = asyncio.get_running_loop()
+        generations = await loop.run_in_executor(None, self.response_cache.lookup, key, version)
+        if generations is not None:
+            return ChatResult(generations=generations)
+
+        start = time.perf_counter()
+        result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        await loop.run_in_executor(
+            None, self.response_cache.put, key, result.generations, time.perf_counter() - start, version
+        )
+        return result
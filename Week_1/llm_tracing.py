@@ -0,0 +1,61 @@
+"""
+Model-call spans for tracing.
+
+A LangChain callback handler that records a span per chat model call, with
+prompt and completion token counts: the API's usage figures when the model
+reports them, otherwise token_counting estimates. It lives apart from
+tracing.py so the tool and HTTP paths, which trace too, don't import LangChain.
+"""
+
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from token_counting import count_tokens
+from tracing import Span, Tracer
+
+
+class ModelSpanHandler(BaseCallbackHandler):
+    """Records a span per model call, with prompt and completion token counts"""
+
+    # Runs in the caller's context, so the current span is the model call's parent
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans: Dict[UUID, Span] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        prompt = "".join(str(message.content) for batch in messages for message in batch)
+        self._spans[run_id] = self.tracer.start_span(
+            params.get("_type") or "chat_model", "llm",
+            messages=sum(len(batch) for batch in messages),
+            prompt_tokens=count_tokens(prompt),
+        )
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            span.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"), tokens_estimated=False)
+        else:
+            completion = ""
+            tool_calls = 0
+            for generations in response.generations:
+                for generation in generations:
+                    completion += generation.text
+                    message = getattr(generation, "message", None)
+                    for call in (message.additional_kwargs.get("tool_calls") or []) if message else []:
+                        completion += call.get("function", {}).get("arguments", "")
+                        tool_calls += 1
+            span.set(completion_tokens=count_tokens(completion), tool_calls=tool_calls, tokens_estimated=True)
+        self.tracer.end_span(span)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.tracer.end_span(span, error)
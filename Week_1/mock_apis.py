@@ -1,9 +1,17 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Tuple
 import json
+import base64
+import binascii
 from datetime import datetime
 import uuid
+import os
+from catalog_store import CatalogStore, InsufficientStock, ProductNotFound
+from catalog_loader import load_catalog
+from order_store import OrderStoreError, open_order_repository
+from http_cache import ResponseCache, etag_matches
+from search_index import ProductSearchIndex, SORT_OPTIONS
 
 app = FastAPI(title="Mock E-commerce APIs", version="1.0.0")
 
@@ -18,7 +26,7 @@ products_db = [
         "rating": 4.5,
         "description": "High-quality wireless headphones with noise cancellation",
         "features": ["Bluetooth 5.0", "Noise Cancellation", "30-hour battery"],
-        "in_stock": True
+        "stock": 25
     },
     {
         "id": "2", 
@@ -29,7 +37,7 @@ products_db = [
         "rating": 4.3,
         "description": "Advanced fitness tracking with heart rate monitoring",
         "features": ["Heart Rate Monitor", "GPS", "Water Resistant"],
-        "in_stock": True
+        "stock": 12
     },
     {
         "id": "3",
@@ -40,7 +48,7 @@ products_db = [
         "rating": 4.7,
         "description": "Comfortable organic cotton t-shirt",
         "features": ["100% Organic", "Breathable", "Multiple Colors"],
-        "in_stock": True
+        "stock": 80
     },
     {
         "id": "4",
@@ -51,7 +59,7 @@ products_db = [
         "rating": 4.6,
         "description": "Professional running shoes with cushioning",
         "features": ["Lightweight", "Cushioned", "Breathable"],
-        "in_stock": True
+        "stock": 30
     }
 ]
 
@@ -70,7 +78,38 @@ users_db = {
     }
 }
 
-orders_db = {}
+# Orders go through a repository; set ORDER_LOG_PATH to keep them in a durable,
+# append-only log that is replayed on startup instead of in process memory
+order_repository = open_order_repository(os.getenv("ORDER_LOG_PATH"))
+
+def encode_order_cursor(created_at: str, order_id: str) -> str:
+    """Opaque pagination cursor pointing just past the given order"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, order_id]).encode()).decode()
+
+def decode_order_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_order_cursor; raises ValueError on malformed input"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    # The key is compared against (created_at, order_id) string pairs
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise ValueError("Invalid cursor")
+    created_at, order_id = key
+    return created_at, order_id
+
+# Catalog store; every endpoint reads products through it, and the search
+# indexes subscribe to its changes so they are updated incrementally.
+catalog = CatalogStore()
+search_index = ProductSearchIndex(catalog)
+catalog.subscribe(search_index.on_catalog_change)
+
+# CATALOG_PATH points at a .jsonl/.csv catalog to stream in instead of the
+# sample products above
+if os.getenv("CATALOG_PATH"):
+    load_catalog(os.getenv("CATALOG_PATH"), catalog)
+else:
+    catalog.upsert_many(products_db)
 
 # Pydantic models
 class ProductSearchRequest(BaseModel):
@@ -85,56 +124,172 @@ class UserPreferences(BaseModel):
     budget_range: Dict[str, float] = {}
     brands: List[str] = []
 
+class LineItem(BaseModel):
+    product_id: str
+    quantity: int = Field(1, ge=1)
+
 class CheckoutRequest(BaseModel):
     user_id: str
+    # Either a single product_id/quantity or a cart of line items
+    product_id: Optional[str] = None
+    quantity: int = Field(1, ge=1)
+    items: List[LineItem] = []
+
+    def line_items(self) -> List[LineItem]:
+        """All requested line items, including the single-product form"""
+        if self.items:
+            return self.items
+        if self.product_id:
+            return [LineItem(product_id=self.product_id, quantity=self.quantity)]
+        return []
+
+class OrderLine(BaseModel):
     product_id: str
-    quantity: int = 1
+    quantity: int
+    unit_price: float
+    line_total: float
 
 class OrderResponse(BaseModel):
     order_id: str
     user_id: str
-    product_id: str
+    # Set for single-product orders; cart orders list their lines in items
+    product_id: Optional[str] = None
     quantity: int
+    items: List[OrderLine] = []
     total_amount: float
     status: str
     created_at: str
 
+# Catalog responses are revalidated with ETags on every use; serialized
+# bodies are kept in an LRU that is dropped whenever the catalog's content
+# version moves. Responses that show stock counts also key on the version
+# that moves with stock, so checkouts don't empty the cache
+CATALOG_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_SIZE", "1024")))
+
+def serialize_json(data: Any) -> bytes:
+    """Serialize a response body the way FastAPI's JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def cached_catalog_response(request: Request, cache_key: Tuple, etag: str, version: int, build) -> Response:
+    """Answer from If-None-Match or the response cache, calling build() only on a miss"""
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    cached = response_cache.get(cache_key, version)
+    if cached is not None:
+        body = cached[0]
+    else:
+        body = serialize_json(build())
+        response_cache.put(cache_key, version, body, etag)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Fields a product search can be projected to with `fields=`
+PRODUCT_FIELDS = ("id", "name", "category", "price", "brand", "rating", "description", "features", "stock", "in_stock")
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` value; the id is always included"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [field for field in requested if field != "id"]
+
 # Product API endpoints
 @app.get("/api/products")
 async def search_products(
+    request: Request,
     query: Optional[str] = None,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    brand: Optional[str] = None
+    brand: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="One of: " + ", ".join(SORT_OPTIONS)),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    count_only: bool = False
 ):
-    """Search products based on criteria"""
-    filtered_products = products_db.copy()
-    
-    if query:
-        filtered_products = [p for p in filtered_products if query.lower() in p["name"].lower() or query.lower() in p["description"].lower()]
+    """Search products based on criteria, one sorted and projected page at a time"""
+    if sort is not None and sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_OPTIONS)}")
+    projection = parse_fields(fields)
     
-    if category:
-        filtered_products = [p for p in filtered_products if p["category"] == category]
+    # Matching is case-insensitive, so the query is normalized for the cache key
+    filters = dict(query=query.lower() if query else None, category=category, min_price=min_price, max_price=max_price, brand=brand)
+    version = catalog.content_version
+    # Stock counts change on every checkout; results without them only change with the content version
+    etag = f'"c{version}"'
+    if not count_only and (projection is None or "stock" in projection):
+        etag = f'"s{catalog.version}"'
+    cache_key = ("search", tuple(filters.values()), sort, limit, offset, tuple(projection or ()), count_only, etag)
     
-    if min_price is not None:
-        filtered_products = [p for p in filtered_products if p["price"] >= min_price]
+    def build():
+        if count_only:
+            return {"count": search_index.count(**filters)}
+        
+        total, product_ids = search_index.search_page(**filters, sort=sort, offset=offset, limit=limit)
+        filtered_products = [catalog.get(product_id, projection) for product_id in product_ids]
+        next_offset = offset + len(product_ids) if offset + len(product_ids) < total else None
+        
+        return {
+            "products": filtered_products,
+            "count": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset
+        }
     
-    if max_price is not None:
-        filtered_products = [p for p in filtered_products if p["price"] <= max_price]
-    
-    if brand:
-        filtered_products = [p for p in filtered_products if p["brand"] == brand]
+    return cached_catalog_response(request, cache_key, etag, version, build)
+
+@app.get("/api/products/facets")
+async def get_product_facets(
+    request: Request,
+    query: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    brand: Optional[str] = None,
+    facet_limit: int = Query(10, ge=1, le=100)
+):
+    """Count matching products per category, brand, price bucket and rating"""
+    filters = dict(query=query.lower() if query else None, category=category, min_price=min_price, max_price=max_price, brand=brand)
+    cache_key = ("facets", tuple(filters.values()), facet_limit)
+    version = catalog.content_version
     
-    return {"products": filtered_products, "count": len(filtered_products)}
+    return cached_catalog_response(
+        request, cache_key, f'"c{version}"', version,
+        lambda: search_index.facets(**filters, facet_limit=facet_limit)
+    )
 
+@app.get("/api/products/version")
+async def get_catalog_version():
+    """Current catalog content version; it moves when products change or go in or out of stock, not on every sale"""
+    return {"version": catalog.content_version}
+
+# Declared after /api/products/facets and /version so those are not taken for product ids
 @app.get("/api/products/{product_id}")
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request):
     """Get product details by ID"""
-    product = next((p for p in products_db if p["id"] == product_id), None)
-    if not product:
+    version = catalog.content_version
+    product_version = catalog.get_version(product_id)
+    if product_version is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    
+    # The ETag and cache entry follow the product's own version, so unrelated
+    # catalog changes don't invalidate copies of this product
+    return cached_catalog_response(
+        request, ("product", product_id, product_version), f'"p{product_version}"', version,
+        lambda: catalog.get(product_id)
+    )
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Response cache hit/miss counters"""
+    return {"catalog_version": catalog.version, "content_version": catalog.content_version, **response_cache.stats()}
 
 # User API endpoints
 @app.get("/api/users/{user_id}")
@@ -156,32 +311,62 @@ async def update_user_preferences(user_id: str, preferences: UserPreferences):
 
 # Checkout API endpoints
 @app.post("/api/checkout")
-async def create_order(checkout_request: CheckoutRequest):
-    """Create a new order"""
+def create_order(checkout_request: CheckoutRequest):
+    """Create a new order for one product or a cart of line items
+
+    Stock for every line is reserved atomically before the order is created.
+    Plain `def` so FastAPI runs it on a worker thread while it waits on the
+    per-product stock locks and on the order log's group commit.
+    """
     # Validate user exists
     if checkout_request.user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Validate product exists
-    product = next((p for p in products_db if p["id"] == checkout_request.product_id), None)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    line_items = checkout_request.line_items()
+    if not line_items:
+        raise HTTPException(status_code=422, detail="Provide product_id or at least one item")
+    
+    # Merge repeated products so each is reserved once
+    quantities: Dict[str, int] = {}
+    for item in line_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    
+    # Validate products exist, take their stock and read their prices in one step
+    try:
+        prices = catalog.reserve_stock(quantities)
+    except ProductNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Product {e.product_id} not found")
+    except InsufficientStock as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     # Create order
     order_id = str(uuid.uuid4())
-    total_amount = product["price"] * checkout_request.quantity
+    lines = []
+    for item in line_items:
+        unit_price = prices[item.product_id]
+        lines.append({
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": unit_price,
+            "line_total": round(unit_price * item.quantity, 2)
+        })
     
     order = {
         "order_id": order_id,
         "user_id": checkout_request.user_id,
-        "product_id": checkout_request.product_id,
-        "quantity": checkout_request.quantity,
-        "total_amount": total_amount,
+        "product_id": lines[0]["product_id"] if len(lines) == 1 else None,
+        "quantity": sum(line["quantity"] for line in lines),
+        "items": lines,
+        "total_amount": round(sum(line["line_total"] for line in lines), 2),
         "status": "confirmed",
         "created_at": datetime.now().isoformat()
     }
     
-    orders_db[order_id] = order
+    try:
+        order_repository.add(order)
+    except OrderStoreError:
+        catalog.release_stock(quantities)
+        raise HTTPException(status_code=503, detail="Order could not be saved, please retry")
     
     return OrderResponse(**order)
 
@@ -189,16 +374,34 @@ async def create_order(checkout_request: CheckoutRequest):
 @app.get("/api/orders/{order_id}")
 async def get_order(order_id: str):
     """Get order details"""
-    order = orders_db.get(order_id)
+    order = order_repository.get(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 @app.get("/api/orders/user/{user_id}")
-async def get_user_orders(user_id: str):
-    """Get all orders for a user"""
-    user_orders = [order for order in orders_db.values() if order["user_id"] == user_id]
-    return {"orders": user_orders}
+async def get_user_orders(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get a page of a user's orders, newest first"""
+    before = None
+    if cursor:
+        try:
+            before = decode_order_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    user_orders, next_before = order_repository.list_for_user(user_id, limit, before)
+    next_cursor = encode_order_cursor(*next_before) if next_before else None
+    
+    return {"orders": user_orders, "next_cursor": next_cursor}
+
+@app.on_event("shutdown")
+def close_order_repository():
+    """Flush pending orders and close the order log"""
+    order_repository.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,268 @@
+"""
+Order repositories for the mock checkout API.
+
+`InMemoryOrderRepository` keeps orders in a process-local dict.
+`LogOrderRepository` makes them durable in an append-only JSON Lines log:
+concurrent writers are group-committed so one fsync covers a whole burst of
+checkouts, and the log is replayed at startup to rebuild the indexes. Only
+file offsets are kept in memory; order bodies are read back from the log.
+"""
+
+import json
+import os
+import queue
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+# (created_at, order_id); orders of one user are kept sorted by this key
+OrderKey = Tuple[str, str]
+
+# Upper bound on how many orders a single group commit may cover
+MAX_COMMIT_BATCH = 1024
+# Seconds between checks that the writer thread is still there while an add waits
+WRITER_CHECK_INTERVAL = 1.0
+
+
+class OrderStoreError(Exception):
+    """Raised when an order could not be made durable"""
+
+
+class OrderRepository:
+    """Interface shared by every order backend"""
+
+    def add(self, order: Dict[str, Any]) -> None:
+        """Store a new order; returns once it is durable for durable backends"""
+        raise NotImplementedError
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Return an order by id, or None if it does not exist"""
+        raise NotImplementedError
+
+    def list_for_user(
+        self, user_id: str, limit: int, before: Optional[OrderKey] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[OrderKey]]:
+        """Return up to `limit` of a user's orders older than `before`, newest first
+
+        The second element is the key to pass as `before` for the next page,
+        or None if there are no older orders.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the repository"""
+
+
+class InMemoryOrderRepository(OrderRepository):
+    """Process-local order store with a per-user index sorted by created_at"""
+
+    def __init__(self):
+        self._orders: Dict[str, Any] = {}
+        self._user_orders: Dict[str, List[OrderKey]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: Dict[str, Any]) -> None:
+        with self._lock:
+            self._index(order["order_id"], order["user_id"], order["created_at"], order)
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._orders.get(order_id)
+        return None if entry is None else self._load(entry)
+
+    def list_for_user(
+        self, user_id: str, limit: int, before: Optional[OrderKey] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[OrderKey]]:
+        keys = self._user_orders.get(user_id, [])
+
+        # Walk the ascending index backwards from just before `before`
+        end = len(keys) if before is None else bisect_left(keys, before)
+        start = max(0, end - limit)
+        page = keys[start:end][::-1]
+
+        orders = [self._load(self._orders[order_id]) for _, order_id in page]
+        next_before = page[-1] if page and start > 0 else None
+        return orders, next_before
+
+    def _index(self, order_id: str, user_id: str, created_at: str, entry: Any) -> None:
+        if order_id not in self._orders:
+            insort(self._user_orders.setdefault(user_id, []), (created_at, order_id))
+        self._orders[order_id] = entry
+
+    def _load(self, entry: Any) -> Dict[str, Any]:
+        return entry
+
+
+class LogOrderRepository(InMemoryOrderRepository):
+    """Durable order store backed by an append-only, group-committed log"""
+
+    def __init__(self, path: str, fsync: bool = True):
+        super().__init__()
+        self.path = path
+        self.fsync = fsync
+        self.commits = 0
+        self.committed_orders = 0
+        self.skipped_records = 0
+        # Set when a failed commit could not be rolled back; no further writes are accepted
+        self._broken: Optional[BaseException] = None
+        self._closed = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._replay()
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        self._pending: "queue.Queue[Optional[_PendingWrite]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="order-log-writer", daemon=True)
+        self._writer.start()
+
+    def add(self, order: Dict[str, Any]) -> None:
+        if self._closed:
+            raise OrderStoreError("Order log is closed")
+        pending = _PendingWrite(order)
+        self._pending.put(pending)
+        while not pending.done.wait(WRITER_CHECK_INTERVAL):
+            # A writer that exited (closed, or died) will never get to this order
+            if not self._writer.is_alive() and not pending.done.is_set():
+                raise OrderStoreError(f"Order log writer stopped before persisting order {order.get('order_id')}")
+        if pending.error is not None:
+            raise OrderStoreError(f"Could not persist order {order.get('order_id')}") from pending.error
+
+    def close(self) -> None:
+        self._closed = True
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        os.close(self._fd)
+
+    def _load(self, entry: Tuple[int, int]) -> Dict[str, Any]:
+        offset, length = entry
+        return json.loads(os.pread(self._fd, length, offset))
+
+    def _replay(self) -> None:
+        """Rebuild the indexes from the log, dropping a torn final record"""
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Only the last line can lack a newline
+                    break
+                try:
+                    order = json.loads(line)
+                    order_id, user_id, created_at = order["order_id"], order["user_id"], order["created_at"]
+                except (ValueError, TypeError, KeyError):
+                    # A damaged record inside the log: skip it, keep the orders after it
+                    self.skipped_records += 1
+                else:
+                    self._orders[order_id] = (offset, len(line))
+                    self._user_orders.setdefault(user_id, []).append((created_at, order_id))
+                offset += len(line)
+        for keys in self._user_orders.values():
+            keys.sort()
+        if offset < os.path.getsize(self.path):
+            # A crash mid-append leaves a partial final record; cut it off
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def _write_loop(self) -> None:
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+            # Everything that queued up behind the previous fsync joins this commit
+            batch = [first]
+            stop = False
+            while len(batch) < MAX_COMMIT_BATCH:
+                try:
+                    pending = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List["_PendingWrite"]) -> None:
+        writable, records = [], []
+        for pending in batch:
+            try:
+                order = pending.order
+                record = (json.dumps(order) + "\n").encode("utf-8")
+                pending.key = (order["order_id"], order["user_id"], order["created_at"])
+            except (TypeError, ValueError, KeyError) as e:
+                # Only this order fails; the rest of the batch is still committed
+                pending.error = e
+                pending.done.set()
+            else:
+                writable.append(pending)
+                records.append(record)
+        batch = writable
+        if not batch:
+            return
+        try:
+            if self._broken is not None:
+                raise OrderStoreError("Order log is unusable after a failed rollback") from self._broken
+            data = memoryview(b"".join(records))
+            while data:
+                data = data[os.write(self._fd, data):]
+            if self.fsync:
+                os.fsync(self._fd)
+        except (OSError, OrderStoreError) as e:
+            self._rollback(e)
+            for pending in batch:
+                pending.error = e
+                pending.done.set()
+            return
+
+        # Orders become visible only once they are durable
+        with self._lock:
+            for pending, record in zip(batch, records):
+                self._index(*pending.key, (self._size, len(record)))
+                self._size += len(record)
+        self.commits += 1
+        self.committed_orders += len(batch)
+        for pending in batch:
+            pending.done.set()
+
+    def _rollback(self, error: BaseException) -> None:
+        """Cut the log back to its last commit, so callers told an order failed never see it again"""
+        if self._broken is not None:
+            return
+        try:
+            # The next commit's fsync makes the truncation durable
+            os.ftruncate(self._fd, self._size)
+        except OSError as e:
+            # The log may now hold orders that were reported as failed, and
+            # later records would be indexed at the wrong offsets
+            self._broken = e
+        else:
+            if os.fstat(self._fd).st_size != self._size:
+                self._broken = error
+
+
+class _PendingWrite:
+    """An order waiting for the next group commit"""
+
+    __slots__ = ("order", "key", "done", "error")
+
+    def __init__(self, order: Dict[str, Any]):
+        self.order = order
+        # (order_id, user_id, created_at), read when the order is serialized
+        self.key: Optional[Tuple[str, str, str]] = None
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+def open_order_repository(path: Optional[str] = None) -> OrderRepository:
+    """Durable log repository at `path`, or an in-memory one if no path is given"""
+    if path:
+        return LogOrderRepository(path)
+    return InMemoryOrderRepository()
@@ -0,0 +1,230 @@
+"""
+Agent executor that runs the tool calls of one step concurrently.
+
+`create_openai_tools_agent` can return several tool calls in a single step
+(e.g. details for three products being compared). `AgentExecutor` runs them
+one after another; `ParallelAgentExecutor` dispatches them together, bounded
+by `max_parallel_tools`, gives each call `tool_timeout` seconds and hands the
+observations back in call order, so the step takes about as long as its
+slowest call.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.agent import ExceptionTool
+from langchain.agents.tools import InvalidTool
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
+from langchain_core.exceptions import OutputParserException
+from langchain_core.tools import BaseTool
+
+DEFAULT_MAX_PARALLEL_TOOLS = int(os.getenv("AGENT_MAX_PARALLEL_TOOLS", "4"))
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("AGENT_TOOL_TIMEOUT", "30"))
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs independent tool calls of a step concurrently"""
+
+    max_parallel_tools: int = DEFAULT_MAX_PARALLEL_TOOLS
+    """Upper bound on tool calls running at the same time within one step"""
+    tool_timeout: Optional[float] = DEFAULT_TOOL_TIMEOUT
+    """Seconds a single tool call may take before its observation becomes a timeout notice"""
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        callbacks = run_manager.get_child() if run_manager else None
+        try:
+            output = self.agent.plan(self._prepare_intermediate_steps(intermediate_steps), callbacks=callbacks, **inputs)
+        except OutputParserException as e:
+            action = self._parsing_error_action(e)
+            if run_manager:
+                run_manager.on_agent_action(action, color="green")
+            observation = ExceptionTool().run(
+                action.tool_input,
+                verbose=self.verbose,
+                color=None,
+                callbacks=callbacks,
+                **self.agent.tool_run_logging_kwargs(),
+            )
+            yield AgentStep(action=action, observation=observation)
+            return
+
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+
+        actions = [output] if isinstance(output, AgentAction) else list(output)
+        for action in actions:
+            yield action
+        for action in actions:
+            if run_manager:
+                run_manager.on_agent_action(action, color="green")
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_parallel_tools, len(actions))))
+        started: List[Optional[float]] = [None] * len(actions)
+
+        def perform(index: int, action: AgentAction) -> AgentStep:
+            started[index] = time.monotonic()
+            return self._perform_action(action, name_to_tool_map, color_mapping, run_manager)
+
+        try:
+            # Each call runs in a copy of the caller's context (e.g. its tracing span)
+            futures = [
+                pool.submit(contextvars.copy_context().run, perform, index, action)
+                for index, action in enumerate(actions)
+            ]
+            for index, (action, future) in enumerate(zip(actions, futures)):
+                yield self._wait_for_step(action, future, lambda: started[index])
+        finally:
+            # Don't let a hung tool hold up the agent; its thread finishes on its own
+            pool.shutdown(wait=False)
+
+    def _wait_for_step(self, action: AgentAction, future: Future, started_at: Callable[[], Optional[float]]) -> AgentStep:
+        """Result of a dispatched call, or a timeout notice once it ran tool_timeout seconds"""
+        if self.tool_timeout is None:
+            return future.result()
+        while True:
+            begun = started_at()
+            # Calls queued behind max_parallel_tools only start their clock when they run
+            wait = self.tool_timeout if begun is None else begun + self.tool_timeout - time.monotonic()
+            try:
+                return future.result(timeout=max(0.0, wait))
+            except FutureTimeoutError:
+                begun = started_at()
+                if begun is not None and time.monotonic() >= begun + self.tool_timeout:
+                    future.cancel()
+                    return AgentStep(action=action, observation=self._timeout_observation(action))
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        callbacks = run_manager.get_child() if run_manager else None
+        try:
+            output = await self.agent.aplan(
+                self._prepare_intermediate_steps(intermediate_steps), callbacks=callbacks, **inputs
+            )
+        except OutputParserException as e:
+            action = self._parsing_error_action(e)
+            observation = await ExceptionTool().arun(
+                action.tool_input,
+                verbose=self.verbose,
+                color=None,
+                callbacks=callbacks,
+                **self.agent.tool_run_logging_kwargs(),
+            )
+            yield AgentStep(action=action, observation=observation)
+            return
+
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+
+        actions = [output] if isinstance(output, AgentAction) else list(output)
+        for action in actions:
+            yield action
+
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_tools))
+
+        async def perform(action: AgentAction) -> AgentStep:
+            async with semaphore:
+                if run_manager:
+                    await run_manager.on_agent_action(action, verbose=self.verbose, color="green")
+                try:
+                    return await asyncio.wait_for(
+                        self._aperform_action(action, name_to_tool_map, color_mapping, run_manager),
+                        self.tool_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    return AgentStep(action=action, observation=self._timeout_observation(action))
+
+        for step in await asyncio.gather(*[perform(action) for action in actions]):
+            yield step
+
+    def _parsing_error_action(self, e: OutputParserException) -> AgentAction:
+        """Turn an unparseable model reply into an observation, as AgentExecutor does"""
+        if isinstance(self.handle_parsing_errors, bool):
+            if not self.handle_parsing_errors:
+                raise ValueError(
+                    "An output parsing error occurred. "
+                    "In order to pass this error back to the agent and have it try "
+                    "again, pass `handle_parsing_errors=True` to the AgentExecutor. "
+                    f"This is the error: {str(e)}"
+                )
+            if e.send_to_llm:
+                return AgentAction("_Exception", str(e.observation), str(e.llm_output))
+            return AgentAction("_Exception", "Invalid or incomplete response", str(e))
+        if isinstance(self.handle_parsing_errors, str):
+            return AgentAction("_Exception", self.handle_parsing_errors, str(e))
+        if callable(self.handle_parsing_errors):
+            return AgentAction("_Exception", self.handle_parsing_errors(e), str(e))
+        raise ValueError("Got unexpected type of `handle_parsing_errors`")
+
+    def _timeout_observation(self, action: AgentAction) -> str:
+        return f"{action.tool} did not respond within {self.tool_timeout:g} seconds."
+
+    def _tool_call(
+        self, action: AgentAction, name_to_tool_map: Dict[str, BaseTool], color_mapping: Dict[str, str]
+    ) -> Tuple[BaseTool, object, Optional[str], dict]:
+        """(tool, input, color, run kwargs) for an action; unknown tools map to InvalidTool"""
+        tool_run_kwargs = self.agent.tool_run_logging_kwargs()
+        tool = name_to_tool_map.get(action.tool)
+        if tool is None:
+            tool_input = {
+                "requested_tool_name": action.tool,
+                "available_tool_names": list(name_to_tool_map.keys()),
+            }
+            return InvalidTool(), tool_input, None, tool_run_kwargs
+        if tool.return_direct:
+            tool_run_kwargs["llm_prefix"] = ""
+        return tool, action.tool_input, color_mapping[action.tool], tool_run_kwargs
+
+    def _perform_action(
+        self,
+        action: AgentAction,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        run_manager: Optional[CallbackManagerForChainRun],
+    ) -> AgentStep:
+        tool, tool_input, color, tool_run_kwargs = self._tool_call(action, name_to_tool_map, color_mapping)
+        observation = tool.run(
+            tool_input,
+            verbose=self.verbose,
+            color=color,
+            callbacks=run_manager.get_child() if run_manager else None,
+            **tool_run_kwargs,
+        )
+        return AgentStep(action=action, observation=observation)
+
+    async def _aperform_action(
+        self,
+        action: AgentAction,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        run_manager: Optional[AsyncCallbackManagerForChainRun],
+    ) -> AgentStep:
+        tool, tool_input, color, tool_run_kwargs = self._tool_call(action, name_to_tool_map, color_mapping)
+        observation = await tool.arun(
+            tool_input,
+            verbose=self.verbose,
+            color=color,
+            callbacks=run_manager.get_child() if run_manager else None,
+            **tool_run_kwargs,
+        )
+        return AgentStep(action=action, observation=observation)
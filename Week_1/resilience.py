@@ -0,0 +1,169 @@
+"""
+Failure handling for the agent's HTTP calls.
+
+Every backend (product, user, checkout and order APIs) gets a
+`CircuitBreaker`. After `failure_threshold` consecutive failures (transport
+errors, timeouts, 5xx responses) it opens, and calls fail fast with
+`BackendUnavailable` until `reset_timeout` has passed; then a single trial
+call decides whether it closes again. `RetryPolicy` retries idempotent
+requests on the same kinds of failure, with capped, fully jittered
+exponential backoff.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("AGENT_BREAKER_FAILURES", "5"))
+DEFAULT_RESET_TIMEOUT = float(os.getenv("AGENT_BREAKER_RESET_TIMEOUT", "30"))
+DEFAULT_RETRIES = int(os.getenv("AGENT_HTTP_RETRIES", "2"))
+DEFAULT_BACKOFF = float(os.getenv("AGENT_HTTP_RETRY_BACKOFF", "0.2"))
+MAX_BACKOFF = 2.0
+
+# Responses that mean "try again shortly" rather than "bad request"
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+class BackendUnavailable(httpx.HTTPError):
+    """Raised without sending the request while a backend's circuit is open"""
+
+    def __init__(self, backend: str):
+        super().__init__(f"{backend} service unavailable, try again later")
+        self.backend = backend
+
+
+def is_failure(error: Exception) -> bool:
+    """Whether an error says the backend is unhealthy, as opposed to the request being wrong"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+class RetryPolicy:
+    """How often, and after how long, a failed idempotent request is tried again"""
+
+    def __init__(self, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF, max_backoff: float = MAX_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based), with full jitter"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one backend, with retry and timeout counters"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.opened = 0
+
+    async def call(self, send: Callable[[], Awaitable[T]]) -> T:
+        """Await send() if the circuit allows it, recording the outcome"""
+        self._before_call()
+        try:
+            result = await send()
+        except httpx.HTTPError as e:
+            if is_failure(e):
+                self._record_failure(e)
+            else:
+                self._record_success()
+            raise
+        except BaseException:
+            # Cancelled: says nothing about the backend, but frees a trial slot
+            with self._lock:
+                self._probing = False
+            raise
+        self._record_success()
+        return result
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    raise BackendUnavailable(self.name)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                # Only one trial call at a time while the backend is suspect
+                if self._probing:
+                    self.short_circuited += 1
+                    raise BackendUnavailable(self.name)
+                self._probing = True
+            self.requests += 1
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self._probing = False
+
+    def _record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if isinstance(error, httpx.TimeoutException):
+                self.timeouts += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self.state
+            if state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                state = self.HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "requests": self.requests,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "retries": self.retries,
+                "short_circuited": self.short_circuited,
+                "opened": self.opened,
+            }
@@ -0,0 +1,470 @@
+"""
+In-memory search index for the product catalog.
+
+The index works from a CatalogStore's rows rather than copies of the
+products: sorting and facets are vectorized over the store's columns, and
+text matches are confirmed against its string pool. What it keeps itself:
+
+- an n-gram inverted index over names and descriptions. Each text is padded
+  so every substring shorter than an n-gram is the prefix of one, which lets
+  one- and two-character queries use the postings too
+- a posting list per category and per brand dictionary code
+- a price run: rows sorted by price, searched with np.searchsorted, plus a
+  short unsorted tail of rows written since the run was last merged
+
+Postings hold compact arrays of row numbers. A search starts from whichever
+filter has the fewest candidates and checks the other filters against the
+candidates' columns and postings, so it never scans the whole catalog.
+
+Postings are append-only. Rows whose text, category or brand changed or that
+were deleted stay in them until enough entries are stale to rebuild; every
+candidate is checked against the live row and its current columns, so stale
+entries never show up in results.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from catalog_store import CatalogStore
+
+NGRAM_SIZE = 3
+# Pads each indexed text so its last characters also start an n-gram
+_PAD = "\0" * (NGRAM_SIZE - 1)
+
+# Orderings understood by ProductSearchIndex.search_page
+SORT_OPTIONS = ("relevance", "price", "-price", "rating", "-rating")
+
+# Upper edges of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (25, 50, 100, 200, 500)
+# Rating facets are cumulative ("4.0 and up")
+RATING_THRESHOLDS = (4.5, 4.0, 3.0, 2.0, 1.0)
+
+# Rebuild the postings once stale entries outnumber live ones by this factor
+_REBUILD_RATIO = 1.0
+# Merge the price tail into the run once it holds this fraction of the run (or _PRICE_TAIL_MIN rows)
+_PRICE_TAIL_FRACTION = 1 / 32
+_PRICE_TAIL_MIN = 4096
+_EMPTY = np.zeros(0, dtype=np.int64)
+_FILTERED_FIELDS = ("category", "brand")
+# A substring check in Python costs about as much as this many posting entries in NumPy
+_VERIFY_COST = 200
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """Return the set of character n-grams in an already lowercased string"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _rows_of(postings: array) -> np.ndarray:
+    # tobytes copies without exporting a buffer, which would make a concurrent append fail
+    return np.frombuffer(postings.tobytes(), dtype=np.int32).astype(np.int64)
+
+
+class ProductSearchIndex:
+    """N-gram, category, brand and price index over a CatalogStore, answering filtered, sorted and faceted searches"""
+
+    def __init__(self, store: CatalogStore):
+        self.store = store
+        # n-gram -> rows whose padded name or description contained it when indexed
+        self.text_index: Dict[str, array] = {}
+        # Prefix shorter than an n-gram -> the indexed n-grams starting with it
+        self._prefixes: Dict[str, Set[str]] = {}
+        # Field -> dictionary code -> rows that had the code when indexed
+        self.code_index: Dict[str, Dict[int, array]] = {field: {} for field in _FILTERED_FIELDS}
+        # (prices ascending, their rows, rows written since); replaced whole when merged
+        self._price_run: Tuple[np.ndarray, np.ndarray, array] = (np.zeros(0), _EMPTY, array("i"))
+        # Per row: hash of the indexed text (to skip unchanged rewrites), its n-gram count,
+        # whether its postings may hold text it no longer has, and its indexed codes
+        self._text_hashes = np.zeros(0, dtype=np.int64)
+        self._gram_counts = np.zeros(0, dtype=np.int32)
+        self._text_changed = np.zeros(0, dtype=np.bool_)
+        self._codes = {field: np.zeros(0, dtype=np.int32) for field in _FILTERED_FIELDS}
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.store
+
+    def on_catalog_change(self, upserted: List[Dict], deleted: List[str]) -> None:
+        """CatalogStore listener that keeps the postings in sync incrementally"""
+        self._reserve(self.store.row_count)
+        rows = array("i")
+        for product in upserted:
+            row = self.store.row_of(product["id"])
+            if row is not None:
+                rows.append(row)
+                self._index_row(row)
+        self._index_codes(np.unique(_rows_of(rows)))
+        self._add_prices(rows)
+        # Deleted rows are dropped by the live check; their entries go stale
+        live = self.store.column("live")
+        live_entries = int(self._gram_counts[:len(live)][live].sum()) + len(_FILTERED_FIELDS) * int(live.sum())
+        if self._entries - live_entries > _REBUILD_RATIO * live_entries + 1024:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Re-create the postings and the price run from the live rows, dropping stale entries"""
+        self.text_index = {}
+        self._prefixes = {}
+        self.code_index = {field: {} for field in _FILTERED_FIELDS}
+        self._text_hashes[:] = 0
+        self._gram_counts[:] = 0
+        self._text_changed[:] = False
+        for codes in self._codes.values():
+            codes[:] = -1
+        self._entries = 0
+        rows = np.flatnonzero(self.store.column("live"))
+        for row in rows.tolist():
+            self._index_row(row)
+        self._index_codes(rows)
+        prices = self.store.column("price")[rows]
+        order = np.argsort(prices, kind="stable")
+        self._price_run = (prices[order], rows[order], array("i"))
+
+    def _reserve(self, rows: int) -> None:
+        if rows > len(self._text_hashes):
+            capacity = max(rows, 2 * len(self._text_hashes), 1024)
+            self._text_hashes = _grown(self._text_hashes, capacity, 0)
+            self._gram_counts = _grown(self._gram_counts, capacity, 0)
+            self._text_changed = _grown(self._text_changed, capacity, False)
+            for field in _FILTERED_FIELDS:
+                self._codes[field] = _grown(self._codes[field], capacity, -1)
+
+    def _text(self, row: int) -> Tuple[str, str]:
+        return self.store.text(row, "name").lower(), self.store.text(row, "description").lower()
+
+    def _index_codes(self, rows: np.ndarray) -> None:
+        """Add rows to the posting lists of their category and brand codes, where those changed"""
+        for field in _FILTERED_FIELDS:
+            codes = self.store.column(field)[rows]
+            changed = self._codes[field][rows] != codes
+            moved, codes = rows[changed], codes[changed]
+            self._codes[field][moved] = codes
+            self._entries += len(moved)
+            # Group the moved rows by code
+            order = np.argsort(codes, kind="stable")
+            moved, codes = moved[order].astype(np.int32), codes[order]
+            starts = np.flatnonzero(np.diff(codes, prepend=-1))
+            for start, end in zip(starts.tolist(), np.append(starts[1:], len(codes)).tolist()):
+                code = int(codes[start])
+                postings = self.code_index[field].get(code)
+                if postings is None:
+                    postings = self.code_index[field][code] = array("i")
+                postings.frombytes(moved[start:end].tobytes())
+
+    def _index_row(self, row: int) -> None:
+        name, description = self._text(row)
+        text_hash = hash((name, description))
+        if self._gram_counts[row]:
+            if self._text_hashes[row] == text_hash:
+                return
+            # The old text's n-grams stay in the postings
+            self._text_changed[row] = True
+        grams = ngrams(name + _PAD) | ngrams(description + _PAD)
+        for gram in grams:
+            postings = self.text_index.get(gram)
+            if postings is None:
+                postings = self.text_index[gram] = array("i")
+                for length in range(1, NGRAM_SIZE):
+                    self._prefixes.setdefault(gram[:length], set()).add(gram)
+            postings.append(row)
+        self._text_hashes[row] = text_hash
+        self._gram_counts[row] = len(grams)
+        self._entries += len(grams)
+
+    def _add_prices(self, rows: array) -> None:
+        """Queue written rows on the price tail, merging it into the run once it is long"""
+        if not rows:
+            return
+        run_prices, run_rows, tail = self._price_run
+        tail.extend(rows)
+        if len(tail) < max(_PRICE_TAIL_MIN, _PRICE_TAIL_FRACTION * len(run_rows)):
+            return
+        # Drop run entries of rewritten or deleted rows, then insert the sorted tail
+        price, live = self.store.column("price"), self.store.column("live")
+        tail_rows = np.unique(_rows_of(tail))
+        tail_rows = tail_rows[live[tail_rows]]
+        rewritten = np.zeros(len(live), dtype=np.bool_)
+        rewritten[tail_rows] = True
+        keep = live[run_rows] & ~rewritten[run_rows]
+        run_prices, run_rows = run_prices[keep], run_rows[keep]
+        tail_prices = price[tail_rows]
+        order = np.argsort(tail_prices, kind="stable")
+        at = np.searchsorted(run_prices, tail_prices[order], side="right")
+        self._price_run = (np.insert(run_prices, at, tail_prices[order]), np.insert(run_rows, at, tail_rows[order]), array("i"))
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+    ) -> List[str]:
+        """Return ids of products matching every given filter, in catalog order"""
+        return self._ids(self.match_rows(query, category, min_price, max_price, brand))
+
+    def search_page(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List[str]]:
+        """Return (total matches, ids of one page) for the given filters and ordering
+
+        Only the first offset + limit results are ranked: matches past the
+        page's cut-off on the primary sort key are dropped before sorting.
+        """
+        rows = self.match_rows(query, category, min_price, max_price, brand)
+        return len(rows), self._ids(self.rank(rows, sort, query, offset, limit))
+
+    def count(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+    ) -> int:
+        """Number of products matching every given filter"""
+        return len(self.match_rows(query, category, min_price, max_price, brand))
+
+    def rank(self, rows: np.ndarray, sort: Optional[str], query: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> np.ndarray:
+        """Rows (in catalog order) ordered by one of SORT_OPTIONS and cut to a page; ties keep catalog order"""
+        if sort is None:
+            return rows[offset:None if limit is None else offset + limit]
+        # Sort keys, primary first
+        if sort in ("price", "-price"):
+            keys = [self.store.column("price")[rows]]
+        elif sort in ("rating", "-rating"):
+            keys = [self.store.column("rating")[rows]]
+        elif sort == "relevance":
+            query = query.lower() if query else None
+            scores = np.fromiter((self.relevance(int(row), query) for row in rows), dtype=np.int64, count=len(rows))
+            keys = [-scores, -self.store.column("rating")[rows]]
+        else:
+            raise ValueError(f"Unknown sort: {sort}")
+        if sort.startswith("-"):
+            keys[0] = -keys[0]
+
+        if limit is not None and offset + limit < len(rows):
+            # Nothing ranked after the page can beat its last primary key
+            cutoff = np.partition(keys[0], offset + limit - 1)[offset + limit - 1]
+            keep = keys[0] <= cutoff
+            rows = rows[keep]
+            keys = [key[keep] for key in keys]
+        # lexsort sorts by its last key first
+        order = np.lexsort([rows] + keys[::-1])
+        return rows[order][offset:None if limit is None else offset + limit]
+
+    def relevance(self, row: int, query: Optional[str]) -> int:
+        """Score a lowercased query against a row: name prefix > name > description"""
+        if not query:
+            return 0
+        name, description = self._text(row)
+        score = 0
+        if name.startswith(query):
+            score += 4
+        elif query in name:
+            score += 2
+        if query in description:
+            score += 1
+        return score
+
+    def facets(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        facet_limit: int = 10,
+    ) -> Dict:
+        """Count matches per category, brand, price bucket and rating threshold
+
+        Counts are taken over the matching rows' columns; no product is
+        materialized.
+        """
+        store = self.store
+        rows = self.match_rows(query, category, min_price, max_price, brand)
+        prices = store.column("price")[rows]
+        ratings = store.column("rating")[rows]
+        price_counts = np.bincount(np.searchsorted(PRICE_BUCKET_EDGES, prices, side="right"), minlength=len(PRICE_BUCKET_EDGES) + 1)
+        rating_counts = [int((ratings >= threshold).sum()) for threshold in RATING_THRESHOLDS]
+
+        def top(field: str, values: List[str]) -> Dict[str, int]:
+            counts = np.bincount(store.column(field)[rows], minlength=len(values))
+            present = [(values[code], int(count)) for code, count in enumerate(counts) if count]
+            present.sort(key=lambda item: (-item[1], item[0]))
+            return dict(present[:facet_limit])
+
+        lower_edges = (0,) + PRICE_BUCKET_EDGES
+        upper_edges = PRICE_BUCKET_EDGES + (None,)
+        return {
+            "count": len(rows),
+            "category": top("category", store.categories),
+            "brand": top("brand", store.brands),
+            "price": [
+                {"min": lo, "max": hi, "count": int(count)}
+                for lo, hi, count in zip(lower_edges, upper_edges, price_counts) if count
+            ],
+            "rating": [
+                {"min": threshold, "count": count}
+                for threshold, count in zip(RATING_THRESHOLDS, rating_counts) if count
+            ],
+        }
+
+    def match(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+    ) -> Set[str]:
+        """Return the unordered set of product ids matching every given filter"""
+        return set(self._ids(self.match_rows(query, category, min_price, max_price, brand)))
+
+    def match_rows(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+    ) -> np.ndarray:
+        """Rows of the products matching every given filter, in catalog order
+
+        The filter with the fewest candidates supplies the starting rows; the
+        other filters are then checked on those rows alone.
+        """
+        store = self.store
+        query = query.lower() if query else None
+        live = store.column("live")
+
+        # Filter -> (candidate count, fetch candidates) for each filter given
+        sources = {}
+        conditions = []
+        for field, value in (("category", category), ("brand", brand)):
+            if value:
+                code = store.code(field, value)
+                postings = None if code is None else self.code_index[field].get(code)
+                if postings is None:
+                    return _EMPTY
+                sources[field] = (len(postings), lambda postings=postings: _rows_of(postings))
+                conditions.append((field, np.equal, code))
+        if min_price is not None or max_price is not None:
+            run_prices, run_rows, tail = self._price_run
+            lo = 0 if min_price is None else int(np.searchsorted(run_prices, min_price, side="left"))
+            hi = len(run_prices) if max_price is None else int(np.searchsorted(run_prices, max_price, side="right"))
+            sources["price"] = (hi - lo + len(tail), lambda: np.concatenate((run_rows[lo:hi], _rows_of(tail))))
+            if min_price is not None:
+                conditions.append(("price", np.greater_equal, min_price))
+            if max_price is not None:
+                conditions.append(("price", np.less_equal, max_price))
+        text = None
+        if query:
+            text = self._text_postings(query)
+            if text is None:
+                return _EMPTY
+            sources["text"] = (text.size, lambda: text.rows(len(live)))
+
+        if not sources:
+            return np.flatnonzero(live)
+        start = min(sources, key=lambda name: sources[name][0])
+        # Postings may repeat a row and list rewritten rows out of order
+        rows = np.unique(sources[start][1]())
+        # Rows added since `live` was read are left to the next search
+        rows = rows[rows < len(live)]
+        rows = rows[live[rows]]
+        # Also confirms the starting rows, whose postings may be stale
+        for field, compare, value in conditions:
+            rows = rows[compare(store.column(field)[rows], value)]
+
+        if text is None:
+            return rows
+        # With few rows left, checking their text in Python is cheaper than reading long postings
+        if start == "text" or text.size < _VERIFY_COST * len(rows):
+            if start != "text":
+                rows = rows[text.contains(rows, len(live))]
+            # N-gram hits are exact for queries no longer than an n-gram, on rows whose text never changed
+            check = self._text_changed[rows] if text.exact else np.ones(len(rows), dtype=np.bool_)
+        else:
+            check = np.ones(len(rows), dtype=np.bool_)
+        if check.any():
+            texts = (self._text(int(row)) for row in rows[check])
+            keep = ~check
+            keep[check] = np.fromiter((query in name or query in description for name, description in texts), dtype=np.bool_, count=int(check.sum()))
+            rows = rows[keep]
+        return rows
+
+    def _text_postings(self, query: str) -> Optional["_TextPostings"]:
+        """Postings that hold every row containing a lowercased query, or None if no row can"""
+        if len(query) >= NGRAM_SIZE:
+            postings = [self.text_index.get(gram) for gram in ngrams(query)]
+            if any(posting is None for posting in postings):
+                return None
+            return _TextPostings(postings, union=False, exact=len(query) == NGRAM_SIZE and _PAD[0] not in query)
+        # A shorter query starts one of the n-grams of every text containing it
+        grams = self._prefixes.get(query)
+        if not grams:
+            return None
+        return _TextPostings([self.text_index[gram] for gram in tuple(grams)], union=True, exact=_PAD[0] not in query)
+
+    def _ids(self, rows: np.ndarray) -> List[str]:
+        # A row deleted since it matched has no id any more
+        ids = map(self.store.id_of, rows.tolist())
+        return [product_id for product_id in ids if product_id is not None]
+
+
+class _TextPostings:
+    """The postings a text query's matches are drawn from: their union, or their intersection"""
+
+    def __init__(self, postings: List[array], union: bool, exact: bool):
+        self.postings = sorted(postings, key=len)
+        self.union = union
+        # Whether every listed row whose text never changed contains the query
+        self.exact = exact
+        self.size = sum(map(len, postings)) if union else len(self.postings[0])
+
+    def rows(self, row_count: int) -> np.ndarray:
+        """Candidate rows below row_count"""
+        if not self.union:
+            rows = np.unique(_rows_of(self.postings[0]))
+            rows = rows[rows < row_count]
+            return rows[self.contains(rows, row_count, skip=1)]
+        return np.flatnonzero(self._mask(row_count))
+
+    def contains(self, rows: np.ndarray, row_count: int, skip: int = 0) -> np.ndarray:
+        """Mask of the given rows (all below row_count) that are candidates"""
+        if self.union:
+            return self._mask(row_count)[rows]
+        keep = np.ones(len(rows), dtype=np.bool_)
+        # Smallest postings first, so the candidates shrink fastest
+        for posting in self.postings[skip:]:
+            if not keep.any():
+                break
+            keep[keep] = np.isin(rows[keep], _rows_of(posting))
+        return keep
+
+    def _mask(self, row_count: int) -> np.ndarray:
+        mask = np.zeros(row_count, dtype=np.bool_)
+        for posting in self.postings:
+            rows = _rows_of(posting)
+            mask[rows[rows < row_count]] = True
+        return mask
+
+
+def _grown(column: np.ndarray, capacity: int, fill) -> np.ndarray:
+    grown = np.full(capacity, fill, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
@@ -0,0 +1,105 @@
+"""
+Per-session shopping agents over shared resources.
+
+Every session gets its own ShoppingAgent (conversation memory and user
+context), while the LLM client, prompt, tools and HTTP pool live in a single
+AgentResources. Sessions are kept in least-recently-used order, so idle ones
+are always at the front: expiring them and enforcing the resident-session
+cap are both O(evicted).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from shopping_agent import AgentResources, ShoppingAgent
+
+DEFAULT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "10000"))
+DEFAULT_IDLE_TIMEOUT = float(os.getenv("AGENT_SESSION_IDLE_TIMEOUT", "1800"))
+
+
+class SessionManager:
+    """LRU of ShoppingAgent sessions with idle expiry and a resident-session cap"""
+
+    def __init__(
+        self,
+        resources: Optional[AgentResources] = None,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.resources = resources or AgentResources()
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self._clock = clock
+        # session_id -> (agent, last used)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> ShoppingAgent:
+        """Return the session's agent, creating it if it is new or was evicted"""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                agent = entry[0]
+            else:
+                agent = ShoppingAgent(self.resources, session_id=session_id)
+                self.created += 1
+            self._sessions[session_id] = (agent, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_lru += 1
+            return agent
+
+    def close(self, session_id: str) -> None:
+        """Forget a session, e.g. when its websocket disconnects"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_timeout and return how many went"""
+        with self._lock:
+            return self._expire(self._clock())
+
+    def _expire(self, now: float) -> int:
+        expired = 0
+        while self._sessions:
+            _, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+            expired += 1
+        self.evicted_idle += expired
+        return expired
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by all resident sessions' conversations"""
+        with self._lock:
+            agents = [agent for agent, _ in self._sessions.values()]
+        return sum(agent.memory_usage() for agent in agents)
+
+    def stats(self) -> dict:
+        memory = self.memory_usage()
+        sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "memory_bytes": memory,
+            "memory_bytes_per_session": memory // sessions if sessions else 0,
+        }
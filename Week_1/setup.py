@@ -87,7 +87,7 @@ def test_imports():
         "fastapi",
         "uvicorn",
         "pydantic",
-        "requests"
+        "httpx"
     ]
     
     failed_imports = []
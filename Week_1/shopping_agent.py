@@ -1,100 +1,182 @@
 import os
-import requests
-from typing import List, Dict, Any, Optional
+import sys
+import asyncio
+import time
+import functools
+import uuid
+import httpx
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Optional
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain.tools import tool
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import BaseMessage
-import json
+from api_client import ApiClient, shared_client
+from tool_cache import ToolResultCache, shared_tool_cache
+from intent_router import IntentRouter
+from tracing import tracer, within
+from tool_output import (
+    FacetSummary, Notice, OrderList, OrderRecord, ProductList, ProductRecord, ToolRecord, UserProfile,
+    render, rendered, tool_budget
+)
+
+# LangChain, the OpenAI client and the modules built on them are imported
+# where they are first used, so importing this module stays cheap
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
 # Load environment variables
 load_dotenv()
 
-# Debug: Print the OpenAI API key to verify it's loaded
-print("OPENAI_API_KEY:", os.getenv("OPENAI_API_KEY"))
+# Only the first page of order history is pulled into the prompt
+ORDER_HISTORY_PAGE_SIZE = 10
 
-class ShoppingAgent:
-    def __init__(self):
-        # Initialize OpenAI model
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",  # or "gpt-4", etc.
-            temperature=0.7
-        )
-        
-        # Initialize memory for conversation context
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
+# Search results shown to the model, and the fields it needs from each
+SEARCH_RESULTS_PAGE_SIZE = 5
+SEARCH_RESULT_FIELDS = "id,name,price,brand,rating,description,features"
+
+# Read timeouts per backend, in seconds; checkout writes get the most room
+BACKEND_TIMEOUTS = {
+    "products": float(os.getenv("PRODUCT_API_TIMEOUT", "5")),
+    "users": float(os.getenv("USER_API_TIMEOUT", "5")),
+    "checkout": float(os.getenv("CHECKOUT_API_TIMEOUT", "15")),
+    "orders": float(os.getenv("ORDER_API_TIMEOUT", "5")),
+}
+
+# How long a polled catalog version is trusted before asking the API again
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "5"))
+
+# Tools exposed to the model; each has an async implementation named a<tool>
+TOOL_NAMES = (
+    "search_products_tool",
+    "get_search_facets_tool",
+    "get_product_details_tool",
+    "get_user_preferences_tool",
+    "update_user_preferences_tool",
+    "create_order_tool",
+    "checkout_cart_tool",
+    "get_order_status_tool",
+    "get_user_orders_tool",
+)
+
+
+def blocking(coroutine_method):
+    """Sync twin of an async tool method, run on the API client's event loop"""
+    @functools.wraps(coroutine_method)
+    def method(self, *args, **kwargs):
+        return self.api.run_sync(coroutine_method(self, *args, **kwargs))
+    return method
+
+class ShoppingTools:
+    """Tool implementations; they keep no per-conversation state, so one instance serves every session"""
+    
+    def __init__(self, api: Optional[ApiClient] = None, tool_cache: Optional[ToolResultCache] = None):
         # API base URLs
         self.product_api_url = os.getenv("PRODUCT_API_BASE_URL", "http://localhost:8001/api/products")
         self.user_api_url = os.getenv("USER_API_BASE_URL", "http://localhost:8001/api/users")
         self.checkout_api_url = os.getenv("CHECKOUT_API_BASE_URL", "http://localhost:8001/api/checkout")
         self.order_api_url = os.getenv("ORDER_API_BASE_URL", "http://localhost:8001/api/orders")
         
-        # Current user context
-        self.current_user_id = None
-        self.user_preferences = {}
+        # Pooled HTTP client shared by every agent in the process; each API gets
+        # its own timeout and circuit breaker
+        self.api = api or shared_client()
+        for name, url in (
+            ("products", self.product_api_url),
+            ("users", self.user_api_url),
+            ("checkout", self.checkout_api_url),
+            ("orders", self.order_api_url),
+        ):
+            self.api.add_backend(name, url, BACKEND_TIMEOUTS[name])
         
-        # Create tools
+        # Read-tool results, shared across sessions and invalidated by write tools
+        self.tool_cache = tool_cache if tool_cache is not None else shared_tool_cache()
+        
+        from langchain.tools import StructuredTool
+        
+        # Create tools; the agent awaits the async versions when run under an event loop.
+        # Tool methods return records, which the model sees rendered compactly
         self.tools = [
-            self.search_products_tool,
-            self.get_product_details_tool,
-            self.get_user_preferences_tool,
-            self.update_user_preferences_tool,
-            self.create_order_tool,
-            self.get_order_status_tool,
-            self.get_user_orders_tool
+            StructuredTool.from_function(
+                func=rendered(name, getattr(self, name)),
+                coroutine=rendered(name, getattr(self, f"a{name}")),
+                name=name
+            )
+            for name in TOOL_NAMES
         ]
         
-        # Create agent
-        self.agent = self._create_agent()
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=self.tools,
-            memory=self.memory,
-            verbose=True,
-            handle_parsing_errors=True
+        self._catalog_version: Optional[int] = None
+        self._catalog_version_checked = float("-inf")
+    
+    async def acatalog_version(self) -> Optional[int]:
+        """Catalog version from the product API, polled at most every CATALOG_VERSION_TTL seconds"""
+        now = time.monotonic()
+        if now - self._catalog_version_checked < CATALOG_VERSION_TTL:
+            return self._catalog_version
+        try:
+            data = await self.api.aget_json(f"{self.product_api_url}/version")
+            self._catalog_version = data["version"]
+            self._catalog_version_checked = now
+        except httpx.HTTPError:
+            # Keep the last known version rather than invalidating on a blip
+            pass
+        return self._catalog_version
+    
+    catalog_version = blocking(acatalog_version)
+    
+    async def _cached_get_json(self, tool_name: str, args: Dict[str, Any], tags, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET through the tool cache; failed requests are never cached"""
+        key = self.tool_cache.key(tool_name, args)
+        data, epoch = self.tool_cache.lookup(key)
+        if data is None:
+            data = await self.api.aget_json(url, params=params)
+            self.tool_cache.put(key, data, tags, epoch)
+        return data
+    
+    async def fetch_user(self, user_id: str) -> Dict[str, Any]:
+        """User profile, shared by start_conversation and get_user_preferences_tool"""
+        return await self._cached_get_json(
+            "get_user_preferences_tool",
+            {"user_id": user_id},
+            [("user", user_id)],
+            f"{self.user_api_url}/{user_id}"
         )
     
-    def _create_agent(self):
-        """Create the agent with shopping-specific prompt"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful and friendly shopping assistant for an e-commerce store. 
-            Your goal is to help customers find and purchase products that match their needs and preferences.
+    async def asearch_products_tool(self, query: str = "", category: str = "", min_price: Optional[float] = None, max_price: Optional[float] = None, brand: str = "", sort: str = "") -> ToolRecord:
+        """Search for products based on criteria. Use this to find products that match customer needs. sort can be "relevance", "price", "-price", "rating" or "-rating"."""
+        try:
+            params = {
+                "limit": SEARCH_RESULTS_PAGE_SIZE,
+                "fields": SEARCH_RESULT_FIELDS
+            }
+            if query:
+                params["query"] = query
+            if category:
+                params["category"] = category
+            if min_price is not None:
+                params["min_price"] = min_price
+            if max_price is not None:
+                params["max_price"] = max_price
+            if brand:
+                params["brand"] = brand
+            if sort:
+                params["sort"] = sort
+            elif query:
+                params["sort"] = "relevance"
             
-            Key responsibilities:
-            1. Greet customers warmly and ask about their shopping needs
-            2. Gather customer preferences (budget, style, brand preferences, etc.)
-            3. Search for products that match their criteria
-            4. Present product recommendations with clear explanations
-            5. Help customers compare products if needed
-            6. Guide them through the purchase process
-            7. Offer post-purchase support (tracking orders, returns, etc.)
+            data = await self._cached_get_json("search_products_tool", params, (), self.product_api_url, params)
+            products = data.get("products", [])
             
-            Always be:
-            - Friendly and conversational
-            - Helpful and informative
-            - Patient with customer questions
-            - Clear about product features and pricing
-            - Proactive in offering relevant suggestions
+            if not products:
+                return Notice(text="No products found matching your criteria. Would you like me to search with different parameters?")
             
-            Use the available tools to search products, manage user preferences, and handle orders.
-            """),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        return create_openai_tools_agent(self.llm, self.tools, prompt)
+            return ProductList(
+                total=data.get("count", len(products)),
+                products=[ProductRecord.from_api(product) for product in products]
+            )
+            
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't search for products right now. Error: {str(e)}")
     
-    @tool
-    def search_products_tool(self, query: str = "", category: str = "", min_price: Optional[float] = None, max_price: Optional[float] = None, brand: str = "") -> str:
-        """Search for products based on criteria. Use this to find products that match customer needs."""
+    search_products_tool = blocking(asearch_products_tool)
+
+    async def aget_search_facets_tool(self, query: str = "", category: str = "", min_price: Optional[float] = None, max_price: Optional[float] = None, brand: str = "") -> ToolRecord:
+        """Summarize which categories, brands, price ranges and ratings exist for a search, with product counts. Use this to narrow down a broad request before searching."""
         try:
             params = {}
             if query:
@@ -108,84 +190,52 @@ class ShoppingAgent:
             if brand:
                 params["brand"] = brand
             
-            response = requests.get(f"{self.product_api_url}", params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            products = data.get("products", [])
-            
-            if not products:
-                return "No products found matching your criteria. Would you like me to search with different parameters?"
+            facets = await self._cached_get_json("get_search_facets_tool", params, (), f"{self.product_api_url}/facets", params)
             
-            # Format product information
-            result = f"Found {len(products)} products:\n\n"
-            for i, product in enumerate(products[:5], 1):  # Show top 5
-                result += f"{i}. **{product['name']}** - ${product['price']}\n"
-                result += f"   Brand: {product['brand']} | Rating: {product['rating']}/5\n"
-                result += f"   {product['description']}\n"
-                result += f"   Features: {', '.join(product['features'])}\n\n"
+            if not facets["count"]:
+                return Notice(text="No products match these criteria.")
             
-            return result
+            return FacetSummary(
+                count=facets["count"],
+                category=facets["category"],
+                brand=facets["brand"],
+                price=facets["price"],
+                rating=facets["rating"]
+            )
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't search for products right now. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't summarize the catalog right now. Error: {str(e)}")
     
-    @tool
-    def get_product_details_tool(self, product_id: str) -> str:
+    get_search_facets_tool = blocking(aget_search_facets_tool)
+
+    async def aget_product_details_tool(self, product_id: str) -> ToolRecord:
         """Get detailed information about a specific product by its ID."""
         try:
-            response = requests.get(f"{self.product_api_url}/{product_id}")
-            response.raise_for_status()
-            
-            product = response.json()
-            
-            result = f"**{product['name']}**\n\n"
-            result += f"**Price:** ${product['price']}\n"
-            result += f"**Brand:** {product['brand']}\n"
-            result += f"**Rating:** {product['rating']}/5\n"
-            result += f"**Category:** {product['category']}\n"
-            result += f"**Description:** {product['description']}\n"
-            result += f"**Features:** {', '.join(product['features'])}\n"
-            result += f"**In Stock:** {'Yes' if product['in_stock'] else 'No'}\n"
+            product = await self._cached_get_json(
+                "get_product_details_tool",
+                {"product_id": product_id},
+                [("product", product_id)],
+                f"{self.product_api_url}/{product_id}"
+            )
             
-            return result
+            return ProductRecord.from_api(product)
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't get product details. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't get product details. Error: {str(e)}")
     
-    @tool
-    def get_user_preferences_tool(self, user_id: str) -> str:
+    get_product_details_tool = blocking(aget_product_details_tool)
+
+    async def aget_user_preferences_tool(self, user_id: str) -> ToolRecord:
         """Get user preferences and purchase history to provide personalized recommendations."""
         try:
-            response = requests.get(f"{self.user_api_url}/{user_id}")
-            response.raise_for_status()
-            
-            user_data = response.json()
-            preferences = user_data.get("preferences", {})
-            purchase_history = user_data.get("purchase_history", [])
-            
-            result = f"**User Profile for {user_data['name']}**\n\n"
-            
-            if preferences:
-                result += "**Preferences:**\n"
-                if preferences.get("categories"):
-                    result += f"- Preferred categories: {', '.join(preferences['categories'])}\n"
-                if preferences.get("budget_range"):
-                    budget = preferences["budget_range"]
-                    result += f"- Budget range: ${budget.get('min', 0)} - ${budget.get('max', 1000)}\n"
-                if preferences.get("brands"):
-                    result += f"- Preferred brands: {', '.join(preferences['brands'])}\n"
-            
-            if purchase_history:
-                result += f"\n**Recent Purchases:** {len(purchase_history)} items\n"
+            return UserProfile.from_api(await self.fetch_user(user_id))
             
-            return result
-            
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't get user preferences. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't get user preferences. Error: {str(e)}")
     
-    @tool
-    def update_user_preferences_tool(self, user_id: str, categories: str = "", budget_min: Optional[float] = None, budget_max: Optional[float] = None, brands: str = "") -> str:
+    get_user_preferences_tool = blocking(aget_user_preferences_tool)
+
+    async def aupdate_user_preferences_tool(self, user_id: str, categories: str = "", budget_min: Optional[float] = None, budget_max: Optional[float] = None, brands: str = "") -> ToolRecord:
         """Update user preferences based on their shopping behavior and feedback."""
         try:
             preferences = {}
@@ -203,19 +253,17 @@ class ShoppingAgent:
             if brands:
                 preferences["brands"] = [brand.strip() for brand in brands.split(",")]
             
-            response = requests.put(
-                f"{self.user_api_url}/{user_id}/preferences",
-                json=preferences
-            )
-            response.raise_for_status()
+            await self.api.aput_json(f"{self.user_api_url}/{user_id}/preferences", preferences)
+            self.tool_cache.invalidate(("user", user_id))
             
-            return "User preferences updated successfully! I'll use this information to provide better recommendations."
+            return Notice(text="User preferences updated successfully! I'll use this information to provide better recommendations.")
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't update preferences. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't update preferences. Error: {str(e)}")
     
-    @tool
-    def create_order_tool(self, user_id: str, product_id: str, quantity: int = 1) -> str:
+    update_user_preferences_tool = blocking(aupdate_user_preferences_tool)
+
+    async def acreate_order_tool(self, user_id: str, product_id: str, quantity: int = 1) -> ToolRecord:
         """Create a new order for the customer."""
         try:
             order_data = {
@@ -224,78 +272,216 @@ class ShoppingAgent:
                 "quantity": quantity
             }
             
-            response = requests.post(f"{self.checkout_api_url}", json=order_data)
-            response.raise_for_status()
+            order = await self.api.apost_json(self.checkout_api_url, order_data)
+            self.tool_cache.invalidate(("user", user_id), ("product", product_id))
             
-            order = response.json()
+            return OrderRecord.from_api(order, placed=True)
             
-            result = f"🎉 **Order placed successfully!**\n\n"
-            result += f"**Order ID:** {order['order_id']}\n"
-            result += f"**Total Amount:** ${order['total_amount']}\n"
-            result += f"**Status:** {order['status']}\n"
-            result += f"**Order Date:** {order['created_at']}\n\n"
-            result += "Your order has been confirmed and will be processed soon!"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't process your order. Error: {str(e)}")
+    
+    create_order_tool = blocking(acreate_order_tool)
+
+    async def acheckout_cart_tool(self, user_id: str, items: str) -> ToolRecord:
+        """Buy several products in one order. items is a comma-separated list of product_id:quantity pairs, e.g. "1:2, 3:1"."""
+        try:
+            line_items = []
+            for entry in items.split(","):
+                if not entry.strip():
+                    continue
+                product_id, _, quantity = entry.partition(":")
+                line_items.append({
+                    "product_id": product_id.strip(),
+                    "quantity": int(quantity) if quantity.strip() else 1
+                })
+        except ValueError:
+            return Notice(text="Sorry, I couldn't read the cart. Use product_id:quantity pairs separated by commas.")
+        
+        if not line_items:
+            return Notice(text="The cart is empty. Add at least one product_id:quantity pair.")
+        
+        try:
+            order = await self.api.apost_json(
+                self.checkout_api_url,
+                {"user_id": user_id, "items": line_items}
+            )
+            self.tool_cache.invalidate(("user", user_id), *(("product", line["product_id"]) for line in line_items))
             
-            return result
+            return OrderRecord.from_api(order, placed=True)
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't process your order. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't process your order. Error: {str(e)}")
     
-    @tool
-    def get_order_status_tool(self, order_id: str) -> str:
+    checkout_cart_tool = blocking(acheckout_cart_tool)
+
+    async def aget_order_status_tool(self, order_id: str) -> ToolRecord:
         """Check the status of a specific order."""
         try:
-            response = requests.get(f"{self.order_api_url}/{order_id}")
-            response.raise_for_status()
-            
-            order = response.json()
-            
-            result = f"**Order Status**\n\n"
-            result += f"**Order ID:** {order['order_id']}\n"
-            result += f"**Status:** {order['status']}\n"
-            result += f"**Total Amount:** ${order['total_amount']}\n"
-            result += f"**Order Date:** {order['created_at']}\n"
+            order = await self._cached_get_json(
+                "get_order_status_tool",
+                {"order_id": order_id},
+                [("order", order_id)],
+                f"{self.order_api_url}/{order_id}"
+            )
             
-            return result
+            return OrderRecord.from_api(order)
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't check the order status. Error: {str(e)}"
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't check the order status. Error: {str(e)}")
     
-    @tool
-    def get_user_orders_tool(self, user_id: str) -> str:
-        """Get all orders for a specific user."""
+    get_order_status_tool = blocking(aget_order_status_tool)
+
+    async def aget_user_orders_tool(self, user_id: str) -> ToolRecord:
+        """Get the most recent orders for a specific user."""
         try:
-            response = requests.get(f"{self.order_api_url}/user/{user_id}")
-            response.raise_for_status()
-            
-            data = response.json()
+            data = await self._cached_get_json(
+                "get_user_orders_tool",
+                {"user_id": user_id},
+                [("user", user_id)],
+                f"{self.order_api_url}/user/{user_id}",
+                {"limit": ORDER_HISTORY_PAGE_SIZE}
+            )
             orders = data.get("orders", [])
             
             if not orders:
-                return "You don't have any orders yet."
+                return Notice(text="You don't have any orders yet.")
             
-            result = f"**Your Order History**\n\n"
-            for i, order in enumerate(orders, 1):
-                result += f"{i}. **Order ID:** {order['order_id']}\n"
-                result += f"   **Status:** {order['status']}\n"
-                result += f"   **Amount:** ${order['total_amount']}\n"
-                result += f"   **Date:** {order['created_at']}\n\n"
+            return OrderList(
+                orders=[OrderRecord.from_api(order) for order in orders],
+                more=bool(data.get("next_cursor"))
+            )
+            
+        except httpx.HTTPError as e:
+            return Notice(text=f"Sorry, I couldn't get your order history. Error: {str(e)}")
+    
+    get_user_orders_tool = blocking(aget_user_orders_tool)
+
+
+class AgentResources:
+    """Heavyweight, stateless parts of the agent, built once and shared by every session"""
+    
+    def __init__(self, api: Optional[ApiClient] = None, tool_cache: Optional[ToolResultCache] = None, llm: Optional["BaseChatModel"] = None):
+        from llm_cache import CachingChatModel, LLMResponseCache
+        from streaming import StreamingChatModel
+        
+        self.toolkit = ShoppingTools(api, tool_cache)
+        self.tools = self.toolkit.tools
+        
+        # Initialize OpenAI model unless one is passed in (e.g. a scripted model
+        # for offline runs); async runs stream its tokens
+        if llm is None:
+            from langchain_community.chat_models import ChatOpenAI
+            
+            llm = ChatOpenAI(
+                model_name="gpt-3.5-turbo",  # or "gpt-4", etc.
+                temperature=0.7
+            )
+        self.llm = StreamingChatModel(model=llm)
+        
+        # Optional on-disk cache of model responses, keyed per catalog version
+        self.llm_cache = None
+        cache_path = os.getenv("AGENT_LLM_CACHE_PATH")
+        if cache_path:
+            self.llm_cache = LLMResponseCache(cache_path)
+            self.llm = CachingChatModel(
+                model=self.llm,
+                response_cache=self.llm_cache,
+                allow_sampling=os.getenv("AGENT_LLM_CACHE_ALLOW_SAMPLING", "false").lower() == "true",
+                catalog_version=self.toolkit.catalog_version,
+                acatalog_version=self.toolkit.acatalog_version
+            )
+        
+        # A span per model call when tracing; set on the outermost model so cached replies count too
+        if tracer.enabled:
+            from llm_tracing import ModelSpanHandler
+            
+            self.llm.callbacks = [ModelSpanHandler(tracer)]
+        self.agent = self._create_agent()
+        
+        # Structured requests that skip the model and call one tool directly
+        self.router = IntentRouter()
+    
+    def _create_agent(self):
+        """Create the agent with shopping-specific prompt"""
+        from langchain.agents import create_openai_tools_agent
+        from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+        
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a helpful and friendly shopping assistant for an e-commerce store. 
+            Your goal is to help customers find and purchase products that match their needs and preferences.
+            
+            Key responsibilities:
+            1. Greet customers warmly and ask about their shopping needs
+            2. Gather customer preferences (budget, style, brand preferences, etc.)
+            3. Search for products that match their criteria
+            4. Present product recommendations with clear explanations
+            5. Help customers compare products if needed
+            6. Guide them through the purchase process
+            7. Offer post-purchase support (tracking orders, returns, etc.)
             
-            return result
+            Always be:
+            - Friendly and conversational
+            - Helpful and informative
+            - Patient with customer questions
+            - Clear about product features and pricing
+            - Proactive in offering relevant suggestions
             
-        except requests.RequestException as e:
-            return f"Sorry, I couldn't get your order history. Error: {str(e)}"
+            Use the available tools to search products, manage user preferences, and handle orders.
+            """),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ])
+        
+        return create_openai_tools_agent(self.llm, self.tools, prompt)
+
+
+class ShoppingAgent:
+    """One conversation: its own memory and user context on top of shared AgentResources"""
+    
+    def __init__(self, resources: Optional[AgentResources] = None, llm: Optional["BaseChatModel"] = None, session_id: Optional[str] = None):
+        from conversation_memory import TokenBudgetMemory
+        from parallel_executor import ParallelAgentExecutor
+        
+        self.resources = resources or AgentResources(llm=llm)
+        # Ties this conversation's traced turns together
+        self.session_id = session_id or uuid.uuid4().hex
+        self.llm = self.resources.llm
+        self.tools = self.resources.tools
+        self.api = self.resources.toolkit.api
+        self.tool_cache = self.resources.toolkit.tool_cache
+        
+        # Conversation context: recent turns plus facts from older ones, within a token budget
+        self.memory = TokenBudgetMemory(
+            memory_key="chat_history",
+            return_messages=True
+        )
+        
+        # Current user context
+        self.current_user_id = None
+        self.user_preferences = {}
+        
+        # Tool calls from the same step run concurrently
+        self.agent_executor = ParallelAgentExecutor(
+            agent=self.resources.agent,
+            tools=self.tools,
+            memory=self.memory,
+            verbose=True,
+            handle_parsing_errors=True
+        )
     
     def start_conversation(self, user_id: str = "user123"):
         """Start a conversation with the shopping assistant."""
+        return self.api.run_sync(self.astart_conversation(user_id))
+    
+    async def astart_conversation(self, user_id: str = "user123"):
+        """Async version of start_conversation for callers that run an event loop."""
         self.current_user_id = user_id
         
         # Get user preferences for context
         try:
-            response = requests.get(f"{self.user_api_url}/{user_id}")
-            if response.status_code == 200:
-                user_data = response.json()
-                self.user_preferences = user_data.get("preferences", {})
+            user_data = await self.resources.toolkit.fetch_user(user_id)
+            self.user_preferences = user_data.get("preferences", {})
         except:
             pass
         
@@ -314,11 +500,109 @@ What are you looking for today?"""
     
     def chat(self, message: str) -> str:
         """Process a user message and return the agent's response."""
+        with self._turn_span() as turn:
+            try:
+                routed = self.resources.router.route(message, self.current_user_id)
+                if routed is not None:
+                    tool_name, args = routed
+                    turn.rename("routed")
+                    with tracer.span(tool_name, "tool", routed=True):
+                        record = getattr(self.resources.toolkit, tool_name)(**args)
+                    return self._remember(message, tool_name, record)
+                response = self.agent_executor.invoke({"input": message})
+                return response["output"]
+            except Exception as e:
+                turn.fail(e)
+                return f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."
+    
+    async def achat(self, message: str) -> str:
+        """Async version of chat for callers that run an event loop."""
+        with self._turn_span() as turn:
+            try:
+                routed = self.resources.router.route(message, self.current_user_id)
+                if routed is not None:
+                    tool_name, args = routed
+                    turn.rename("routed")
+                    with tracer.span(tool_name, "tool", routed=True):
+                        record = await getattr(self.resources.toolkit, f"a{tool_name}")(**args)
+                    return self._remember(message, tool_name, record)
+                response = await self.agent_executor.ainvoke({"input": message})
+                return response["output"]
+            except Exception as e:
+                turn.fail(e)
+                return f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."
+    
+    async def astream_chat(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Process a user message, yielding model tokens and tool progress as they happen.
+        
+        The last event is {"type": "done", "response": ...} with the complete reply,
+        or {"type": "error", "response": ...} if the run failed. Replies that come
+        straight from a tool also carry the tool's record under "record", for display.
+        """
+        # The turn span can't be the current span across yields; it is passed down instead
+        turn = tracer.start_span("agent", "turn", session_id=self.session_id, user_id=self.current_user_id, streamed=True) if tracer.enabled else None
         try:
-            response = self.agent_executor.invoke({"input": message})
-            return response["output"]
-        except Exception as e:
-            return f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."
+            routed = self.resources.router.route(message, self.current_user_id)
+            if routed is not None:
+                tool_name, args = routed
+                try:
+                    with tracer.span(tool_name, "tool", parent=turn, routed=True):
+                        record = await getattr(self.resources.toolkit, f"a{tool_name}")(**args)
+                except Exception as e:
+                    if turn:
+                        turn.fail(e)
+                    yield {"type": "error", "response": f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."}
+                    return
+                if turn:
+                    turn.rename("routed")
+                yield {"type": "done", "response": self._remember(message, tool_name, record), "record": record.model_dump()}
+                return
+            
+            from streaming import StreamEventHandler
+            
+            queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+            invocation = self.agent_executor.ainvoke({"input": message}, config={"callbacks": [StreamEventHandler(queue)]})
+            run = asyncio.ensure_future(within(turn, invocation) if turn else invocation)
+            run.add_done_callback(lambda _: queue.put_nowait(None))
+            try:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        break
+                    yield event
+            finally:
+                # The consumer went away (e.g. the websocket closed); stop the run
+                if not run.done():
+                    run.cancel()
+            
+            try:
+                yield {"type": "done", "response": run.result()["output"]}
+            except Exception as e:
+                if turn:
+                    turn.fail(e)
+                yield {"type": "error", "response": f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."}
+        finally:
+            if turn:
+                tracer.end_span(turn)
+    
+    def _turn_span(self):
+        """Span covering one chat turn, renamed "routed" if the router answers it (a no-op unless tracing is on)"""
+        return tracer.span("agent", "turn", session_id=self.session_id, user_id=self.current_user_id)
+    
+    def _remember(self, message: str, tool_name: str, record: ToolRecord) -> str:
+        """Record a turn answered without the agent, so later turns can refer to it, and return the reply
+
+        Memory keeps the compact text the model reads; the reply is the readable one for the user.
+        """
+        self.memory.save_context({"input": message}, {"output": render(record, tool_budget(tool_name))})
+        return record.describe()
+    
+    def memory_usage(self) -> int:
+        """Approximate bytes held by this conversation's history and user context"""
+        size = sys.getsizeof(self.user_preferences)
+        for message in self.memory.chat_memory.messages:
+            size += sys.getsizeof(message.content)
+        return size
 
 # Example usage
 if __name__ == "__main__":
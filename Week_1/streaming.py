@@ -0,0 +1,123 @@
+"""
+Incremental output from the shopping agent.
+
+`StreamingChatModel` makes the wrapped chat model stream on the async path,
+so every token reaches the callbacks as it arrives, and reassembles
+streamed tool calls by index. The stock chunk merging in this LangChain
+version concatenates tool call fragments instead. `StreamEventHandler` turns
+those callbacks into events on a queue; `ShoppingAgent.astream_chat` yields
+them to the web interface.
+
+Events are dicts with a "type" of "token", "tool_start", "tool_end", "done"
+or "error".
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler, AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class StreamingChatModel(BaseChatModel):
+    """Chat model wrapper that streams on the async path and emits every token"""
+
+    model: BaseChatModel
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def temperature(self) -> float:
+        return getattr(self.model, "temperature", 0)
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        return self.model._get_llm_string(stop=stop, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if type(self.model)._astream is BaseChatModel._astream:
+            # The model can't stream; answer in one piece
+            return await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        content = ""
+        additional_kwargs: Dict[str, Any] = {}
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        generation_info: Dict[str, Any] = {}
+        # The wrapped model reports each chunk to run_manager itself
+        async for chunk in self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            message = chunk.message
+            if isinstance(message.content, str):
+                content += message.content
+            for key, value in message.additional_kwargs.items():
+                if key == "tool_calls":
+                    for fragment in value:
+                        _merge_tool_call(tool_calls.setdefault(fragment.get("index", 0), {}), fragment)
+                elif key in additional_kwargs and isinstance(value, dict):
+                    _merge_function_call(additional_kwargs[key], value)
+                else:
+                    additional_kwargs[key] = dict(value) if isinstance(value, dict) else value
+            generation_info.update(chunk.generation_info or {})
+
+        if tool_calls:
+            additional_kwargs["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        message = AIMessage(content=content, additional_kwargs=additional_kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message, generation_info=generation_info or None)])
+
+
+def _merge_tool_call(call: Dict[str, Any], fragment: Dict[str, Any]) -> None:
+    """Fold one streamed tool call fragment into the call with the same index"""
+    if fragment.get("id"):
+        call["id"] = fragment["id"]
+    call["type"] = fragment.get("type") or call.get("type") or "function"
+    function = call.setdefault("function", {"name": "", "arguments": ""})
+    _merge_function_call(function, fragment.get("function") or {})
+
+
+def _merge_function_call(function: Dict[str, Any], fragment: Dict[str, Any]) -> None:
+    for key in ("name", "arguments"):
+        function[key] = (function.get(key) or "") + (fragment.get(key) or "")
+
+
+class StreamEventHandler(AsyncCallbackHandler):
+    """Puts model tokens and tool progress on a queue as stream events"""
+
+    def __init__(self, queue: "asyncio.Queue[Dict[str, Any]]"):
+        self.queue = queue
+        self._tools: Dict[UUID, str] = {}
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if token:
+            await self.queue.put({"type": "token", "content": token})
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = serialized.get("name", "")
+        self._tools[run_id] = name
+        await self.queue.put({"type": "tool_start", "tool": name, "input": input_str})
+
+    async def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> None:
+        await self.queue.put({"type": "tool_end", "tool": self._tools.pop(run_id, "")})
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        await self.queue.put({"type": "tool_end", "tool": self._tools.pop(run_id, ""), "error": str(error)})
@@ -0,0 +1,76 @@
+"""Tests for the catalog store's stock reservations"""
+
+import threading
+
+import pytest
+
+from catalog_store import CatalogStore, InsufficientStock, ProductNotFound
+
+
+@pytest.fixture
+def store():
+    return CatalogStore([
+        {"id": "1", "name": "Headphones", "category": "electronics", "price": 89.99, "brand": "TechSound", "stock": 5},
+        {"id": "2", "name": "T-Shirt", "category": "clothing", "price": 24.99, "brand": "EcoWear", "stock": 1},
+    ])
+
+
+def test_reserve_takes_stock_and_returns_prices(store):
+    assert store.reserve_stock({"1": 2, "2": 1}) == {"1": 89.99, "2": 24.99}
+    assert store.get("1")["stock"] == 3
+    assert store.get("2")["stock"] == 0
+    assert store.get("2")["in_stock"] is False
+
+
+def test_failed_reservation_changes_nothing(store):
+    version = store.version
+    with pytest.raises(InsufficientStock) as error:
+        store.reserve_stock({"1": 2, "2": 3})
+    assert (error.value.product_id, error.value.requested, error.value.available) == ("2", 3, 1)
+    with pytest.raises(ProductNotFound):
+        store.reserve_stock({"1": 1, "missing": 1})
+    assert store.get("1")["stock"] == 5
+    assert store.version == version
+
+
+def test_release_returns_stock(store):
+    store.reserve_stock({"2": 1})
+    content_version = store.content_version
+    store.release_stock({"2": 1, "missing": 4})
+    assert store.get("2")["stock"] == 1
+    # Back in stock is a content change
+    assert store.content_version > content_version
+
+
+def test_stock_changes_move_only_the_version(store):
+    content_version, version = store.content_version, store.version
+    store.reserve_stock({"1": 1})
+    assert store.version > version
+    assert store.content_version == content_version
+
+
+def test_upsert_keeps_reserved_stock(store):
+    store.reserve_stock({"1": 2})
+    store.upsert({"id": "1", "name": "Headphones II", "category": "electronics", "price": 79.99, "brand": "TechSound"})
+    assert store.get("1")["stock"] == 3
+
+
+def test_concurrent_reservations_never_oversell(store):
+    store.upsert({"id": "3", "name": "Lamp", "category": "home", "price": 30.0, "brand": "Glow", "stock": 50})
+    sold = []
+
+    def buy():
+        for _ in range(20):
+            try:
+                store.reserve_stock({"3": 1})
+            except InsufficientStock:
+                return
+            sold.append(1)
+
+    threads = [threading.Thread(target=buy) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sold) == 50
+    assert store.get("3")["stock"] == 0
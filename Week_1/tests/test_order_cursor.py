@@ -0,0 +1,40 @@
+"""Tests for the order pagination cursor of the mock APIs"""
+
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+import mock_apis
+from mock_apis import decode_order_cursor, encode_order_cursor
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def test_round_trip():
+    cursor = encode_order_cursor("2024-01-15T10:00:00", "ORD-1")
+    assert decode_order_cursor(cursor) == ("2024-01-15T10:00:00", "ORD-1")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    b64(b"not json"),
+    b64(b"\xff\xfe"),
+    b64(b'"a string"'),
+    b64(b'["only one"]'),
+    b64(b'["a", "b", "c"]'),
+    b64(b'{"a": "b"}'),
+    b64(b"[1, 2]"),
+    b64(b'["2024-01-15", null]'),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_order_cursor(cursor)
+
+
+def test_non_string_cursor_is_a_bad_request():
+    client = TestClient(mock_apis.app)
+    response = client.get("/api/orders/user/user123", params={"cursor": b64(b"[1,2]")})
+    assert response.status_code == 400
@@ -0,0 +1,140 @@
+"""Tests for the order repositories"""
+
+import json
+import os
+import threading
+
+import pytest
+
+import order_store
+from order_store import InMemoryOrderRepository, LogOrderRepository, OrderStoreError
+
+
+def make_order(i, user_id="user123", **extra):
+    return {"order_id": f"ORD-{i}", "user_id": user_id, "created_at": f"2024-01-01T00:00:{i:02d}", **extra}
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """A log repository; tests close it (or the one reopened from it) themselves"""
+    return LogOrderRepository(str(tmp_path / "orders.log"), fsync=False)
+
+
+def reopen(repository):
+    repository.close()
+    return LogOrderRepository(repository.path, fsync=False)
+
+
+@pytest.mark.parametrize("durable", [False, True])
+def test_pages_are_newest_first(durable, tmp_path):
+    repository = LogOrderRepository(str(tmp_path / "orders.log"), fsync=False) if durable else InMemoryOrderRepository()
+    for i in range(5):
+        repository.add(make_order(i))
+    repository.add(make_order(9, user_id="someone-else"))
+
+    page, before = repository.list_for_user("user123", 2)
+    assert [order["order_id"] for order in page] == ["ORD-4", "ORD-3"]
+    page, before = repository.list_for_user("user123", 2, before)
+    assert [order["order_id"] for order in page] == ["ORD-2", "ORD-1"]
+    page, before = repository.list_for_user("user123", 2, before)
+    assert [order["order_id"] for order in page] == ["ORD-0"]
+    assert before is None
+    repository.close()
+
+
+def test_orders_survive_a_restart(repository):
+    for i in range(3):
+        repository.add(make_order(i))
+    repository = reopen(repository)
+    assert len(repository) == 3
+    assert repository.get("ORD-1") == make_order(1)
+    repository.close()
+
+
+def test_replay_drops_a_torn_final_record(repository):
+    repository.add(make_order(0))
+    repository.add(make_order(1))
+    repository.close()
+    size = os.path.getsize(repository.path)
+    with open(repository.path, "ab") as f:
+        f.write(json.dumps(make_order(2)).encode()[:20])
+
+    repository = LogOrderRepository(repository.path, fsync=False)
+    assert os.path.getsize(repository.path) == size
+    assert repository.get("ORD-2") is None
+    # New records start on a clean line
+    repository.add(make_order(3))
+    repository = reopen(repository)
+    assert sorted(repository._orders) == ["ORD-0", "ORD-1", "ORD-3"]
+    assert repository.skipped_records == 0
+    repository.close()
+
+
+def test_replay_skips_a_damaged_record_inside_the_log(repository):
+    for i in range(3):
+        repository.add(make_order(i))
+    repository.close()
+    with open(repository.path, "rb") as f:
+        lines = f.readlines()
+    lines[1] = b"{garbage\n"
+    with open(repository.path, "wb") as f:
+        f.writelines(lines)
+
+    repository = LogOrderRepository(repository.path, fsync=False)
+    assert repository.skipped_records == 1
+    assert repository.get("ORD-1") is None
+    assert repository.get("ORD-2") == make_order(2)
+    repository.close()
+
+
+def test_failed_commit_is_rolled_back(repository, monkeypatch):
+    repository.fsync = True
+    repository.add(make_order(0))
+    size = os.path.getsize(repository.path)
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(order_store.os, "fsync", failing_fsync)
+    with pytest.raises(OrderStoreError):
+        repository.add(make_order(1))
+    monkeypatch.undo()
+
+    assert os.path.getsize(repository.path) == size
+    assert repository.get("ORD-1") is None
+    repository.add(make_order(2))
+    assert repository.get("ORD-2") == make_order(2)
+    repository = reopen(repository)
+    assert sorted(repository._orders) == ["ORD-0", "ORD-2"]
+    repository.close()
+
+
+def test_unserializable_order_fails_alone(repository):
+    with pytest.raises(OrderStoreError):
+        repository.add(make_order(0, note=object()))
+    repository.add(make_order(1))
+    assert repository.get("ORD-0") is None
+    assert repository.get("ORD-1") == make_order(1)
+    repository.close()
+
+
+def test_concurrent_adds_share_commits(repository):
+    threads = [threading.Thread(target=repository.add, args=(make_order(i),)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert repository.committed_orders == 20
+    assert repository.commits <= 20
+    repository.close()
+
+
+def test_add_fails_once_the_writer_is_gone(repository, monkeypatch):
+    monkeypatch.setattr(order_store, "WRITER_CHECK_INTERVAL", 0.01)
+    repository._pending.put(None)
+    repository._writer.join()
+    with pytest.raises(OrderStoreError):
+        repository.add(make_order(0))
+    repository.close()
+    with pytest.raises(OrderStoreError, match="closed"):
+        repository.add(make_order(1))
@@ -0,0 +1,84 @@
+"""Tests for the product search index"""
+
+import pytest
+
+from catalog_store import CatalogStore
+from search_index import ProductSearchIndex
+
+PRODUCTS = [
+    {"id": "1", "name": "Smart TV", "category": "electronics", "price": 499.0, "brand": "Vision", "rating": 4.2, "description": "4K screen"},
+    {"id": "2", "name": "Lava Lamp", "category": "home", "price": 25.0, "brand": "Glow", "rating": 3.9, "description": "Retro light"},
+    {"id": "3", "name": "Yoga Mat", "category": "sports", "price": 30.0, "brand": "Flex", "rating": 4.6, "description": "Non-slip, eco"},
+    {"id": "4", "name": "Desk Lamp", "category": "home", "price": 45.0, "brand": "Glow", "rating": 4.0, "description": "LED, dimmable"},
+]
+
+
+@pytest.fixture
+def store():
+    store = CatalogStore(PRODUCTS)
+    store.index = ProductSearchIndex(store)
+    store.subscribe(store.index.on_catalog_change)
+    return store
+
+
+def brute_force(query=None, category=None, min_price=None, max_price=None, brand=None, products=PRODUCTS):
+    query = query.lower() if query else None
+    return [
+        p["id"] for p in products
+        if (not query or query in p["name"].lower() or query in p["description"].lower())
+        and (not category or p["category"] == category)
+        and (not brand or p["brand"] == brand)
+        and (min_price is None or p["price"] >= min_price)
+        and (max_price is None or p["price"] <= max_price)
+    ]
+
+
+@pytest.mark.parametrize("query", ["t", "tv", "TV", "a", "la", "lam", "lamp", "mp", "p", "co", "k", "4k", "zz", "x"])
+def test_short_and_long_queries_match_substrings(store, query):
+    assert store.index.search(query=query) == brute_force(query=query)
+
+
+@pytest.mark.parametrize("filters", [
+    {"category": "home"},
+    {"brand": "Glow", "max_price": 30},
+    {"query": "la", "category": "home", "min_price": 30},
+    {"min_price": 26, "max_price": 45},
+    {"category": "garden"},
+    {"query": "l", "brand": "Flex"},
+])
+def test_filters(store, filters):
+    assert store.index.search(**filters) == brute_force(**filters)
+
+
+def test_rewritten_text_no_longer_matches(store):
+    store.upsert(dict(PRODUCTS[1], name="Floor Light"))
+    assert store.index.search(query="la") == ["4"]
+    assert store.index.search(query="ht") == ["2"]
+    store.index.rebuild()
+    assert store.index.search(query="la") == ["4"]
+
+
+def test_deleted_products_are_not_found(store):
+    store.delete("4")
+    assert store.index.search(query="lamp") == ["2"]
+    assert store.index.search(query="d") == []
+
+
+def test_filters_follow_price_category_and_brand_changes(store):
+    index = store.index
+    products = [dict(product) for product in PRODUCTS]
+    for product in products:
+        product.update(price=product["price"] + 100, category="garden", brand="Glow")
+        store.upsert(product)
+        for filters in ({"category": "garden"}, {"category": "home"}, {"brand": "Glow"}, {"brand": "Flex"}, {"max_price": 130}, {"min_price": 140}):
+            assert index.search(**filters) == brute_force(products=products, **filters)
+
+
+def test_price_tail_merges_into_the_run(store, monkeypatch):
+    monkeypatch.setattr("search_index._PRICE_TAIL_MIN", 2)
+    products = [dict(product, id=f"n{i}", price=float(i)) for i, product in enumerate(PRODUCTS * 5)]
+    store.upsert_many(products[:10])
+    store.upsert_many(products[10:])
+    store.delete("n3")
+    del products[3]
+    assert store.index.search(min_price=2, max_price=12.5) == [p["id"] for p in products if 2 <= p["price"] <= 12.5]
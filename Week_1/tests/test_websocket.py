@@ -0,0 +1,75 @@
+"""Tests for the web interface's websocket chat"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import mock_apis
+import web_interface
+from api_client import ApiClient
+from benchmarks.scripted_model import ScriptedChatModel
+from session_manager import SessionManager
+from shopping_agent import AgentResources, ShoppingAgent
+
+
+@pytest.fixture(scope="module")
+def sessions():
+    resources = AgentResources(api=ApiClient(transport="asgi", app=mock_apis.app), llm=ScriptedChatModel(latency=0.0))
+    for tool in resources.tools:
+        tool.verbose = False
+    sessions = SessionManager(resources)
+    web_interface.use_sessions(sessions)
+    yield sessions
+    resources.toolkit.api.close()
+
+
+@pytest.fixture
+def client(sessions):
+    with TestClient(web_interface.app) as client:
+        yield client
+
+
+def until_done(websocket) -> dict:
+    while True:
+        event = json.loads(websocket.receive_text())
+        if event["type"] in ("done", "error"):
+            return event
+
+
+@pytest.mark.parametrize("frame", ["not json", '{"user_id": "user123"}', "[1, 2]", '{"message": 5}', "null"])
+def test_malformed_frames_are_answered_and_the_socket_stays_open(client, frame):
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text(frame)
+        assert until_done(websocket)["type"] == "error"
+        websocket.send_text(json.dumps({"message": "details for product 1", "user_id": "user123"}))
+        event = until_done(websocket)
+        assert event["type"] == "done"
+        assert event["record"]["id"] == "1"
+
+
+def test_agent_failure_is_answered(client, monkeypatch):
+    async def failing_stream(self, message):
+        raise RuntimeError("model unavailable")
+        yield
+
+    monkeypatch.setattr(ShoppingAgent, "astream_chat", failing_stream)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text(json.dumps({"message": "hello", "user_id": "user123"}))
+        event = until_done(websocket)
+        assert event["type"] == "error"
+        assert "model unavailable" in event["response"]
+
+
+def test_closing_frees_the_connection_and_session(client, sessions):
+    before = len(sessions)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("not json")
+        until_done(websocket)
+        websocket.send_text(json.dumps({"message": "details for product 1", "user_id": "user123"}))
+        until_done(websocket)
+        assert len(sessions) == before + 1
+    # The server handles the disconnect after the client has gone; wait for it with a request
+    client.get("/health")
+    assert len(sessions) == before
+    assert web_interface.manager.active_connections == []
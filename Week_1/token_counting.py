@@ -0,0 +1,43 @@
+"""
+Token counting for prompt budgets.
+
+Tokens are counted with tiktoken when its encoding is available, and
+estimated at four characters per token otherwise. Kept free of LangChain
+imports so light modules (tool_output) can budget text cheaply.
+"""
+
+import functools
+
+TOKENIZER_MODEL = "gpt-3.5-turbo"
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:
+        # Not installed, or the encoding can't be downloaded (e.g. offline)
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Tokens in `text` for the chat model, estimated if tiktoken is unavailable"""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """Longest prefix of `text` that fits in `limit` tokens"""
+    if limit <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:limit * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= limit else encoding.decode(tokens[:limit])
+
@@ -0,0 +1,146 @@
+"""
+Cache for the shopping agent's read tools.
+
+Results are kept in a TTL + LRU map keyed by tool name and normalized
+arguments. Every entry carries tags naming the user, product or order it
+was read from, and write tools invalidate exactly those tags, so a cached
+profile or product never outlives an update the agent itself made.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+DEFAULT_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+
+# ("user", "user123"), ("product", "1"), ("order", "...")
+Tag = Tuple[str, str]
+CacheKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+
+def normalize_args(args: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """Canonical form of tool arguments; unset values and stray whitespace are ignored"""
+    normalized = []
+    for name, value in sorted(args.items()):
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def normalize_tag(tag: Tag) -> Tag:
+    """Tags compare on trimmed ids, like the cache keys"""
+    kind, value = tag
+    return (kind, str(value).strip())
+
+
+class ToolResultCache:
+    """TTL + LRU cache of tool results with tag-based invalidation"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = clock
+        # key -> (expires_at, value, tags)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any, Tuple[Tag, ...]]]" = OrderedDict()
+        self._tagged: Dict[Tag, set] = {}
+        # Bumped on every invalidation; a read that started before an
+        # invalidation of one of its tags must not be stored
+        self._epoch = 0
+        self._tag_epochs: Dict[Tag, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(tool_name: str, args: Dict[str, Any]) -> CacheKey:
+        return (tool_name, normalize_args(args))
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[Any], int]:
+        """Return (cached value or None, epoch to pass to `put` on a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, self._epoch
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], self._epoch
+
+    def put(self, key: CacheKey, value: Any, tags: Iterable[Tag] = (), epoch: Optional[int] = None) -> None:
+        """Cache a result read at `epoch`, unless one of its tags was invalidated since"""
+        tags = tuple(normalize_tag(tag) for tag in tags)
+        with self._lock:
+            if epoch is not None and any(self._tag_epochs.get(tag, -1) >= epoch for tag in tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags: Tag) -> None:
+        """Drop every entry read from any of `tags`"""
+        with self._lock:
+            for tag in map(normalize_tag, tags):
+                self._tag_epochs[tag] = self._epoch
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+            self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+_shared_cache: Optional[ToolResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_tool_cache() -> ToolResultCache:
+    """Process-wide ToolResultCache, created on first use"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ToolResultCache()
+        return _shared_cache
@@ -0,0 +1,383 @@
+"""
+Typed tool results and their compact rendering for the model.
+
+Shopping tools return records (`ProductList`, `OrderRecord`, ...) instead of
+markdown. `render` turns a record into terse text for the agent prompt and
+keeps it within the tool's token budget: it first drops descriptions and
+feature lists, then whole list entries, but always keeps the ids of what it
+dropped so the model can ask for them. Presentation for people (cards,
+bold labels) is left to the web interface, which receives the records as
+JSON; `describe` gives the plain-text reply for clients that show no
+cards (the CLI, REST /chat).
+"""
+
+import functools
+import inspect
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from token_counting import count_tokens, truncate_tokens
+from tracing import tracer
+
+# Token budget for a tool's output, unless the tool has its own below
+DEFAULT_TOOL_OUTPUT_TOKENS = int(os.getenv("AGENT_TOOL_OUTPUT_TOKENS", "250"))
+TOOL_OUTPUT_TOKENS: Dict[str, int] = {
+    "get_search_facets_tool": 150,
+    "get_user_preferences_tool": 100,
+    "update_user_preferences_tool": 60,
+    "create_order_tool": 100,
+    "checkout_cart_tool": 150,
+    "get_order_status_tool": 80,
+}
+
+# Per-entry detail in product lists; single products get everything
+LIST_DESCRIPTION_TOKENS = 16
+LIST_FEATURES = 2
+
+
+def tool_budget(tool_name: str) -> int:
+    return TOOL_OUTPUT_TOKENS.get(tool_name, DEFAULT_TOOL_OUTPUT_TOKENS)
+
+
+def _money(amount: float) -> str:
+    return f"${amount:.2f}"
+
+
+# Records
+
+class ToolRecord(BaseModel):
+    """Result of a shopping tool; `kind` tells the UI how to display it"""
+
+    kind: str
+
+    def compact(self, detail: bool = True) -> str:
+        """Terse text for the model; detail=False leaves out descriptive fields"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Readable reply for a person when no UI draws the record"""
+        return self.compact()
+
+
+class Notice(ToolRecord):
+    """Plain message: nothing found, an error, a confirmation"""
+
+    kind: str = "notice"
+    text: str
+
+    def compact(self, detail: bool = True) -> str:
+        return self.text
+
+    def describe(self) -> str:
+        return self.text
+
+
+class ProductRecord(ToolRecord):
+    kind: str = "product"
+    id: str
+    name: str
+    price: float
+    brand: str = ""
+    rating: Optional[float] = None
+    category: str = ""
+    description: str = ""
+    features: List[str] = []
+    in_stock: Optional[bool] = None
+
+    @classmethod
+    def from_api(cls, product: Dict[str, Any]) -> "ProductRecord":
+        return cls(**{key: value for key, value in product.items() if key in cls.model_fields and key != "kind"})
+
+    def line(self, detail: bool = True) -> str:
+        """One-line entry for product lists"""
+        parts = [f"id {self.id}: {self.name}", _money(self.price)]
+        if self.brand:
+            parts.append(self.brand)
+        if self.rating is not None:
+            parts.append(f"{self.rating:g}/5")
+        if self.in_stock is False:
+            parts.append("out of stock")
+        if detail:
+            if self.description:
+                parts.append(truncate_tokens(self.description, LIST_DESCRIPTION_TOKENS))
+            if self.features:
+                parts.append(", ".join(self.features[:LIST_FEATURES]))
+        return " | ".join(parts)
+
+    def compact(self, detail: bool = True) -> str:
+        parts = [f"id {self.id}: {self.name}", _money(self.price)]
+        if self.brand:
+            parts.append(f"brand: {self.brand}")
+        if self.category:
+            parts.append(f"category: {self.category}")
+        if self.rating is not None:
+            parts.append(f"{self.rating:g}/5")
+        if self.in_stock is not None:
+            parts.append("in stock" if self.in_stock else "out of stock")
+        lines = [" | ".join(parts)]
+        if self.description:
+            lines.append(self.description if detail else truncate_tokens(self.description, LIST_DESCRIPTION_TOKENS))
+        if self.features and detail:
+            lines.append("features: " + ", ".join(self.features))
+        return "\n".join(lines)
+
+    def describe(self) -> str:
+        lines = [f"{self.name} (ID: {self.id}) - {_money(self.price)}"]
+        meta = []
+        if self.brand:
+            meta.append(f"Brand: {self.brand}")
+        if self.category:
+            meta.append(f"Category: {self.category}")
+        if self.rating is not None:
+            meta.append(f"Rating: {self.rating:g}/5")
+        if self.in_stock is not None:
+            meta.append("In stock" if self.in_stock else "Out of stock")
+        if meta:
+            lines.append(" | ".join(meta))
+        if self.description:
+            lines.append(self.description)
+        if self.features:
+            lines.append("Features: " + ", ".join(self.features))
+        return "\n".join(lines)
+
+
+class OrderLineRecord(BaseModel):
+    product_id: str
+    quantity: int
+    line_total: float
+
+
+class OrderRecord(ToolRecord):
+    kind: str = "order"
+    order_id: str
+    status: str
+    total_amount: float
+    created_at: str = ""
+    items: List[OrderLineRecord] = []
+    placed: bool = False
+    """Set when the tool call just created this order"""
+
+    @classmethod
+    def from_api(cls, order: Dict[str, Any], placed: bool = False) -> "OrderRecord":
+        return cls(
+            order_id=order["order_id"],
+            status=order["status"],
+            total_amount=order["total_amount"],
+            created_at=order.get("created_at", ""),
+            items=[OrderLineRecord(**line) for line in order.get("items", [])],
+            placed=placed,
+        )
+
+    def compact(self, detail: bool = True) -> str:
+        parts = [f"order {self.order_id}: {self.status}", _money(self.total_amount)]
+        if self.created_at:
+            parts.append(self.created_at if detail else self.created_at[:10])
+        if detail and self.items:
+            parts.append("items: " + ", ".join(f"{line.product_id} x{line.quantity}" for line in self.items))
+        return ("placed " if self.placed else "") + " | ".join(parts)
+
+    def describe(self) -> str:
+        lines = [f"{'Order placed! ' if self.placed else ''}Order {self.order_id} - {_money(self.total_amount)}"]
+        lines.append(f"Status: {self.status}" + (f" | {self.created_at[:10]}" if self.created_at else ""))
+        for line in self.items:
+            lines.append(f"Product {line.product_id} x{line.quantity}: {_money(line.line_total)}")
+        return "\n".join(lines)
+
+
+class UserProfile(ToolRecord):
+    kind: str = "user"
+    user_id: str
+    name: str
+    categories: List[str] = []
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    brands: List[str] = []
+    purchases: int = 0
+
+    @classmethod
+    def from_api(cls, user: Dict[str, Any]) -> "UserProfile":
+        preferences = user.get("preferences", {})
+        budget = preferences.get("budget_range", {})
+        return cls(
+            user_id=user.get("id", ""),
+            name=user.get("name", ""),
+            categories=preferences.get("categories", []),
+            budget_min=budget.get("min"),
+            budget_max=budget.get("max"),
+            brands=preferences.get("brands", []),
+            purchases=len(user.get("purchase_history", [])),
+        )
+
+    def compact(self, detail: bool = True) -> str:
+        parts = [f"user {self.user_id}: {self.name}".rstrip(": ")]
+        if self.categories:
+            parts.append("categories: " + ", ".join(self.categories))
+        if self.budget_min is not None or self.budget_max is not None:
+            parts.append(f"budget: {_money(self.budget_min or 0)}-{_money(self.budget_max) if self.budget_max is not None else 'any'}")
+        if self.brands:
+            parts.append("brands: " + ", ".join(self.brands))
+        if detail:
+            parts.append(f"{self.purchases} past purchases")
+        return " | ".join(parts)
+
+    def describe(self) -> str:
+        lines = [self.name or self.user_id]
+        if self.categories:
+            lines.append("Preferred categories: " + ", ".join(self.categories))
+        if self.budget_min is not None or self.budget_max is not None:
+            lines.append(f"Budget: {_money(self.budget_min or 0)} - {_money(self.budget_max) if self.budget_max is not None else 'any'}")
+        if self.brands:
+            lines.append("Preferred brands: " + ", ".join(self.brands))
+        lines.append(f"Recent purchases: {self.purchases}")
+        return "\n".join(lines)
+
+
+class FacetSummary(ToolRecord):
+    kind: str = "facets"
+    count: int
+    category: Dict[str, int] = {}
+    brand: Dict[str, int] = {}
+    price: List[Dict[str, Any]] = []
+    rating: List[Dict[str, Any]] = []
+
+    def compact(self, detail: bool = True) -> str:
+        def counts(values: Dict[str, int]) -> str:
+            shown = list(values.items()) if detail else list(values.items())[:5]
+            text = ", ".join(f"{name} {count}" for name, count in shown)
+            return text + (f", +{len(values) - len(shown)} more" if len(values) > len(shown) else "")
+
+        def price_range(bucket: Dict[str, Any]) -> str:
+            if bucket["max"] is None:
+                return f"${bucket['min']}+"
+            return f"${bucket['min']}-{bucket['max']}"
+
+        lines = [f"{self.count} matching products"]
+        lines.append("categories: " + counts(self.category))
+        lines.append("brands: " + counts(self.brand))
+        lines.append("prices: " + ", ".join(f"{price_range(b)} {b['count']}" for b in self.price))
+        if detail:
+            lines.append("ratings: " + ", ".join(f"{b['min']}+ {b['count']}" for b in self.rating))
+        return "\n".join(lines)
+
+
+class RecordList(ToolRecord):
+    """List result whose entries can be cut, naming the ids that were left out"""
+
+    more: bool = False
+    """The API has entries past this page"""
+
+    def header(self) -> str:
+        raise NotImplementedError
+
+    def entries(self, detail: bool) -> List[str]:
+        raise NotImplementedError
+
+    def ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        return ""
+
+    def compact(self, detail: bool = True) -> str:
+        return "\n".join(line for line in [self.header(), *self.entries(detail), self.footer()] if line)
+
+
+class ProductList(RecordList):
+    kind: str = "products"
+    total: int
+    products: List[ProductRecord] = []
+
+    def header(self) -> str:
+        return f"{self.total} products found, showing {len(self.products)}:"
+
+    def entries(self, detail: bool) -> List[str]:
+        return [product.line(detail) for product in self.products]
+
+    def ids(self) -> List[str]:
+        return [product.id for product in self.products]
+
+    def footer(self) -> str:
+        return "more results: refine the search" if self.total > len(self.products) else ""
+
+    def describe(self) -> str:
+        if not self.products:
+            return "No products found."
+        entries = [product.describe() for product in self.products]
+        more = ["Refine the search to see more."] if self.total > len(self.products) else []
+        return "\n\n".join([f"Found {self.total} products:", *entries, *more])
+
+
+class OrderList(RecordList):
+    kind: str = "orders"
+    orders: List[OrderRecord] = []
+
+    def header(self) -> str:
+        return f"{len(self.orders)} most recent orders:"
+
+    def entries(self, detail: bool) -> List[str]:
+        return [order.compact(detail) for order in self.orders]
+
+    def ids(self) -> List[str]:
+        return [order.order_id for order in self.orders]
+
+    def footer(self) -> str:
+        return "older orders available on request" if self.more else ""
+
+    def describe(self) -> str:
+        if not self.orders:
+            return "You have no orders yet."
+        more = ["Older orders are available on request."] if self.more else []
+        return "\n\n".join(["Your recent orders:", *(order.describe() for order in self.orders), *more])
+
+
+# Rendering
+
+def render(record: ToolRecord, max_tokens: int = DEFAULT_TOOL_OUTPUT_TOKENS) -> str:
+    """Compact text for `record` in at most `max_tokens` tokens"""
+    for detail in (True, False):
+        text = record.compact(detail)
+        if count_tokens(text) <= max_tokens:
+            return text
+    if isinstance(record, RecordList):
+        return _render_list(record, max_tokens)
+    return truncate_tokens(text, max_tokens)
+
+
+def _render_list(records: RecordList, max_tokens: int) -> str:
+    """Leading entries that fit, then the ids of the rest"""
+    entries = records.entries(detail=False)
+    ids = records.ids()
+    lines = [records.header()]
+    for shown in range(len(entries), -1, -1):
+        rest = ids[shown:]
+        tail = [f"not shown, ask by id: {', '.join(rest)}"] if rest else []
+        text = "\n".join(lines + entries[:shown] + tail + ([records.footer()] if records.footer() else []))
+        if count_tokens(text) <= max_tokens:
+            return text
+    return truncate_tokens(text, max_tokens)
+
+
+def rendered(tool_name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    """Tool function for the agent: `method`'s record rendered within the tool's budget"""
+    budget = tool_budget(tool_name)
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs) -> str:
+            with tracer.span(tool_name, "tool") as span:
+                output = render(await method(*args, **kwargs), budget)
+                span.set(output_chars=len(output))
+                return output
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs) -> str:
+            with tracer.span(tool_name, "tool") as span:
+                output = render(method(*args, **kwargs), budget)
+                span.set(output_chars=len(output))
+                return output
+
+    # The tool description shown to the model is built from this signature
+    wrapper.__signature__ = inspect.signature(method).replace(return_annotation=str)
+    wrapper.__annotations__ = {**method.__annotations__, "return": str}
+    return wrapper
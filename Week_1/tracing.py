@@ -0,0 +1,249 @@
+"""
+Per-turn tracing for the shopping agent.
+
+With AGENT_TRACING=true every chat turn records a tree of spans: the turn,
+each model call (with prompt and completion token counts), each tool call
+(with the size of its output) and each HTTP request the tools make (with
+status and response size). Every span carries its session and turn id. Finished
+spans feed per-span latency histograms, served by the web interface, and are
+appended as JSON lines to AGENT_TRACE_PATH when it is set.
+
+The current span lives in a context variable, so it follows awaits and new
+tasks; `carry` takes it across to the API client's event loop. With tracing
+off, `span()` hands back a shared no-op span and nothing is recorded.
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Awaitable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+TRACING_ENABLED = os.getenv("AGENT_TRACING", "false").lower() == "true"
+TRACE_PATH = os.getenv("AGENT_TRACE_PATH")
+
+# Histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Span:
+    """One timed operation within a turn"""
+
+    __slots__ = ("name", "kind", "span_id", "parent_id", "turn_id", "session_id", "started_at", "duration_ms", "attributes", "error", "_start")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None, session_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        # A span without a parent starts a turn of its own
+        self.turn_id = parent.turn_id if parent else self.span_id
+        self.session_id = parent.session_id if parent else session_id
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the span failed, for errors that are handled rather than raised"""
+        self.error = f"{type(error).__name__}: {error}"
+
+    def rename(self, name: str) -> None:
+        """Change the name (and so the histogram) once it's known what the span covers"""
+        self.name = name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "turn_id": self.turn_id,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off"""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def fail(self, error: BaseException) -> None:
+        pass
+
+    def rename(self, name: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_DISABLED = nullcontext(NOOP_SPAN)
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("agent_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+async def within(span: Optional[Span], coroutine: Awaitable[T]) -> T:
+    """Await `coroutine` with `span` as the current span"""
+    token = _current.set(span)
+    try:
+        return await coroutine
+    finally:
+        _current.reset(token)
+
+
+def carry(coroutine: Awaitable[T]) -> Awaitable[T]:
+    """Make the caller's current span current for a coroutine run on another loop"""
+    span = _current.get()
+    return coroutine if span is None else within(span, coroutine)
+
+
+class LatencyHistogram:
+    """Span durations counted into fixed millisecond buckets"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        self.counts[bisect_left(self.buckets, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate of the `fraction` quantile, interpolated within its bucket"""
+        rank = fraction * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                estimate = lower + (bound - lower) * (rank - seen) / count
+                return round(min(estimate, self.max_ms), 3)
+            seen += count
+            lower = bound
+        return round(self.max_ms, 3)
+
+    def stats(self) -> dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span, flush: bool) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            if flush:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Creates spans and aggregates the finished ones"""
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, path: Optional[str] = TRACE_PATH):
+        self.enabled = enabled
+        self.exporter = JsonLinesExporter(path) if enabled and path else None
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.spans = 0
+
+    def span(self, name: str, kind: str, parent: Optional[Span] = None, **attributes: Any):
+        """Context manager timing a span under `parent` (default: the current span)"""
+        if not self.enabled:
+            return _DISABLED
+        return self._span(name, kind, parent, attributes)
+
+    @contextmanager
+    def _span(self, name: str, kind: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Iterator[Span]:
+        span = self.start_span(name, kind, parent, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span] = None, session_id: Optional[str] = None, **attributes: Any) -> Span:
+        """Start a span without making it current; finish it with end_span"""
+        return Span(name, kind, parent or _current.get(), session_id, attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.duration_ms = round((time.perf_counter() - span._start) * 1000, 3)
+        if error is not None:
+            span.fail(error)
+        key = f"{span.kind}:{span.name}"
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(span.duration_ms)
+            self.spans += 1
+        if self.exporter is not None:
+            # Flush once per turn rather than per span
+            self.exporter.export(span, flush=span.parent_id is None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            histograms = {key: histogram.stats() for key, histogram in sorted(self._histograms.items())}
+            spans = self.spans
+        return {
+            "enabled": self.enabled,
+            "export_path": self.exporter.path if self.exporter else None,
+            "spans": spans,
+            "latency": histograms,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self.spans = 0
+
+
+tracer = Tracer()
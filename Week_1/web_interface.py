@@ -1,16 +1,136 @@
+import time
+
+# Cold-start timeline, in seconds since this module started loading
+STARTED = time.monotonic()
+
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
 import json
 import asyncio
-from shopping_agent import ShoppingAgent
+import os
+import threading
+import uuid
+import weakref
+
+from tracing import tracer
+
+if TYPE_CHECKING:
+    from session_manager import SessionManager
+    from shopping_agent import ShoppingAgent
+
+# Build the agent in the background at startup; with AGENT_PREWARM=false
+# it is built by the first request that needs it
+PREWARM = os.getenv("AGENT_PREWARM", "true").lower() == "true"
+
+startup_metrics = {
+    "import_seconds": None,
+    "agent_ready_seconds": None,
+    "first_response_seconds": None,
+}
+
+# One agent per session over shared LLM client, tools and HTTP pool; built
+# once, off the event loop
+_sessions: Optional[Future] = None
+_sessions_lock = threading.Lock()
+
+def _build_sessions(future: Future):
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        from session_manager import SessionManager
+        manager = SessionManager()
+        # Modules every new session needs, and the tokenizer's encoding
+        import conversation_memory, parallel_executor
+        from token_counting import count_tokens
+        count_tokens("warm up")
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        startup_metrics["agent_ready_seconds"] = round(time.monotonic() - STARTED, 3)
+        future.set_result(manager)
+
+def start_sessions() -> Future:
+    """Start building the session manager in the background, unless already built or building"""
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None or (_sessions.done() and _sessions.exception() is not None):
+            # A failed build (e.g. missing API key) is retried by the next caller
+            _sessions = Future()
+            threading.Thread(target=_build_sessions, args=(_sessions,), name="agent-prewarm", daemon=True).start()
+        return _sessions
+
+async def get_sessions() -> "SessionManager":
+    """The session manager, waiting without blocking the event loop until it is built"""
+    return await asyncio.shield(asyncio.wrap_future(start_sessions()))
+
+def agent_ready() -> bool:
+    return _sessions is not None and _sessions.done() and _sessions.exception() is None
+
+def use_sessions(manager: "SessionManager"):
+    """Serve an already-built session manager (e.g. one over a scripted model) instead of building one"""
+    global _sessions
+    with _sessions_lock:
+        _sessions = Future()
+        _sessions.set_result(manager)
+
+def record_first_response():
+    if startup_metrics["first_response_seconds"] is None:
+        startup_metrics["first_response_seconds"] = round(time.monotonic() - STARTED, 3)
 
-app = FastAPI(title="Shopping Assistant API", version="1.0.0")
+# Agent turns run on the event loop (they are async end to end), so one slow
+# turn doesn't hold up other shoppers. A conversation's turns run one at a
+# time in arrival order, and at most AGENT_MAX_CONCURRENT_TURNS run at once
+MAX_CONCURRENT_TURNS = int(os.getenv("AGENT_MAX_CONCURRENT_TURNS", "32"))
+_turn_slots: Optional[asyncio.Semaphore] = None
+_conversation_locks: "weakref.WeakKeyDictionary[ShoppingAgent, asyncio.Lock]" = weakref.WeakKeyDictionary()
+turn_metrics = {"running": 0, "waiting": 0, "completed": 0, "peak_running": 0}
 
-# Initialize shopping agent
-shopping_agent = ShoppingAgent()
+def turn_slots() -> asyncio.Semaphore:
+    global _turn_slots
+    if _turn_slots is None:
+        _turn_slots = asyncio.Semaphore(MAX_CONCURRENT_TURNS)
+    return _turn_slots
+
+@asynccontextmanager
+async def agent_turn(agent: "ShoppingAgent"):
+    """Wait for the conversation's previous turn and a free turn slot, then hold both"""
+    lock = _conversation_locks.get(agent)
+    if lock is None:
+        lock = _conversation_locks[agent] = asyncio.Lock()
+    turn_metrics["waiting"] += 1
+    queued = True
+    try:
+        async with lock:
+            async with turn_slots():
+                queued = False
+                turn_metrics["waiting"] -= 1
+                turn_metrics["running"] += 1
+                turn_metrics["peak_running"] = max(turn_metrics["peak_running"], turn_metrics["running"])
+                try:
+                    yield
+                finally:
+                    turn_metrics["running"] -= 1
+                    turn_metrics["completed"] += 1
+    finally:
+        if queued:
+            # Cancelled (e.g. the client went away) before the turn started
+            turn_metrics["waiting"] -= 1
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _turn_slots
+    # Bound to this server's event loop
+    _turn_slots = asyncio.Semaphore(MAX_CONCURRENT_TURNS)
+    if PREWARM:
+        start_sessions()
+    yield
+
+app = FastAPI(title="Shopping Assistant API", version="1.0.0", lifespan=lifespan)
 
 # WebSocket connection manager
 class ConnectionManager:
@@ -33,10 +153,12 @@ manager = ConnectionManager()
 class ChatMessage(BaseModel):
     user_id: str
     message: str
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     user_id: str
+    session_id: str
 
 # HTML template for the chat interface
 HTML_TEMPLATE = """
@@ -181,10 +303,42 @@ HTML_TEMPLATE = """
     <script>
         let ws = new WebSocket("ws://localhost:8000/ws");
         
+        // Assistant bubble being filled in by streamed tokens
+        let streamingContent = null;
+        let streamingText = '';
+        
         ws.onmessage = function(event) {
             const data = JSON.parse(event.data);
-            addMessage(data.response, 'assistant');
-            document.getElementById('typingIndicator').style.display = 'none';
+            const indicator = document.getElementById('typingIndicator');
+            
+            if (data.type === 'token') {
+                if (!streamingContent) {
+                    streamingContent = addMessage('', 'assistant');
+                }
+                streamingText += data.content;
+                streamingContent.textContent = streamingText;
+                indicator.style.display = 'none';
+                scrollToBottom();
+            } else if (data.type === 'tool_start') {
+                indicator.textContent = `Shopping Assistant is checking ${data.tool.replace(/_tool$/, '').replace(/_/g, ' ')}...`;
+                indicator.style.display = 'block';
+            } else if (data.type === 'tool_end') {
+                indicator.textContent = 'Shopping Assistant is typing...';
+            } else {
+                // "done", "error", or a reply from a server that doesn't stream
+                if (streamingContent) {
+                    streamingContent.parentElement.remove();
+                }
+                if (data.record) {
+                    addRecord(data.record, data.response);
+                } else {
+                    addMessage(data.response, 'assistant');
+                }
+                streamingContent = null;
+                streamingText = '';
+                indicator.textContent = 'Shopping Assistant is typing...';
+                indicator.style.display = 'none';
+            }
         };
         
         ws.onopen = function(event) {
@@ -257,6 +411,81 @@ HTML_TEMPLATE = """
             
             messageDiv.appendChild(contentDiv);
             chatMessages.appendChild(messageDiv);
+            scrollToBottom();
+            return contentDiv;
+        }
+        
+        // Display of tool records (answers that came straight from a tool)
+        function escapeHtml(text) {
+            const div = document.createElement('div');
+            div.textContent = text;
+            return div.innerHTML;
+        }
+        
+        function money(amount) {
+            return '$' + Number(amount).toFixed(2);
+        }
+        
+        function productCard(product, detailed) {
+            let html = `<div class="product-card">
+                <div class="product-name">${escapeHtml(product.name)} <small>(ID: ${escapeHtml(product.id)})</small></div>
+                <div class="product-price">${money(product.price)}</div>`;
+            const meta = [];
+            if (product.brand) meta.push(`Brand: ${escapeHtml(product.brand)}`);
+            if (product.category) meta.push(`Category: ${escapeHtml(product.category)}`);
+            if (product.rating !== null && product.rating !== undefined) meta.push(`Rating: ${product.rating}/5`);
+            if (product.in_stock !== null && product.in_stock !== undefined) meta.push(product.in_stock ? 'In stock' : 'Out of stock');
+            if (meta.length) html += `<div class="product-description">${meta.join(' | ')}</div>`;
+            if (product.description) html += `<div class="product-description">${escapeHtml(product.description)}</div>`;
+            if (detailed && product.features && product.features.length) {
+                html += `<div class="product-description">Features: ${product.features.map(escapeHtml).join(', ')}</div>`;
+            }
+            return html + '</div>';
+        }
+        
+        function orderCard(order) {
+            let html = `<div class="product-card">
+                <div class="product-name">${order.placed ? '🎉 Order placed! ' : ''}Order ${escapeHtml(order.order_id)}</div>
+                <div class="product-price">${money(order.total_amount)}</div>
+                <div class="product-description">Status: ${escapeHtml(order.status)} | ${escapeHtml(order.created_at.slice(0, 10))}</div>`;
+            for (const line of order.items || []) {
+                html += `<div class="product-description">Product ${escapeHtml(line.product_id)} x${line.quantity}: ${money(line.line_total)}</div>`;
+            }
+            return html + '</div>';
+        }
+        
+        function addRecord(record, text) {
+            let html;
+            if (record.kind === 'products') {
+                html = `Found ${record.total} products:` + record.products.map(p => productCard(p, true)).join('');
+            } else if (record.kind === 'product') {
+                html = productCard(record, true);
+            } else if (record.kind === 'orders') {
+                html = 'Your recent orders:' + record.orders.map(orderCard).join('');
+                if (record.more) html += 'Older orders are available on request.';
+            } else if (record.kind === 'order') {
+                html = orderCard(record);
+            } else if (record.kind === 'user') {
+                const lines = [`<div class="product-name">${escapeHtml(record.name)}</div>`];
+                if (record.categories.length) lines.push(`Preferred categories: ${record.categories.map(escapeHtml).join(', ')}`);
+                if (record.budget_min !== null || record.budget_max !== null) {
+                    lines.push(`Budget: ${money(record.budget_min || 0)} - ${record.budget_max !== null ? money(record.budget_max) : 'any'}`);
+                }
+                if (record.brands.length) lines.push(`Preferred brands: ${record.brands.map(escapeHtml).join(', ')}`);
+                lines.push(`Recent purchases: ${record.purchases}`);
+                html = `<div class="product-card">${lines.join('<br>')}</div>`;
+            } else {
+                // Notices, and anything else, read fine as the plain reply
+                addMessage(text, 'assistant');
+                return;
+            }
+            const contentDiv = addMessage('', 'assistant');
+            contentDiv.innerHTML = html;
+            scrollToBottom();
+        }
+        
+        function scrollToBottom() {
+            const chatMessages = document.getElementById('chatMessages');
             chatMessages.scrollTop = chatMessages.scrollHeight;
         }
     </script>
@@ -274,44 +503,146 @@ async def get_chat_interface():
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time chat"""
     await manager.connect(websocket)
+    # Each connection is its own conversation
+    session_id = uuid.uuid4().hex
+    sessions = None
     try:
+        sessions = await get_sessions()
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
-            
-            # Process message with shopping agent
-            response = shopping_agent.chat(message_data["message"])
+            try:
+                message_data = json.loads(data)
+                message, user_id = message_data["message"], message_data.get("user_id")
+                if not isinstance(message, str):
+                    raise TypeError("message must be a string")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # A bad frame is answered, not allowed to end the conversation
+                await manager.send_personal_message(
+                    json.dumps({"type": "error", "response": 'Send a JSON object with a "message" string.'}),
+                    websocket
+                )
+                continue
             
-            # Send response back
-            await manager.send_personal_message(
-                json.dumps({"response": response, "user_id": message_data["user_id"]}),
-                websocket
-            )
+            # Stream tokens and tool progress from this connection's agent;
+            # the final "done"/"error" event carries the whole response
+            agent = sessions.get(session_id)
+            try:
+                async with agent_turn(agent):
+                    async for event in agent.astream_chat(message):
+                        await manager.send_personal_message(json.dumps({**event, "user_id": user_id}), websocket)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await manager.send_personal_message(
+                    json.dumps({"type": "error", "response": f"I apologize, but I encountered an error: {str(e)}.", "user_id": user_id}),
+                    websocket
+                )
+                continue
+            record_first_response()
     except WebSocketDisconnect:
+        pass
+    finally:
+        # However the connection ends, free its slot and its session
         manager.disconnect(websocket)
+        if sessions is not None:
+            sessions.close(session_id)
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(chat_message: ChatMessage):
     """REST API endpoint for chat"""
     try:
-        response = shopping_agent.chat(chat_message.message)
-        return ChatResponse(response=response, user_id=chat_message.user_id)
+        session_id = chat_message.session_id or chat_message.user_id
+        sessions = await get_sessions()
+        agent = sessions.get(session_id)
+        async with agent_turn(agent):
+            response = await agent.achat(chat_message.message)
+        record_first_response()
+        return ChatResponse(response=response, user_id=chat_message.user_id, session_id=session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage):
+    """Server-sent events version of /chat: tokens and tool progress, then the full response"""
+    session_id = chat_message.session_id or chat_message.user_id
+    sessions = await get_sessions()
+    agent = sessions.get(session_id)
+
+    async def events():
+        async with agent_turn(agent):
+            async for event in agent.astream_chat(chat_message.message):
+                yield f"data: {json.dumps({**event, 'user_id': chat_message.user_id, 'session_id': session_id})}\n\n"
+        record_first_response()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/start-conversation")
-async def start_conversation(user_id: str = "user123"):
+async def start_conversation(user_id: str = "user123", session_id: Optional[str] = None):
     """Start a new conversation with the shopping assistant"""
     try:
-        welcome_message = shopping_agent.start_conversation(user_id)
-        return {"message": welcome_message, "user_id": user_id}
+        session_id = session_id or user_id
+        sessions = await get_sessions()
+        agent = sessions.get(session_id)
+        async with agent_turn(agent):
+            welcome_message = await agent.astart_conversation(user_id)
+        return {"message": welcome_message, "user_id": user_id, "session_id": session_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/tool-cache/stats")
+async def tool_cache_stats():
+    """Hit/miss counters of the agent's read-tool cache"""
+    sessions = await get_sessions()
+    return sessions.resources.toolkit.tool_cache.stats()
+
+@app.get("/api-client/stats")
+async def api_client_stats():
+    """Circuit breaker state, failures, timeouts and retries per backend API"""
+    sessions = await get_sessions()
+    return sessions.resources.toolkit.api.stats()
+
+@app.get("/tracing/stats")
+async def tracing_stats():
+    """Latency histograms of traced turns, model calls, tools and HTTP requests"""
+    return tracer.stats()
+
+@app.get("/router/stats")
+async def router_stats():
+    """How many messages the intent router answered without the model"""
+    sessions = await get_sessions()
+    return sessions.resources.router.stats()
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats():
+    """Hit ratio and model latency saved by the LLM response cache"""
+    sessions = await get_sessions()
+    llm_cache = sessions.resources.llm_cache
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """Resident sessions, evictions and approximate conversation memory"""
+    sessions = await get_sessions()
+    return sessions.stats()
+
+@app.get("/turns/stats")
+async def turn_stats():
+    """Agent turns running and queued now, completed, and the most that ran at once"""
+    return {"max_concurrent": MAX_CONCURRENT_TURNS, **turn_metrics}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "shopping-assistant"}
+    return {"status": "healthy", "service": "shopping-assistant", "agent_ready": agent_ready()}
+
+@app.get("/startup/stats")
+async def startup_stats():
+    """Seconds from module load to import done, agent built, and first chat response"""
+    return {"prewarm": PREWARM, "agent_ready": agent_ready(), **startup_metrics}
+
+startup_metrics["import_seconds"] = round(time.monotonic() - STARTED, 3)
 
 if __name__ == "__main__":
     import uvicorn